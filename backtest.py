@@ -0,0 +1,240 @@
+"""
+Replay stored OHLC bars through the DEMAND/SUPPLY entry / SL / target rules.
+
+    python backtest.py [--start 2023-01-01] [--end 2024-12-31] [--workers 4]
+
+Reads trades from the local store and bars from bar_store's Parquet files; no
+network access. Each trade is treated as a fresh Pending setup from `start`.
+"""
+import argparse
+import hashlib
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from bar_store import BARS_DIR, BarStore
+from quotes import to_yf_symbol
+from trade_engine import transitions, trades_frame
+
+# --- CONFIGURATION ---
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backtest_cache")
+ENGINE_VERSION = 1       # bump when the replay rules change so cached results are recomputed
+CHUNK = 256              # trades scanned against one symbol's bars at a time (bounds memory)
+MIN_PARALLEL = 8         # fewer symbols than this run in-process
+BATCH = 32               # symbols handed to a worker process at a time
+TRADE_FIELDS = ["id", "stock_name", "trade_type", "trade_zone", "entry", "stop_loss", "target"]
+
+BacktestResult = namedtuple("BacktestResult", ["trades", "summary"])
+
+
+# ==============================================================================
+#                           BAR SCANNING
+# ==============================================================================
+def load_bars(path, start=None, end=None):
+    """(naive UTC timestamps, open, high, low, close) arrays from a bar_store file, memory-mapped."""
+    import pyarrow.parquet as pq
+    if not os.path.exists(path): return None
+    table = pq.read_table(path, memory_map=True, columns=["ts", "Open", "High", "Low", "Close"])
+    ts = table.column("ts").to_numpy().astype("datetime64[ns]")
+    keep = np.ones(len(ts), dtype=bool)
+    if start is not None: keep &= ts >= _utc_naive(start)
+    if end is not None: keep &= ts <= _utc_naive(end)
+    return (ts[keep],) + tuple(table.column(c).to_numpy()[keep] for c in ("Open", "High", "Low", "Close"))
+
+
+def _utc_naive(ts):
+    ts = pd.Timestamp(ts)
+    return (ts.tz_convert("UTC").tz_localize(None) if ts.tz is not None else ts).to_datetime64()
+
+
+def price_path(ts, o, h, l, c):
+    """
+    Four prices per bar in the order they most likely traded: O-L-H-C on up bars,
+    O-H-L-C on down bars. Returns (prices, bar timestamps), both of length 4*n.
+    """
+    up = c >= o
+    prices = np.column_stack([o, np.where(up, l, h), np.where(up, h, l), c]).ravel()
+    return prices, np.repeat(ts, 4)
+
+
+def scan(zone, entry, sl, tgt, prices):
+    """
+    First trigger and first exit index along `prices` for every trade (-1 if none),
+    plus whether the exit was the target. Same `transitions` rules as the live engine:
+    a trade can only exit on a price after the one that triggered it.
+    """
+    n = len(entry)
+    trig_at = np.full(n, -1)
+    exit_at = np.full(n, -1)
+    tgt_exit = np.zeros(n, dtype=bool)
+    steps = np.arange(len(prices))[None, :]
+    cmp = prices[None, :]
+
+    for i in range(0, n, CHUNK):
+        sl_ = slice(i, i + CHUNK)
+        z, e, s, t = zone[sl_, None], entry[sl_, None], sl[sl_, None], tgt[sl_, None]
+        live = np.ones((len(e), len(prices)), dtype=bool)
+
+        triggered, _, _ = transitions(live, "Pending", z, cmp, e, s, t)
+        has_trig = triggered.any(axis=1)
+        first = np.where(has_trig, triggered.argmax(axis=1), -1)
+
+        after = has_trig[:, None] & (steps > first[:, None])
+        _, tgt_hit, sl_hit = transitions(after, "Active", z, cmp, e, s, t)
+        exited = tgt_hit | sl_hit
+        has_exit = exited.any(axis=1)
+        last = exited.argmax(axis=1)
+
+        trig_at[sl_] = first
+        exit_at[sl_] = np.where(has_exit, last, -1)
+        tgt_exit[sl_] = has_exit & tgt_hit[np.arange(len(e)), last]
+    return trig_at, exit_at, tgt_exit
+
+
+def replay_symbol(zone, entry, sl, tgt, bars):
+    """Per-trade outcome arrays for one symbol's trades over `bars` (see load_bars)."""
+    n = len(entry)
+    nat = np.full(n, np.datetime64("NaT"), dtype="datetime64[ns]")
+    if bars is None or not len(bars[0]):
+        return {"outcome": np.full(n, "No Data", dtype=object), "trigger_at": nat, "exit_at": nat,
+                "days_to_trigger": np.full(n, np.nan), "days_in_trade": np.full(n, np.nan),
+                "r_multiple": np.full(n, np.nan)}
+
+    prices, stamps = price_path(*bars)
+    trig_at, exit_at, tgt_exit = scan(zone, entry, sl, tgt, prices)
+    triggered, exited = trig_at >= 0, exit_at >= 0
+
+    side = np.where(zone == "SUPPLY", -1.0, 1.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        risk = np.where(np.abs(entry - sl) > 0, np.abs(entry - sl), np.nan)
+        open_r = (prices[-1] - entry) * side / risk
+        r = np.select([tgt_exit, exited, triggered], [np.abs(tgt - entry) / risk, -1.0, open_r], np.nan)
+
+    trig_ts = np.where(triggered, stamps[np.maximum(trig_at, 0)], nat)
+    exit_ts = np.where(exited, stamps[np.maximum(exit_at, 0)], nat)
+    day = np.timedelta64(1, "D")
+    return {
+        "outcome": np.select([tgt_exit, exited, triggered], ["Target-Hit", "SL-Hit", "Open"], "Not Triggered").astype(object),
+        "trigger_at": trig_ts,
+        "exit_at": exit_ts,
+        "days_to_trigger": (trig_ts - stamps[0]) / day,
+        "days_in_trade": (exit_ts - trig_ts) / day,
+        "r_multiple": r,
+    }
+
+
+# ==============================================================================
+#                           POOL + CACHE
+# ==============================================================================
+def _cache_key(symbol, job_arrays, path, start, end):
+    try:
+        st = os.stat(path)
+        sig = [st.st_size, st.st_mtime_ns]
+    except OSError:
+        sig = None
+    h = hashlib.sha1(json.dumps([ENGINE_VERSION, symbol, sig, str(start), str(end)]).encode())
+    for arr in job_arrays: h.update(np.asarray(arr).astype(str).tobytes())
+    return h.hexdigest()
+
+
+def _run_jobs(jobs):
+    """Worker: replay a batch of (path, zone, entry, sl, tgt, start, end) symbol jobs."""
+    return [replay_symbol(zone, entry, sl, tgt, load_bars(path, start, end))
+            for path, zone, entry, sl, tgt, start, end in jobs]
+
+
+def backtest(trades, start=None, end=None, interval="1d", root=BARS_DIR, workers=None, cache_dir=CACHE_DIR):
+    """
+    Replay `trades` (Trades records or DataFrame) over locally stored bars.
+    Work is split by symbol across a process pool; per-symbol results are cached
+    on disk keyed by the trade definitions and the bar data range.
+    """
+    df = trades if isinstance(trades, pd.DataFrame) else trades_frame(trades)
+    if df.empty: return BacktestResult(df, summarize(df))
+    if 'trade_type' not in df: df = df.assign(trade_type="")
+    df = df.assign(trade_zone=df['trade_zone'].astype(str).str.strip(),
+                   symbol=[to_yf_symbol(n) for n in df['stock_name']])
+    df = df[df['symbol'] != ""].reset_index(drop=True)
+
+    store = BarStore(root)
+    codes, symbols = pd.factorize(df['symbol'])
+    order = np.argsort(codes, kind="stable")
+    groups = np.split(order, np.flatnonzero(np.diff(codes[order])) + 1)
+    zone = df['trade_zone'].to_numpy(dtype=object)
+    entry, sl, tgt = (df[c].to_numpy(dtype=float) for c in ("entry", "stop_loss", "target"))
+
+    parts, jobs, pending = [None] * len(groups), [], []
+    for g, rows in enumerate(groups):
+        path = store.path(symbols[g], interval)
+        job = (path, zone[rows], entry[rows], sl[rows], tgt[rows], start, end)
+        hit = os.path.join(cache_dir, f"{_cache_key(symbols[g], job[1:5], path, start, end)}.pkl") if cache_dir else None
+        if hit and os.path.exists(hit): parts[g] = pd.read_pickle(hit)
+        else:
+            jobs.append(job)
+            pending.append((g, hit))
+
+    n_workers = workers or os.cpu_count() or 1
+    batches = [jobs[i:i + BATCH] for i in range(0, len(jobs), BATCH)]
+    if len(jobs) >= MIN_PARALLEL and n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            fresh = [r for batch in pool.map(_run_jobs, batches) for r in batch]
+    else:
+        fresh = _run_jobs(jobs)
+
+    if cache_dir and fresh: os.makedirs(cache_dir, exist_ok=True)
+    for (g, hit), res in zip(pending, fresh):
+        parts[g] = res
+        if hit: pd.to_pickle(res, hit)
+
+    rows = np.concatenate(groups) if groups else np.array([], dtype=int)
+    out = df.loc[rows, TRADE_FIELDS].reset_index(drop=True)
+    for col in parts[0] if parts else ():
+        out[col] = np.concatenate([p[col] for p in parts])
+    return BacktestResult(out, summarize(out))
+
+
+def summarize(results, by=("trade_type", "trade_zone")):
+    """Hit rate, time to trigger and R-multiple per setup type and zone."""
+    if results.empty or 'outcome' not in results: return pd.DataFrame()
+    g = results.assign(
+        triggered=results['outcome'].isin(["Open", "Target-Hit", "SL-Hit"]),
+        target_hit=results['outcome'] == "Target-Hit",
+        sl_hit=results['outcome'] == "SL-Hit",
+    ).groupby(list(by), dropna=False)
+    summary = g.agg(
+        trades=('id', 'size'), triggered=('triggered', 'sum'), target_hits=('target_hit', 'sum'),
+        sl_hits=('sl_hit', 'sum'), avg_days_to_trigger=('days_to_trigger', 'mean'),
+        avg_r=('r_multiple', 'mean'), total_r=('r_multiple', 'sum'),
+    )
+    closed = summary['target_hits'] + summary['sl_hits']
+    summary['trigger_rate'] = summary['triggered'] / summary['trades']
+    summary['hit_rate'] = np.where(closed > 0, summary['target_hits'] / closed.where(closed > 0, 1), np.nan)
+    return summary.reset_index()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest the Trades setups against stored bars (offline).")
+    parser.add_argument("--start", help="first bar date, YYYY-MM-DD (default: all stored history)")
+    parser.add_argument("--end", help="last bar date, YYYY-MM-DD")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--out", help="write per-trade results to this CSV")
+    args = parser.parse_args(argv)
+
+    from core import LOCAL_DB_PATH
+    from storage import LocalRepository
+    store = LocalRepository(LOCAL_DB_PATH)
+    try: records = store.records("Trades")
+    finally: store.close()
+
+    res = backtest(records, start=args.start, end=args.end, workers=args.workers)
+    pd.set_option("display.width", 200)
+    print(res.summary.to_string(index=False) if not res.summary.empty else "No trades to replay.")
+    if args.out: res.trades.to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
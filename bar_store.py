@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+from datetime import timedelta
+
+import pandas as pd
+
+import metrics
+from quotes import BATCH_SIZE, PriceProvider
+
+# --- CONFIGURATION ---
+BARS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bars")
+INITIAL_PERIOD = {"1d": "2y", "1h": "730d", "5m": "60d", "1m": "7d"}  # first fetch per interval (yfinance limits)
+MIN_REFETCH = 30  # seconds; a symbol fetched more recently than this is served from disk as-is
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+MARKET_TZ = "Asia/Kolkata"  # gap fetches start from the last stored trading day in exchange time
+
+
+# ==============================================================================
+#                           FETCHING
+# ==============================================================================
+def download_bars(symbols, interval="1d", start=None, period=None):
+    """{yf_symbol: OHLCV frame} for `symbols`, either from `start` or for `period`."""
+    import yfinance as yf
+    kwargs = {"start": start.strftime("%Y-%m-%d")} if start is not None else {"period": period}
+    t0 = time.perf_counter()
+    try:
+        data = yf.download(list(symbols), interval=interval, group_by="ticker", auto_adjust=False,
+                           threads=True, progress=False, **kwargs)
+    except Exception as e:
+        print(f"Bar Download Error: {e}")
+        return {}
+    finally:
+        metrics.record_call("quotes", "download", (time.perf_counter() - t0) * 1e3)
+    if data is None or data.empty: return {}
+
+    out = {}
+    for sym in symbols:
+        try:
+            frame = data[sym] if len(symbols) > 1 else data
+        except KeyError:
+            continue
+        if isinstance(frame.columns, pd.MultiIndex): frame = frame.droplevel(-1, axis=1)
+        frame = frame[[c for c in BAR_COLUMNS if c in frame.columns]].dropna(subset=["Close"])
+        if not frame.empty: out[sym] = frame
+    return out
+
+
+def _normalize(frame):
+    frame = frame.reindex(columns=BAR_COLUMNS).astype(float)
+    idx = pd.DatetimeIndex(frame.index)
+    frame.index = (idx.tz_localize("UTC") if idx.tz is None else idx.tz_convert("UTC")).rename("ts")
+    return frame[~frame.index.duplicated(keep="last")].sort_index()
+
+
+# ==============================================================================
+#                           STORE
+# ==============================================================================
+class BarStore:
+    """
+    OHLCV bars on disk, one Parquet file per symbol and interval (bars/<interval>/<SYMBOL>.parquet).
+
+    `update` only asks the network for bars from the last stored day onwards
+    (the last bar is re-fetched because it may still be forming); symbols never
+    seen before get INITIAL_PERIOD of history. Reads are memory-mapped.
+    """
+
+    def __init__(self, root=BARS_DIR, fetch=download_bars, batch_size=BATCH_SIZE):
+        self.root = root
+        self.fetch = fetch
+        self.batch_size = batch_size
+        self._lock = threading.RLock()
+        self._tail = {}      # (symbol, interval) -> (last stored timestamp, its close), None if no file
+        self._fetched = {}   # (symbol, interval) -> monotonic time of the last network fetch
+        self._confirmed = {} # (symbol, interval) -> monotonic time of the last fetch that returned bars
+
+    def path(self, symbol, interval="1d"):
+        return os.path.join(self.root, interval, f"{symbol.upper()}.parquet")
+
+    # --- reads ---
+    def load(self, symbol, interval="1d", start=None):
+        path = self.path(symbol, interval)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], tz="UTC", name="ts"), dtype=float)
+        frame = pd.read_parquet(path, memory_map=True)
+        if start is not None:
+            start = pd.Timestamp(start)
+            frame = frame[frame.index >= (start.tz_localize("UTC") if start.tz is None else start)]
+        return frame
+
+    def _tail_of(self, symbol, interval):
+        key = (symbol, interval)
+        with self._lock:
+            if key not in self._tail:
+                frame = self.load(symbol, interval)
+                self._tail[key] = (frame.index[-1], float(frame['Close'].iloc[-1])) if len(frame) else None
+            return self._tail[key]
+
+    def last_timestamp(self, symbol, interval="1d"):
+        tail = self._tail_of(symbol, interval)
+        return tail[0] if tail else None
+
+    def last_close(self, symbols, interval="1d"):
+        out = {}
+        for sym in symbols:
+            tail = self._tail_of(sym, interval)
+            if tail: out[sym] = round(tail[1], 2)
+        return out
+
+    # --- writes ---
+    def append(self, symbol, bars, interval="1d"):
+        """Merge `bars` into the stored series; newer values win for the same timestamp."""
+        bars = _normalize(bars)
+        if bars.empty: return 0
+        with self._lock:
+            old = self.load(symbol, interval)
+            last = old.index[-1] if len(old) else None
+            merged = _normalize(pd.concat([old, bars])) if len(old) else bars
+            path = self.path(symbol, interval)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.tmp"
+            merged.to_parquet(tmp)
+            os.replace(tmp, path)
+            self._tail[(symbol, interval)] = (merged.index[-1], float(merged['Close'].iloc[-1]))
+        return int((bars.index > last).sum()) if last is not None else len(bars)
+
+    def update(self, symbols, interval="1d"):
+        """Fetch only the missing tail for each symbol. Returns {symbol: new bars stored}."""
+        now = time.monotonic()
+        groups = {}
+        for sym in dict.fromkeys(s for s in symbols if s):
+            if now - self._fetched.get((sym, interval), -MIN_REFETCH) < MIN_REFETCH: continue
+            last = self.last_timestamp(sym, interval)
+            # Group by day so symbols refreshed together share one download
+            start = None if last is None else last.tz_convert(MARKET_TZ).tz_localize(None).normalize()
+            groups.setdefault(start, []).append(sym)
+
+        added = {}
+        with metrics.stage("bars"):
+            for start, syms in groups.items():
+                for i in range(0, len(syms), self.batch_size):
+                    batch = syms[i:i + self.batch_size]
+                    if start is None: got = self.fetch(batch, interval, period=INITIAL_PERIOD.get(interval, "1mo"))
+                    else: got = self.fetch(batch, interval, start=start)
+                    fetched_at = time.monotonic()
+                    for sym in batch:
+                        self._fetched[(sym, interval)] = fetched_at
+                        if sym in got and len(got[sym]):
+                            self._confirmed[(sym, interval)] = fetched_at
+                            added[sym] = self.append(sym, got[sym], interval)
+        return added
+
+    def confirmed(self, symbols, interval="1d", within=MIN_REFETCH):
+        """The `symbols` whose tail a fetch returned in the last `within` seconds."""
+        now = time.monotonic()
+        return [s for s in symbols if now - self._confirmed.get((s, interval), -within - 1) <= within]
+
+    def history(self, symbols, interval="1d", days=None):
+        """{symbol: bars} from disk, optionally only the last `days` days."""
+        start = None if days is None else pd.Timestamp.now(tz="UTC").normalize() - timedelta(days=days)
+        return {s: self.load(s, interval, start=start) for s in symbols}
+
+
+class StoredBarsProvider(PriceProvider):
+    """
+    CMP from the bar store: brings each symbol's daily series up to date, then reads the last close.
+
+    Only symbols whose download just returned bars (or did within MIN_REFETCH) are
+    quoted. A failed, empty or skipped fetch leaves the symbol out, so an old
+    stored close is never passed off as the current price and the caller sees a miss.
+    """
+
+    def __init__(self, store, interval="1d"):
+        self.store = store
+        self.interval = interval
+
+    def get_quotes(self, symbols):
+        return self.fetch(symbols)[0]
+
+    def fetch(self, symbols):
+        # A symbol with stored bars exists, so coming back without a fresh tail is a fetch error
+        symbols = list(dict.fromkeys(symbols))
+        self.store.update(symbols, self.interval)
+        quotes = self.store.last_close(self.store.confirmed(symbols, self.interval), self.interval)
+        stored = [s for s in symbols if s not in quotes and self.store.last_timestamp(s, self.interval) is not None]
+        return quotes, set(stored)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bar_store():
+    global _store
+    with _store_lock:
+        if _store is None: _store = BarStore()
+        return _store
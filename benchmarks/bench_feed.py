@@ -0,0 +1,76 @@
+"""
+Tick-to-alert latency of the quote feed path.
+
+    python benchmarks/bench_feed.py [trades ...]
+
+Replays a synthetic tick file through ReplayFeed -> FeedRunner -> TradeBook and
+reports per-tick latency, against the cost of re-evaluating the whole Trades
+table (what update_prices_logic does) for comparison.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import metrics  # noqa: E402
+from fakes import synthetic_book  # noqa: E402
+from quote_feed import FeedRunner, ReplayFeed, write_ticks  # noqa: E402
+from quotes import to_yf_symbol  # noqa: E402
+from trade_engine import TradeBook, evaluate_trades, frame_from_values  # noqa: E402
+
+# --- CONFIGURATION ---
+SIZES = [1_000, 10_000]
+TICKS = 20_000
+
+
+def make_ticks(quotes, n, seed=0):
+    """Random walk of `n` ticks spread over the book's symbols."""
+    rng = np.random.default_rng(seed)
+    symbols = np.array([to_yf_symbol(s) for s in quotes], dtype=object)
+    prices = np.array(list(quotes.values()), dtype=float)
+    picks = rng.integers(0, len(symbols), n)
+    out = []
+    for k, i in enumerate(picks):
+        prices[i] = round(prices[i] * (1 + rng.normal(0, 0.002)), 2)
+        out.append((k * 0.01, symbols[i], prices[i]))
+    return out
+
+
+def main(sizes):
+    metrics.LOG_PATH = None
+    print(f"{'trades':>7} {'ticks':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'ticks/s':>9} "
+          f"{'flushes':>7} {'alerts':>6} {'full eval ms':>12}")
+    for n in sizes:
+        grids, quotes = synthetic_book(n)
+        table = frame_from_values(grids["Trades"])
+        t0 = time.perf_counter()
+        evaluate_trades(table, np.ones(len(table)))
+        full_ms = (time.perf_counter() - t0) * 1e3
+
+        flushes, alerts = [0], [0]
+        runner = FeedRunner(TradeBook(grids["Trades"]),
+                            persist=lambda changes: flushes.__setitem__(0, flushes[0] + 1),
+                            notify=lambda rows: alerts.__setitem__(0, alerts[0] + len(rows)),
+                            flush_interval=0.5)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ticks.csv")
+            write_ticks(path, make_ticks(quotes, TICKS))
+            feed = ReplayFeed(path)
+            feed.subscribe(runner.on_tick)
+            t0 = time.perf_counter()
+            feed.run()
+            runner.flush()
+            elapsed = time.perf_counter() - t0
+
+        s = runner.stats()
+        print(f"{n:>7} {s['ticks']:>7} {s['p50_ms']:>8.3f} {s['p99_ms']:>8.3f} {s['max_ms']:>8.3f} "
+              f"{s['ticks'] / elapsed:>9.0f} {flushes[0]:>7} {alerts[0]:>6} {full_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or SIZES)
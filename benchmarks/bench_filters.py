@@ -0,0 +1,118 @@
+"""
+Dashboard render-path benchmark: filter + alert bucketing + Links join.
+
+    python benchmarks/bench_filters.py [rows ...]
+
+Compares the old row-wise apply() implementation against trade_engine's
+vectorized one on synthetic trades. No Sheets / network access needed.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trade_engine import PCT_BANDS, filter_trades, join_links, trades_frame  # noqa: E402
+
+# --- CONFIGURATION ---
+SIZES = [1_000, 10_000, 100_000]
+REPEAT = 3
+SCENARIOS = [
+    ("All", "All", "All", "All"),
+    ("Pending", "DEMAND", "All", "0.5% - 1%"),
+    ("All", "All", "QIT", "0 - 0.5%"),
+]
+
+
+def make_trades(n, seed=0):
+    rng = np.random.default_rng(seed)
+    names = np.array([f"STOCK{i}" for i in range(max(1, n // 4))], dtype=object)
+    entry = rng.uniform(50, 3000, n).round(2)
+    entry[rng.random(n) < 0.02] = 0
+    records = pd.DataFrame({
+        'id': np.arange(1, n + 1),
+        'stock_name': rng.choice(names, n) + rng.choice(np.array(["", ".NS"], dtype=object), n),
+        'cmp': (entry * rng.uniform(0.96, 1.04, n)).round(2),
+        'entry': entry,
+        'stop_loss': (entry * 0.95).round(2),
+        'target': (entry * 1.1).round(2),
+        'trade_zone': rng.choice(["DEMAND", "SUPPLY"], n),
+        'trade_type': rng.choice(["QIT", "MIT", "WIT", "DIT"], n),
+        'status': rng.choice(["Pending", "Active", "Target-Hit", "SL-Hit", ""], n),
+        'last_alert': "",
+    }).to_dict('records')
+    link_map = {str(x).upper(): f"https://trendlyne.com/{x}" for x in names[::2]}
+    return trades_frame(records), link_map
+
+
+def legacy_filter(df, link_map, f_status, f_zone, f_strat, f_pct):
+    """get_filtered_trades_advanced as it was before vectorization."""
+    if f_status != "All": df = df[df['status'] == f_status]
+    if f_zone != "All": df = df[df['trade_zone'] == f_zone]
+    if f_strat != "All": df = df[df['trade_type'] == f_strat]
+    if df.empty: return df
+    df = df.copy()
+
+    def calc_alert(row):
+        if row['status'] == 'Active': return 0.0, "Trade is Active"
+        if row['entry'] == 0: return 100, ""
+        pct = abs(row['cmp'] - row['entry']) / row['entry'] * 100
+        if pct <= 0.5: return pct, "Within 0.5% Range"
+        elif pct <= 1.0: return pct, "Within 1% Range"
+        return pct, ""
+
+    df[['diff_pct', 'Alert']] = df.apply(lambda row: pd.Series(calc_alert(row)), axis=1)
+    if f_pct != "All":
+        lo, hi = PCT_BANDS[f_pct]
+        df = df[(df['diff_pct'] > lo) & (df['diff_pct'] <= hi)]
+    df['Trendlyne'] = df['stock_name'].apply(lambda x: link_map.get(str(x).replace('.NS', '').strip().upper()))
+    return df
+
+
+def vectorized_filter(df, link_map, f_status, f_zone, f_strat, f_pct):
+    out = filter_trades(df, f_status, f_zone, f_strat, f_pct)
+    return out if out.empty else join_links(out, link_map)
+
+
+def best_of(fn, *args):
+    best = float('inf')
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def _once(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return time.perf_counter() - t0, out
+
+
+def check_same(a, b):
+    cols = ['id', 'diff_pct', 'Alert', 'Trendlyne']
+    if a.empty or b.empty: return a.empty and b.empty
+    a, b = a[cols].reset_index(drop=True), b[cols].reset_index(drop=True)
+    return (a['id'].equals(b['id']) and np.allclose(a['diff_pct'].astype(float), b['diff_pct'].astype(float))
+            and a['Alert'].tolist() == b['Alert'].tolist()
+            and a['Trendlyne'].fillna("").tolist() == b['Trendlyne'].fillna("").tolist())
+
+
+def main(sizes):
+    print(f"{'rows':>8}  {'filters':<40} {'legacy ms':>10} {'vector ms':>10} {'speedup':>8}  same")
+    for n in sizes:
+        df, link_map = make_trades(n)
+        for scenario in SCENARIOS:
+            # legacy at 100k takes a while; once is enough to make the point
+            t_old, old = best_of(legacy_filter, df, link_map, *scenario) if n <= 10_000 else \
+                _once(legacy_filter, df, link_map, *scenario)
+            t_new, new = best_of(vectorized_filter, df, link_map, *scenario)
+            label = " / ".join(scenario)
+            print(f"{n:>8}  {label:<40} {t_old * 1e3:>10.1f} {t_new * 1e3:>10.1f} "
+                  f"{t_old / t_new:>7.0f}x  {check_same(old, new)}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or SIZES)
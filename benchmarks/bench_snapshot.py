@@ -0,0 +1,152 @@
+"""
+Trades load path: records + trades_frame (per call, per session) against the typed,
+shared snapshot with its Parquet warm start.
+
+    python benchmarks/bench_snapshot.py
+    python benchmarks/bench_snapshot.py --trades 10000 100000 --sessions 8
+
+Scenarios, per size:
+  build      grid -> DataFrame: get_all_records-style records + trades_frame vs typed_trades
+  memory     frame size, plus the records list the old path keeps cached next to it
+  sessions   memory held when `--sessions` sessions each load the Trades table
+  restart    new process on the local SQLite store: read + parse the tab vs memory-map the snapshot
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+
+from fakes import synthetic_book  # noqa: E402
+from sheet_cache import records_from_values  # noqa: E402
+from storage import LocalRepository  # noqa: E402
+from trade_engine import PRICE_COLUMNS, trades_frame  # noqa: E402
+from trade_snapshot import TradeSnapshot, save_snapshot, typed_trades  # noqa: E402
+
+# --- CONFIGURATION ---
+SIZES = [10_000, 100_000]
+SESSIONS = 4
+REPEAT = 3
+
+
+def best_of(fn, repeat=REPEAT):
+    best, out = float('inf'), None
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e3, out
+
+
+def traced_mb(fn):
+    """(result, MB still allocated by Python objects once `fn` returns)."""
+    gc.collect()
+    tracemalloc.start()
+    out = fn()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return out, held / 1e6
+
+
+def frame_mb(df):
+    return float(df.memory_usage(deep=True).sum()) / 1e6
+
+
+def legacy_load(grid):
+    return trades_frame(records_from_values(grid))
+
+
+def check_same(old, new):
+    if len(old) != len(new): return False
+    same = old['id'].astype(float).to_numpy().tolist() == new['id'].astype(float).to_numpy().tolist()
+    for c in PRICE_COLUMNS: same &= np.allclose(old[c].to_numpy(float), new[c].to_numpy(float))
+    return same and old['status'].astype(str).tolist() == new['status'].astype(str).tolist()
+
+
+def run_size(n, sessions, tmpdir):
+    grid = synthetic_book(n)[0]["Trades"]
+    rows = []
+
+    t_old, old = best_of(lambda: legacy_load(grid))
+    t_new, new = best_of(lambda: typed_trades(grid))
+    rows.append(("build", f"{t_old:.0f} ms", f"{t_new:.0f} ms", f"{t_old / t_new:.1f}x  same={check_same(old, new)}"))
+
+    records, records_mb = traced_mb(lambda: records_from_values(grid))
+    old_mb, new_mb = frame_mb(old), frame_mb(new)
+    rows.append(("memory", f"{old_mb + records_mb:.1f} MB", f"{new_mb:.1f} MB",
+                 f"frame {old_mb:.1f} + records {records_mb:.1f} MB"))
+    del records
+
+    # Old path: every session's get_trades_df built its own frame from the shared records.
+    # New path: one frame, each session holds a shallow copy of it.
+    old_total = records_mb + sessions * old_mb
+    snap = TradeSnapshot(path=None)
+    repo = _GridRepo(grid)
+    snap.shared(repo)
+    copies, copies_mb = traced_mb(lambda: [snap.frame(repo) for _ in range(sessions)])
+    new_total = frame_mb(snap.shared(repo)) + copies_mb
+    rows.append((f"{sessions} sessions", f"{old_total:.1f} MB", f"{new_total:.1f} MB", f"{old_total / new_total:.1f}x less"))
+    del copies
+
+    path = os.path.join(tmpdir, f"trades_{n}.db")
+    snapshot_path = os.path.join(tmpdir, f"trades_{n}.parquet")
+    store = LocalRepository(path)
+    store.load_remote("Trades", grid)
+    save_snapshot(typed_trades(store.values("Trades")), snapshot_path, store.version("Trades"))
+    store.close()
+
+    def cold_old():
+        repo = LocalRepository(path)
+        try: return trades_frame(repo.records("Trades"))
+        finally: repo.close()
+
+    def cold_new():
+        repo = LocalRepository(path)
+        try: return TradeSnapshot(snapshot_path).shared(repo)
+        finally: repo.close()
+
+    t_old, old = best_of(cold_old)
+    t_new, new = best_of(cold_new)
+    rows.append(("restart", f"{t_old:.0f} ms", f"{t_new:.0f} ms", f"{t_old / t_new:.1f}x  same={check_same(old, new)}"))
+    return [(n, *r) for r in rows]
+
+
+class _GridRepo:
+    """Just enough of a Repository for a snapshot over an unversioned, cached grid."""
+
+    def __init__(self, grid):
+        self.grid = grid
+
+    def version(self, tab):
+        return None
+
+    def values(self, tab, fresh=False):
+        return self.grid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trades snapshot benchmark for Pro Stock Manager.")
+    parser.add_argument("--trades", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--sessions", type=int, default=SESSIONS)
+    args = parser.parse_args(argv)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n in args.trades: rows += run_size(n, args.sessions, tmpdir)
+
+    print(f"{'trades':>7}  {'scenario':<11} {'records path':>13} {'snapshot':>10}  note")
+    for n, scenario, old, new, note in rows:
+        print(f"{n:>7}  {scenario:<11} {old:>13} {new:>10}  {note}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Startup and rerun cost of the Streamlit app against fake Sheets.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --trades 1000 --latency 0.2 --reruns 5
+
+Scenarios:
+  import         cold `import core` in a fresh interpreter, and which heavy libraries it pulled in
+  first render   first script run of a new process: schema check plus first reads
+  rerun          every later run of the same session, i.e. the cost of a click
+  restart        first run of a new process whose local store already records the schema version
+                 (and, on the local backend, whose Trades snapshot is already on disk)
+
+Renders go through Streamlit's AppTest with core's Sheet handle, repo and quotes
+rebound to the fakes, so no credentials or network are needed.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from streamlit.logger import set_log_level  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import core  # noqa: E402
+from bench_suite import bind_core, make_repo  # noqa: E402
+from fakes import FakeSpreadsheet, StubTelegramServer, synthetic_book  # noqa: E402
+from quotes import FakePriceProvider, set_price_provider  # noqa: E402
+from telegram_dispatch import TelegramDispatcher  # noqa: E402
+from trade_snapshot import TradeSnapshot, set_trade_snapshot  # noqa: E402
+
+# --- CONFIGURATION ---
+APP = os.path.join(ROOT, "keeplistwebbased.py")
+TRADES = 1_000
+RERUNS = 3
+SHEETS_LATENCY = 0.0
+HEAVY_MODULES = ("gspread", "google.oauth2", "yfinance", "pyarrow")
+
+
+def cold_import():
+    code = ("import json, sys, time; t0 = time.perf_counter(); import core; "
+            "ms = (time.perf_counter() - t0) * 1e3; "
+            f"print(json.dumps({{'ms': ms, 'loaded': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def render(at, sh):
+    sh.reset_calls()
+    t0 = time.perf_counter()
+    at.run()
+    ms = (time.perf_counter() - t0) * 1e3
+    if at.exception: raise RuntimeError(at.exception[0].message)
+    trace = at.session_state["last_trace"]
+    init_ms = trace.stages.get("init_db", [0, 0.0])[1]
+    return {"ms": ms, "init_db_ms": init_ms, "api_calls": sh.total_calls, "calls": dict(sh.calls)}
+
+
+def run_backend(backend, n, reruns, latency, stub):
+    grids, quotes = synthetic_book(n)
+    sh = FakeSpreadsheet(grids, latency=latency)
+    set_price_provider(FakePriceProvider(quotes))
+    dispatcher = TelegramDispatcher("BENCH", ["1"], api_base=stub.url, per_chat_interval=0, global_interval=0)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        core.STORAGE_BACKEND = backend
+        core.LOCAL_DB_PATH = os.path.join(tmpdir, "bench.db")
+        core.CACHE.reset()
+        core.get_db = lambda: sh
+        repo, syncer = make_repo(backend, sh, tmpdir)
+        bind_core(repo, dispatcher)
+        snapshot_path = os.path.join(tmpdir, "trades_snapshot.parquet")
+        set_trade_snapshot(TradeSnapshot(snapshot_path))
+
+        core._schema_ready = None
+        at = AppTest.from_file(APP, default_timeout=300)
+        rows.append({"scenario": "first render", **render(at, sh)})
+        for i in range(reruns):
+            rows.append({"scenario": f"rerun {i + 1}", **render(at, sh)})
+
+        # A new process: nothing memoized in memory, only what the local store recorded
+        core._schema_ready = None
+        core.CACHE.reset()
+        set_trade_snapshot(TradeSnapshot(snapshot_path))
+        rows.append({"scenario": "restart", **render(AppTest.from_file(APP, default_timeout=300), sh)})
+        if syncer: repo.close()
+    return [{"backend": backend, "trades": n, **r} for r in rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Startup benchmark for Pro Stock Manager.")
+    parser.add_argument("--trades", type=int, default=TRADES)
+    parser.add_argument("--reruns", type=int, default=RERUNS)
+    parser.add_argument("--latency", type=float, default=SHEETS_LATENCY, help="seconds per fake Sheets call")
+    parser.add_argument("--backend", choices=["sheets", "local"], action="append")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+    set_log_level("error")  # AppTest runs outside a server and warns on every element otherwise
+
+    imp = cold_import()
+    print(f"import core: {imp['ms']:.0f} ms, heavy modules loaded: {', '.join(imp['loaded']) or 'none'}")
+
+    rows = []
+    with StubTelegramServer() as stub:
+        for backend in args.backend or ["sheets", "local"]:
+            rows += run_backend(backend, args.trades, args.reruns, args.latency, stub)
+
+    print(f"{'backend':<7} {'trades':>6}  {'scenario':<14} {'ms':>9} {'init_db ms':>10} {'api':>5}")
+    for r in rows:
+        print(f"{r['backend']:<7} {r['trades']:>6}  {r['scenario']:<14} {r['ms']:>9.1f} "
+              f"{r['init_db_ms']:>10.1f} {r['api_calls']:>5}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f: json.dump({"import": imp, "renders": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Offline benchmark of the app's hot paths against fake Sheets, quotes and Telegram.
+
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --sizes 1000 --backend sheets --latency 0.05 --json out.json
+
+Drives the real core.py functions (update_prices_logic, get_filtered_trades_advanced,
+dispatch_alerts, save_portfolio_df, get_portfolio_valuation) with get_repo / Telegram rebound to the fakes,
+and reports wall time and Sheets API calls per scenario. For the "local" backend
+the cost of pushing the resulting outbox to the Sheet is reported separately.
+Needs the app's requirements but no credentials or network.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import core  # noqa: E402
+import metrics  # noqa: E402
+from coordination import AlertLedger, SingleFlight  # noqa: E402
+from fakes import FakeSpreadsheet, StubTelegramServer, synthetic_book  # noqa: E402
+from quotes import FakePriceProvider, SymbolResolver, set_symbol_resolver  # noqa: E402
+from sheet_cache import SheetCache  # noqa: E402
+from storage import LocalRepository, SheetSyncer, SheetsRepository  # noqa: E402
+from telegram_dispatch import TelegramDispatcher  # noqa: E402
+from trade_snapshot import TradeSnapshot, set_trade_snapshot  # noqa: E402
+
+# --- CONFIGURATION ---
+SIZES = [100, 1_000, 10_000]
+BACKENDS = ["sheets", "local"]
+SHEETS_LATENCY = 0.0   # seconds per fake Sheets call; ~0.1-0.3 is realistic for Google
+QUOTE_LATENCY = 0.0    # seconds per fake quote batch
+ALL = ("All", "All", "All", "All")
+
+
+# ==============================================================================
+#                           WIRING
+# ==============================================================================
+def bind_core(repo, dispatcher):
+    """Point core's storage and Telegram hooks at the benchmark backends."""
+    core.get_repo = lambda: repo
+    core.get_alert_dispatcher = lambda: dispatcher
+    core.send_telegram_message = lambda message, test_mode=False: dispatcher.send(message)
+    core.telegram_digest = dispatcher.digest
+    core.ALERTS = AlertLedger()  # each run starts with nothing sent
+    core.REFRESH = SingleFlight()
+    core._valuation.clear()
+    set_symbol_resolver(SymbolResolver(path=None))  # keep the app's symbol cache out of benchmark runs
+    set_trade_snapshot(TradeSnapshot(path=None))    # and the app's Trades snapshot file
+    metrics.LOG_PATH = None  # keep benchmark runs out of the app's perf log
+
+
+def make_repo(backend, sh, tmpdir):
+    cache = SheetCache()
+    open_ws = lambda tab: cache.worksheet(sh, tab)
+    if backend == "sheets": return SheetsRepository(open_ws, cache), None
+    store = LocalRepository(os.path.join(tmpdir, "bench.db"))
+    syncer = SheetSyncer(store, open_ws, push_delay=0)  # never started: pushes are timed explicitly
+    store.syncer = syncer
+    syncer.pull()
+    return store, syncer
+
+
+# ==============================================================================
+#                           SCENARIOS
+# ==============================================================================
+def render_dashboard():
+    return core.dispatch_alerts(core.get_filtered_trades_advanced(*ALL))
+
+
+def edit_portfolio():
+    loaded = core.get_portfolio_df()
+    df = loaded.copy()
+    df.loc[0, 'target'] = float(df.loc[0, 'target']) + 1
+    core.save_portfolio_df(df, loaded)
+
+
+def portfolio_watch(provider, refresh=False):
+    return core.dispatch_portfolio_alerts(core.get_portfolio_valuation(provider=provider, refresh=refresh))
+
+
+def scenarios(provider):
+    return [
+        ("filter (cold)", lambda: core.get_filtered_trades_advanced(*ALL)),
+        ("filter (warm)", lambda: core.get_filtered_trades_advanced(*ALL)),
+        ("filter (strategy)", lambda: core.get_filtered_trades_advanced("Pending", "DEMAND", "QIT", "0 - 0.5%")),
+        ("update_prices", lambda: core.update_prices_logic(provider)),
+        ("dashboard alerts", render_dashboard),
+        ("dashboard alerts (rerun)", render_dashboard),
+        ("save_portfolio", edit_portfolio),
+        ("portfolio valuation", lambda: portfolio_watch(provider, refresh=True)),
+        ("portfolio valuation (rerun)", lambda: portfolio_watch(provider)),
+    ]
+
+
+def run_backend(backend, n, stub, latency, quote_latency):
+    grids, quotes = synthetic_book(n)
+    sh = FakeSpreadsheet(grids, latency=latency)
+    provider = FakePriceProvider(quotes, latency=quote_latency)
+    dispatcher = TelegramDispatcher("BENCH", ["1"], api_base=stub.url, per_chat_interval=0, global_interval=0)
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        repo, syncer = make_repo(backend, sh, tmpdir)
+        bind_core(repo, dispatcher)
+        for name, fn in scenarios(provider):
+            sh.reset_calls()
+            stub.reset()
+            t0 = time.perf_counter()
+            fn()
+            dispatcher.drain(timeout=60)
+            row = {"backend": backend, "trades": n, "scenario": name,
+                   "ms": (time.perf_counter() - t0) * 1e3, "api_calls": sh.total_calls,
+                   "calls": dict(sh.calls), "telegram": len(stub.messages)}
+            if syncer:
+                sh.reset_calls()
+                t0 = time.perf_counter()
+                syncer.push()
+                row.update(sync_ms=(time.perf_counter() - t0) * 1e3, sync_calls=sh.total_calls,
+                           calls_sync=dict(sh.calls))
+            results.append(row)
+        if syncer: repo.close()
+    return results
+
+
+def print_table(rows):
+    print(f"{'backend':<7} {'trades':>6}  {'scenario':<26} {'ms':>9} {'api':>5} {'sync ms':>9} {'sync api':>8} {'tg':>4}")
+    for r in rows:
+        sync_ms = f"{r['sync_ms']:.1f}" if 'sync_ms' in r else "-"
+        sync_calls = r.get('sync_calls', "-")
+        print(f"{r['backend']:<7} {r['trades']:>6}  {r['scenario']:<26} {r['ms']:>9.1f} {r['api_calls']:>5} "
+              f"{sync_ms:>9} {sync_calls:>8} {r['telegram']:>4}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for Pro Stock Manager.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="trade counts to generate")
+    parser.add_argument("--backend", choices=BACKENDS, action="append", help="repeat to run several")
+    parser.add_argument("--latency", type=float, default=SHEETS_LATENCY, help="seconds per fake Sheets call")
+    parser.add_argument("--quote-latency", type=float, default=QUOTE_LATENCY, help="seconds per quote batch")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    rows = []
+    with StubTelegramServer() as stub:
+        for n in args.sizes:
+            for backend in args.backend or BACKENDS:
+                rows += run_backend(backend, n, stub, args.latency, args.quote_latency)
+    print_table(rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f: json.dump(rows, f, indent=2)
+    return rows
+
+
+if __name__ == "__main__":
+    main()
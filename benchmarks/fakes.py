@@ -0,0 +1,291 @@
+"""
+In-memory stand-ins for Google Sheets and Telegram, for benchmarks.
+
+FakeSpreadsheet / FakeWorksheet implement the slice of gspread the app uses,
+keep cells as strings like the real API, sleep `latency` seconds per call and
+count every call. StubTelegramServer is a local HTTP endpoint that accepts
+sendMessage. Quotes come from quotes.FakePriceProvider.
+"""
+import json
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from sheet_cache import records_from_values
+from trade_io import TRADE_TYPES
+
+TRADES_HEADERS = ["id", "stock_name", "cmp", "entry", "stop_loss", "target",
+                  "remark", "trade_type", "dv_analysis", "trade_zone",
+                  "trigger_date", "exit_date", "status", "last_alert"]
+PORTFOLIO_HEADERS = ["stock_name", "date", "stop_loss", "target", "actual_cost", "last_alert"]
+LINKS_HEADERS = ["stock_name", "link"]
+
+
+class WorksheetNotFound(KeyError):
+    pass
+
+
+# ==============================================================================
+#                           A1 PARSING
+# ==============================================================================
+_A1 = re.compile(r"^([A-Z]+)(\d+)$")
+
+
+def col_index(letters):
+    """A1 column letters -> 0-based index (inverse of get_col_letter)."""
+    n = 0
+    for ch in letters: n = n * 26 + ord(ch) - 64
+    return n - 1
+
+
+def parse_a1(rng):
+    """'B2:D5' or 'B2' -> (row1, col1, row2, col2), 1-based rows, 0-based columns."""
+    parts = rng.split("!")[-1].split(":")
+    (c1, r1), (c2, r2) = [_A1.match(p).groups() for p in (parts[0], parts[-1])]
+    return int(r1), col_index(c1), int(r2), col_index(c2)
+
+
+# ==============================================================================
+#                           FAKE GSPREAD
+# ==============================================================================
+class FakeCell:
+    def __init__(self, row, col, value):
+        self.row, self.col, self.value = row, col, value
+
+
+class FakeSpreadsheet:
+    """Holds the tabs plus the shared call log; `latency` is slept on every API call."""
+
+    def __init__(self, tabs=None, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._tabs = {t: FakeWorksheet(self, t, grid) for t, grid in (tabs or {}).items()}
+
+    def _api(self, method):
+        with self._lock: self.calls[method] += 1
+        if self.latency: time.sleep(self.latency)
+
+    @property
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def reset_calls(self):
+        with self._lock: self.calls.clear()
+
+    def worksheet(self, title):
+        self._api("worksheet")
+        if title not in self._tabs: raise WorksheetNotFound(title)
+        return self._tabs[title]
+
+    def worksheets(self):
+        self._api("worksheets")
+        return list(self._tabs.values())
+
+    def add_worksheet(self, title, rows=100, cols=26):
+        self._api("add_worksheet")
+        ws = self._tabs[title] = FakeWorksheet(self, title, [])
+        return ws
+
+    def grid(self, title):
+        """Current cells without counting an API call."""
+        return [list(r) for r in self._tabs[title]._rows]
+
+
+class FakeWorksheet:
+    def __init__(self, sh, title, grid):
+        self.sh = sh
+        self.title = title
+        self._rows = [[_cell(v) for v in r] for r in grid]
+
+    # --- reads ---
+    def get_all_values(self):
+        self.sh._api("get_all_values")
+        width = max((len(r) for r in self._rows), default=0)
+        return [list(r) + [""] * (width - len(r)) for r in self._rows]
+
+    def get_all_records(self):
+        self.sh._api("get_all_records")
+        return records_from_values(self._rows)
+
+    def row_values(self, row):
+        self.sh._api("row_values")
+        vals = list(self._rows[row - 1]) if row <= len(self._rows) else []
+        while vals and vals[-1] == "": vals.pop()
+        return vals
+
+    def col_values(self, col):
+        self.sh._api("col_values")
+        vals = [r[col - 1] if len(r) >= col else "" for r in self._rows]
+        while vals and vals[-1] == "": vals.pop()
+        return vals
+
+    def find(self, query, in_column=None):
+        self.sh._api("find")
+        query = str(query)
+        for r, row in enumerate(self._rows, start=1):
+            cols = [in_column - 1] if in_column else range(len(row))
+            for c in cols:
+                if c < len(row) and row[c] == query: return FakeCell(r, c + 1, row[c])
+        return None
+
+    # --- writes ---
+    def _set(self, r, c, value):
+        """1-based row, 0-based column."""
+        while len(self._rows) < r: self._rows.append([])
+        row = self._rows[r - 1]
+        if len(row) <= c: row.extend([""] * (c + 1 - len(row)))
+        row[c] = _cell(value)
+
+    def _write_block(self, rng, values):
+        r1, c1, _, _ = parse_a1(rng)
+        for i, vals in enumerate(values):
+            for j, v in enumerate(vals): self._set(r1 + i, c1 + j, v)
+
+    def update_cell(self, row, col, value):
+        self.sh._api("update_cell")
+        self._set(row, col - 1, value)
+
+    def update(self, range_name=None, values=None, **kwargs):
+        self.sh._api("update")
+        if isinstance(range_name, list): range_name, values = values or "A1", range_name
+        self._write_block(range_name or "A1", values)
+
+    def batch_update(self, data, **kwargs):
+        self.sh._api("batch_update")
+        for d in data: self._write_block(d['range'], d['values'])
+
+    def append_row(self, values, **kwargs):
+        self.sh._api("append_row")
+        self._rows.append([_cell(v) for v in values])
+
+    def append_rows(self, values, **kwargs):
+        self.sh._api("append_rows")
+        self._rows.extend([_cell(v) for v in r] for r in values)
+
+    def delete_rows(self, start, end=None):
+        self.sh._api("delete_rows")
+        del self._rows[start - 1:(end or start)]
+
+    def clear(self):
+        self.sh._api("clear")
+        self._rows = []
+
+
+def _cell(v):
+    return "" if v is None else str(v)
+
+
+# ==============================================================================
+#                           STUB TELEGRAM ENDPOINT
+# ==============================================================================
+class StubTelegramServer:
+    """
+    Local sendMessage endpoint. Use `url` as the dispatcher's api_base.
+    Every `throttle_every`-th request gets a 429 with `retry_after`, every
+    `fail_every`-th a 500.
+    """
+
+    def __init__(self, latency=0.0, throttle_every=0, retry_after=1, fail_every=0):
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.fail_every = fail_every
+        self.messages = []
+        self.requests = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b"{}")
+                with stub._lock:
+                    stub.requests += 1
+                    throttled = stub.throttle_every and stub.requests % stub.throttle_every == 0
+                    failed = stub.fail_every and stub.requests % stub.fail_every == 0
+                    if not (throttled or failed): stub.messages.append(body)
+                if stub.latency: time.sleep(stub.latency)
+                if throttled:
+                    self._reply(429, {"ok": False, "parameters": {"retry_after": stub.retry_after}})
+                elif failed:
+                    self._reply(500, {"ok": False, "description": "Internal Server Error"})
+                else:
+                    self._reply(200, {"ok": True, "result": {}})
+
+            def _reply(self, code, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-telegram", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset(self):
+        with self._lock:
+            self.messages.clear()
+            self.requests = 0
+
+
+# ==============================================================================
+#                           SYNTHETIC DATA
+# ==============================================================================
+def synthetic_book(n_trades, seed=0):
+    """
+    Sheet grids for Trades/Portfolio/Links with `n_trades` trades, plus a quote map.
+    Prices sit close to entries/stops/targets so a refresh triggers and exits some trades.
+    """
+    rng = np.random.default_rng(seed)
+    n_symbols = max(1, n_trades // 4)
+    symbols = np.array([f"STK{i:05d}" for i in range(n_symbols)], dtype=object)
+    base = rng.uniform(50, 3000, n_symbols).round(2)
+
+    sym_idx = rng.integers(0, n_symbols, n_trades)
+    entry = (base[sym_idx] * rng.uniform(0.97, 1.03, n_trades)).round(2)
+    demand = rng.random(n_trades) < 0.5
+    stop = np.where(demand, entry * 0.97, entry * 1.03).round(2)
+    target = np.where(demand, entry * 1.06, entry * 0.94).round(2)
+    status = rng.choice(["Pending", "Active", "Target-Hit", "SL-Hit"], n_trades, p=[0.5, 0.3, 0.1, 0.1])
+    suffix = rng.choice(["", ".NS"], n_trades, p=[0.8, 0.2])
+
+    trades = [TRADES_HEADERS]
+    for i in range(n_trades):
+        name = symbols[sym_idx[i]] + suffix[i]
+        trades.append([
+            str(i + 1), name, str(base[sym_idx[i]]), str(entry[i]), str(stop[i]), str(target[i]),
+            "", str(rng.choice(TRADE_TYPES)), "",
+            "DEMAND" if demand[i] else "SUPPLY",
+            "2024-01-02 10:00" if status[i] != "Pending" else "",
+            "2024-01-05 14:00" if status[i] in ("Target-Hit", "SL-Hit") else "",
+            status[i], "",
+        ])
+
+    held = symbols[: max(1, n_symbols // 5)]
+    portfolio = [PORTFOLIO_HEADERS] + [
+        [s, "2024-01-02", str(round(p * 0.97, 2)), str(round(p * 1.03, 2)), str(p), ""]
+        for s, p in zip(held, base[: len(held)])
+    ]
+    links = [LINKS_HEADERS] + [[s, f"https://trendlyne.com/equity/{s}/"] for s in symbols[::2]]
+
+    # Today's quotes: a drift of up to +-4% around the base price
+    quotes = dict(zip(symbols, (base * rng.uniform(0.96, 1.04, n_symbols)).round(2)))
+    return {"Trades": trades, "Portfolio": portfolio, "Links": links}, quotes
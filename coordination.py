@@ -0,0 +1,134 @@
+import threading
+import time
+
+import numpy as np
+
+
+# ==============================================================================
+#                           SINGLE-FLIGHT RUNS
+# ==============================================================================
+class _Flight:
+    def __init__(self, started):
+        self.started = started
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls of one expensive job across every session in the process.
+
+    A caller arriving while a run is in flight waits for it and gets its result; a run
+    that finished less than `cooldown` seconds ago is reused without calling again.
+    """
+
+    def __init__(self, cooldown=0.0):
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._flight = None
+        self._last = None
+        self.runs = self.joined = self.reused = 0
+
+    def run(self, fn, not_before=None):
+        """
+        `fn()`'s result, possibly shared. `not_before` (a time.monotonic() value) refuses
+        runs that started earlier, for callers that need to see their own write.
+        Returns (result, shared).
+        """
+        while True:
+            with self._lock:
+                flight, leader = self._flight, False
+                if flight is None:
+                    last = self._last
+                    if (last and (not_before is None or last.started >= not_before)
+                            and time.monotonic() - last.finished < self.cooldown):
+                        self.reused += 1
+                        return last.result, True
+                    flight = self._flight = _Flight(time.monotonic())
+                    leader = True
+            if leader: break
+            flight.done.wait()
+            if not_before is None or flight.started >= not_before:
+                with self._lock: self.joined += 1
+                if flight.error is not None: raise flight.error
+                return flight.result, True
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            flight.finished = time.monotonic()
+            with self._lock:
+                self._flight = None
+                self.runs += 1
+                if flight.error is None: self._last = flight
+            flight.done.set()
+        return flight.result, False
+
+    def stats(self):
+        with self._lock:
+            return {"runs": self.runs, "joined": self.joined, "reused": self.reused,
+                    "in_flight": self._flight is not None}
+
+
+class Coalescer:
+    """Identical calls (same `key`) made while one is in flight wait for it and share its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.joined = 0
+
+    def run(self, key, fn):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader: flight = self._flights[key] = _Flight(time.monotonic())
+            else: self.joined += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None: raise flight.error
+            return flight.result
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock: self._flights.pop(key, None)
+            flight.done.set()
+
+
+# ==============================================================================
+#                           ALERT DEDUPLICATION
+# ==============================================================================
+class AlertLedger:
+    """
+    The alert last sent for each (tab, row key), shared by every session in the process.
+
+    `claim` checks and records under one lock, so when several renders see the same
+    new alert only the first one gets to send it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sent = {}
+
+    def claim(self, tab, keys, alerts):
+        """Boolean mask over `keys`/`alerts`: True where this caller should send the alert."""
+        keys, alerts = [str(k) for k in keys], [str(a) for a in alerts]
+        mask = np.zeros(len(keys), dtype=bool)
+        with self._lock:
+            for i, (k, alert) in enumerate(zip(keys, alerts)):
+                if self._sent.get((tab, k)) == alert: continue
+                self._sent[(tab, k)] = alert
+                mask[i] = True
+        return mask
+
+    def __len__(self):
+        return len(self._sent)
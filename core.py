@@ -0,0 +1,500 @@
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+import streamlit as st
+import numpy as np
+import pandas as pd
+
+import metrics
+from bar_store import StoredBarsProvider, get_bar_store
+from coordination import AlertLedger, SingleFlight
+from quote_feed import FeedRunner
+from quotes import (
+    base_symbol, cached_quotes, fetch_cmp_map, live_tickers, quote_times, set_price_provider, to_yf_symbol,
+)
+from sheet_cache import get_sheet_cache
+from sheet_writes import diff_cells, diff_rows
+from sheets_client import get_sheets_guard
+from storage import KEY_COLUMNS, META_TAB, TABS, LocalRepository, SheetSyncer, SheetsRepository, key_text
+from telegram_dispatch import API_BASE as TELEGRAM_API_BASE, TelegramDispatcher
+from trade_engine import (
+    WRITE_COLUMNS, TradeBook, alert_messages, evaluate_trades, filter_trades, frame_from_values, join_links,
+    new_alerts, portfolio_alert_messages, value_portfolio, yf_symbols,
+)
+from trade_io import EXPORT_CHUNK, export_rows, trade_rows, validate_trades
+from trade_snapshot import get_trade_snapshot
+
+# --- CONFIGURATION ---
+SHEET_NAME = "Pro Stock Manager DB"
+CACHE_TTL = 30  # seconds a Trades/Portfolio/Links snapshot is reused across reruns and sessions
+STORAGE_BACKEND = "local"  # "local": SQLite + background sync to the Sheet, "sheets": every call hits Google
+LOCAL_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stock_manager.db")
+SYNC_PUSH_DELAY = 2      # seconds to collect writes before pushing them to the Sheet
+SYNC_PULL_INTERVAL = 60  # seconds between pulls of edits made directly in the Sheet
+TELEGRAM_DIGEST = True   # merge alerts raised in one Dashboard render into one message per chat
+PRICE_SOURCE = "bars"    # "bars": CMP from the local OHLC store (gap-only fetches), "yfinance": fresh 1d download
+BAR_INTERVALS = ("1d",)  # intervals kept on disk for every Trades/Portfolio symbol
+FEED_FLUSH_INTERVAL = 2  # seconds between writes of tick-driven changes when running from a quote feed
+QUOTE_MAX_AGE = 60       # seconds a quote fetched by a refresh is reused for Portfolio valuation
+SCHEMA_VERSION = 3       # bump whenever init_db gains a tab or column migration
+REFRESH_COOLDOWN = 15    # seconds a finished price refresh is reused by other sessions' "Cloud Update"
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+]
+
+
+# ==============================================================================
+#                           GOOGLE SHEETS CONNECTION
+# ==============================================================================
+@st.cache_resource
+def get_gsheet_client():
+    # gspread + google-auth take ~0.3s to import, so only pay for them once a Sheet call is due
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    creds = Credentials.from_service_account_info(
+        st.secrets["gcp_service_account"], scopes=SCOPES
+    )
+    return gspread.authorize(creds)
+
+
+CACHE = get_sheet_cache()
+CACHE.ttl = CACHE_TTL
+if PRICE_SOURCE == "bars": set_price_provider(StoredBarsProvider(get_bar_store()))
+REFRESH = SingleFlight(cooldown=REFRESH_COOLDOWN)  # one price refresh at a time for every session
+ALERTS = AlertLedger()                              # alerts already sent, shared by every session
+_valuation = {}                                     # last Portfolio valuation: key, df, dispatched
+_valuation_lock = threading.Lock()
+
+
+def _open_spreadsheet():
+    import gspread
+
+    try:
+        # Guard outside the instrumentation so every retry is timed and counted against the quota
+        return get_sheets_guard().wrap(metrics.Instrumented(get_gsheet_client())).open(SHEET_NAME)
+    except gspread.exceptions.SpreadsheetNotFound:
+        st.error(f"Spreadsheet '{SHEET_NAME}' not found! Please create it.")
+        st.stop()
+
+
+@metrics.traced("get_db")
+def get_db():
+    return CACHE.spreadsheet(_open_spreadsheet)
+
+
+def get_ws(title):
+    return CACHE.worksheet(get_db(), title)
+
+
+@st.cache_resource
+def get_repo():
+    if STORAGE_BACKEND != "local": return SheetsRepository(get_ws, CACHE)
+    store = LocalRepository(LOCAL_DB_PATH)
+    store.syncer = SheetSyncer(store, get_ws, push_delay=SYNC_PUSH_DELAY, pull_interval=SYNC_PULL_INTERVAL,
+                               on_pushed=CACHE.invalidate)
+    # First run on this machine: seed the local copy from the Sheet
+    empty = [t for t in TABS if store.is_empty(t)]
+    if empty: store.syncer.pull(empty)
+    store.syncer.start()
+    return store
+
+
+# ==============================================================================
+#                           SCHEMA BOOTSTRAP
+# ==============================================================================
+_schema_lock = threading.Lock()
+_schema_ready = None  # SCHEMA_VERSION once this process has checked the tabs
+
+
+def _headers_changed(tab):
+    CACHE.invalidate(tab)
+    if STORAGE_BACKEND == "local": get_repo().syncer.pull([tab])
+
+
+def stored_schema_version():
+    """Version recorded by the last migration on this machine (local backend only)."""
+    if STORAGE_BACKEND != "local" or not os.path.exists(LOCAL_DB_PATH): return None
+    value = get_repo().get_meta("schema_version")
+    return int(value) if value else None
+
+
+def init_db(force=False):
+    """
+    Create missing tabs and columns once per process. Skipped on reruns, and on
+    restarts when the local store already records SCHEMA_VERSION; `force` re-checks
+    the Sheet anyway. Returns True when the Sheet was checked.
+    """
+    global _schema_ready
+    if _schema_ready == SCHEMA_VERSION and not force: return False
+    with _schema_lock:
+        if _schema_ready == SCHEMA_VERSION and not force: return False
+        if force or stored_schema_version() != SCHEMA_VERSION:
+            migrate_schema()
+            if STORAGE_BACKEND == "local": get_repo().set_meta("schema_version", SCHEMA_VERSION)
+        _schema_ready = SCHEMA_VERSION
+        return True
+
+
+@metrics.traced("migrate_schema")
+def migrate_schema():
+    sh = get_db()
+    
+    # 1. TRADES TAB
+    try:
+        ws_trades = get_ws("Trades")
+    except:
+        ws_trades = sh.add_worksheet(title="Trades", rows="100", cols="20")
+        ws_trades.append_row([
+            "id", "stock_name", "cmp", "entry", "stop_loss", "target",
+            "remark", "trade_type", "dv_analysis", "trade_zone",
+            "trigger_date", "exit_date", "status", "last_alert"
+        ])
+
+    # 2. PORTFOLIO TAB
+    try:
+        ws_port = get_ws("Portfolio")
+    except:
+        ws_port = sh.add_worksheet(title="Portfolio", rows="100", cols="10")
+        ws_port.append_row(["stock_name", "date", "stop_loss", "target", "actual_cost", "last_alert"])
+
+    # 3. LINKS TAB
+    try:
+        get_ws("Links")
+    except:
+        ws_links = sh.add_worksheet(title="Links", rows="100", cols="5")
+        ws_links.append_row(["stock_name", "link"])
+
+    # 4. META TAB (id counters for the Sheets backend)
+    try:
+        get_ws(META_TAB)
+    except:
+        ws_meta = sh.add_worksheet(title=META_TAB, rows="20", cols="2")
+        ws_meta.append_row(["key", "value"])
+
+    # Column migrations run once every tab exists, since the local store re-pulls after each
+    headers = ws_trades.row_values(1)
+    if "status" not in headers:
+        ws_trades.update_cell(1, len(headers) + 1, "status")
+        headers = ws_trades.row_values(1)
+        _headers_changed("Trades")
+    if "last_alert" not in headers:
+        ws_trades.update_cell(1, len(headers) + 1, "last_alert")
+        _headers_changed("Trades")
+
+    port_headers = ws_port.row_values(1)
+    if port_headers and "last_alert" not in port_headers:
+        ws_port.update_cell(1, len(port_headers) + 1, "last_alert")
+        _headers_changed("Portfolio")
+
+
+# ==============================================================================
+#                           TELEGRAM FUNCTION
+# ==============================================================================
+@st.cache_resource
+def get_alert_dispatcher():
+    cfg = st.secrets["telegram"]
+    return TelegramDispatcher(cfg["bot_token"], cfg["chat_id"], api_base=cfg.get("api_base", TELEGRAM_API_BASE))
+
+
+def send_telegram_message(message, test_mode=False):
+    if "telegram" not in st.secrets:
+        if test_mode: st.error("Secrets missing!")
+        return
+
+    try:
+        with metrics.stage("telegram"):
+            get_alert_dispatcher().send(message)
+        metrics.record_call("telegram", "send")
+    except Exception as e:
+        print(f"Telegram Error: {e}")
+
+
+def telegram_digest():
+    if not TELEGRAM_DIGEST or "telegram" not in st.secrets: return nullcontext()
+    return get_alert_dispatcher().digest()
+
+
+# ==============================================================================
+#                           TRADES LOGIC
+# ==============================================================================
+@metrics.traced("load trades")
+def get_trades_df():
+    """Typed Trades frame shared by every session; treat it as read-only."""
+    return get_trade_snapshot().frame(get_repo())
+
+
+def update_last_alert_in_db(trade_id, alert_msg):
+    try:
+        get_repo().update_fields("Trades", trade_id, {"last_alert": alert_msg})
+    except Exception as e:
+        print(f"DB Update Error: {e}")
+
+
+def update_last_alerts_in_db(alerts, tab="Trades"):
+    """Persist {row key: alert} for a whole render in one write."""
+    if not alerts: return
+    try:
+        get_repo().update_many(tab, {key: {"last_alert": msg} for key, msg in alerts.items()})
+    except Exception as e:
+        print(f"DB Update Error: {e}")
+
+
+def claim_last_alerts(alerts, tab="Trades"):
+    """
+    Store {row key: alert} as last_alert where the stored one differs; returns {key: previous}
+    for the alerts this process should send. If the store fails, every alert is sent.
+    """
+    if not alerts: return {}
+    try:
+        return get_repo().claim_fields(tab, "last_alert", alerts)
+    except Exception as e:
+        print(f"DB Update Error: {e}")
+        return dict.fromkeys(alerts)
+
+
+@metrics.traced("alerts")
+def dispatch_alerts(df, tab="Trades", key="id", messages=alert_messages):
+    """
+    Send Telegram for every new alert in `df` and remember it; returns the new alert rows.
+    Delivery is at most once: the alert is recorded as sent before the dispatcher queues it,
+    and a message the dispatcher later gives up on is logged there, not retried here.
+    """
+    fresh = new_alerts(df)
+    if fresh.empty: return fresh
+    # last_alert may be a few seconds stale in this snapshot; the ledger decides who sends
+    fresh = fresh[ALERTS.claim(tab, fresh[key], fresh['Alert'])]
+    if fresh.empty: return fresh
+    # The ledger is per process; the stored last_alert settles it between processes
+    keys = fresh[key].map(key_text)
+    claimed = claim_last_alerts(dict(zip(keys, fresh['Alert'])), tab)
+    fresh = fresh[keys.isin(list(claimed)).to_numpy()]
+    if fresh.empty: return fresh
+    with telegram_digest():
+        for tele_msg in messages(fresh): send_telegram_message(tele_msg)
+    return fresh
+
+
+def get_trendlyne_map():
+    try:
+        data = get_repo().records("Links")
+        return {base_symbol(row['stock_name']): row['link'] for row in data}
+    except:
+        return {}
+
+
+@metrics.traced("filter")
+def get_filtered_trades_advanced(f_status, f_zone, f_strat, f_pct):
+    df = filter_trades(get_trades_df(), f_status, f_zone, f_strat, f_pct)
+    if df.empty: return df
+    return join_links(df, get_trendlyne_map())
+
+
+def add_trade(data):
+    repo = get_repo()
+    new_id = repo.next_id("Trades")
+    link = f"https://in.tradingview.com/chart/?symbol=NSE:{base_symbol(data['stock'])}"
+    
+    headers = repo.headers("Trades")
+    
+    row_data = {
+        "id": new_id, "stock_name": data['stock'], "cmp": data['cmp'],
+        "entry": data['entry'], "stop_loss": data['sl'], "target": data['tgt'],
+        "remark": data['remark'], "trade_type": data['type'],
+        "dv_analysis": link, "trade_zone": data['zone'],
+        "trigger_date": "", "exit_date": "", "status": "Pending", "last_alert": ""
+    }
+    
+    final_row = [row_data.get(h, "") for h in headers]
+    repo.append_row("Trades", final_row)
+
+
+@metrics.traced("import trades")
+def import_trades(table, provider=None):
+    """
+    Validate an upload, append every good row in one write with a block of ids, then
+    run a price refresh that starts after the write (joining the shared REFRESH flight,
+    so it never races the daemon's or another session's). Returns (added, rejected rows).
+    """
+    clean, rejected = validate_trades(table)
+    if clean.empty: return 0, rejected
+    repo = get_repo()
+    start = repo.next_id("Trades", len(clean))
+    repo.apply_changes("Trades", inserts=trade_rows(clean, repo.headers("Trades"), start))
+    run_refresh(fresh=True, provider=provider)
+    return len(clean), rejected
+
+
+def export_tab(tab, dest, fmt="csv"):
+    """Stream a tab to CSV or Parquet without building a DataFrame of it. Returns rows written."""
+    repo = get_repo()
+    return export_rows(repo.headers(tab), repo.iter_rows(tab, EXPORT_CHUNK), dest, fmt)
+
+
+def update_trade(trade_id, data):
+    link = f"https://in.tradingview.com/chart/?symbol=NSE:{base_symbol(data['stock'])}"
+    get_repo().update_fields("Trades", trade_id, {
+        "stock_name": data['stock'], "cmp": data['cmp'], "entry": data['entry'],
+        "stop_loss": data['sl'], "target": data['tgt'], "remark": data['remark'],
+        "trade_type": data['type'], "dv_analysis": link, "trade_zone": data['zone'],
+    })
+
+
+def delete_trade(trade_id):
+    get_repo().delete_row("Trades", trade_id)
+
+
+@metrics.traced("refresh")
+def update_prices_logic(provider=None, symbols=None):
+    """
+    Returns (checked, triggered, exited, cells_written, cells_skipped). With `symbols`
+    only trades on those tickers are quoted and evaluated.
+    """
+    repo = get_repo()
+    with metrics.stage("read trades"):
+        all_values = repo.values("Trades", fresh=True)
+    if not all_values: return 0, 0, 0, 0, 0
+    headers = all_values[0]
+
+    try: table = frame_from_values(all_values)
+    except KeyError: return 0, 0, 0, 0, 0
+    col_map = {h: i for i, h in enumerate(headers)}
+
+    # Quote stage: one bulk fetch for every unique live ticker, plus holdings so valuation can reuse it
+    tickers = live_tickers(table['stock_name'], table['status'])
+    if symbols is None:
+        held = [r.get('stock_name') for r in repo.records("Portfolio")]
+        tickers += list(yf_symbols(held))
+    else:
+        wanted = set(yf_symbols(symbols))
+        tickers = [t for t in tickers if t in wanted]
+    cmp_map = fetch_cmp_map(tickers, provider=provider)
+    cmp = [cmp_map.get(to_yf_symbol(n), np.nan) if str(n).strip() else np.nan for n in table['stock_name']]
+
+    # State machine: whole table in one pass
+    with metrics.stage("engine"):
+        res = evaluate_trades(table, cmp)
+
+    # Prepare Batch: only cells that differ from the snapshot
+    cells = {}
+    for col in WRITE_COLUMNS:
+        c = col_map[col]
+        for i in np.flatnonzero(res.write_mask[col].to_numpy()):
+            cells[(i + 2, c)] = res.values[col].iat[i]
+    changed, skipped = diff_cells(all_values, cells)
+
+    # Sent keyed by trade id: rows deleted or moved since the read can't receive another trade's values.
+    # Rows without an id, or sharing one, can't be addressed and are left alone.
+    k = col_map.get(KEY_COLUMNS["Trades"])
+    keys = [key_text(r[k]) if k is not None and len(r) > k else "" for r in all_values]
+    seen = pd.Series(keys[1:]).value_counts()
+    changes = {}
+    for (r, c), v in changed.items():
+        if keys[r - 1] and seen[keys[r - 1]] == 1: changes.setdefault(keys[r - 1], {})[headers[c]] = v
+
+    with metrics.stage("write cells"):
+        found = repo.update_many("Trades", changes) if changes else []
+    written = sum(len(changes[key]) for key in found)
+    return int(res.evaluated.sum()), int(res.triggered.sum()), int(res.exited.sum()), written, skipped
+
+
+def run_refresh(fresh=False, provider=None):
+    """
+    update_prices_logic shared across sessions: joins a refresh already running, or
+    reuses one that finished within REFRESH_COOLDOWN. `fresh` only accepts a run that
+    starts after this call (use it right after a write). Returns (result, shared).
+    """
+    return REFRESH.run(lambda: update_prices_logic(provider), not_before=time.monotonic() if fresh else None)
+
+
+def make_feed_runner(flush_interval=FEED_FLUSH_INTERVAL):
+    """Tick-driven alternative to update_prices_logic: subscribe `runner.on_tick` to a QuoteFeed."""
+    repo = get_repo()
+    book = TradeBook(repo.values("Trades", fresh=True))
+
+    def persist(changes):
+        # last_alert is written by dispatch_alerts when it claims the alert, not on the flush
+        changes = {k: {f: v for f, v in fields.items() if f != "last_alert"} for k, fields in changes.items()}
+        repo.update_many("Trades", {k: fields for k, fields in changes.items() if fields})
+
+    return FeedRunner(book, persist, dispatch_alerts, flush_interval)
+
+
+@metrics.traced("bar history")
+def sync_bar_history(intervals=BAR_INTERVALS):
+    """Bring the on-disk bars of every Trades and Portfolio symbol up to date; returns new bars stored."""
+    repo = get_repo()
+    names = [r.get('stock_name') for tab in ("Trades", "Portfolio") for r in repo.records(tab)]
+    symbols = [s for s in dict.fromkeys(to_yf_symbol(n) for n in names if n is not None) if s]
+    store = get_bar_store()
+    return sum(sum(store.update(symbols, interval).values()) for interval in intervals)
+
+
+# ==============================================================================
+#                           PORTFOLIO FUNCTIONS
+# ==============================================================================
+@metrics.traced("load portfolio")
+def get_portfolio_df():
+    data = get_repo().records("Portfolio")
+    return pd.DataFrame(data)
+
+@metrics.traced("save portfolio")
+def save_portfolio_df(df, original=None):
+    """
+    Write the edits between `original` (as loaded) and `df` as keyed row changes.
+    Returns how many rows changed; 0 means nothing was written.
+    """
+    repo = get_repo()
+    headers = repo.headers("Portfolio") or df.columns.tolist()
+    diff = None
+    if original is not None and 'stock_name' in headers and set(df.columns) <= set(headers):
+        diff = diff_rows(original.reindex(columns=headers).values.tolist(),
+                         df.reindex(columns=headers).values.tolist(), headers, 'stock_name')
+    if diff is None:
+        # No baseline or duplicate names: fall back to rewriting the tab
+        repo.replace_all("Portfolio", [df.columns.values.tolist()] + df.values.tolist())
+        return len(df)
+    updates, inserts, deletes = diff
+    repo.apply_changes("Portfolio", updates, inserts, deletes)
+    return len(updates) + len(inserts) + len(deletes)
+
+@metrics.traced("portfolio valuation")
+def get_portfolio_valuation(df=None, provider=None, refresh=False):
+    """
+    Holdings with CMP, P&L and distance to stop/target. A render values them with the quotes
+    of the last refresh, whatever their age, and never waits on the provider; `refresh` first
+    fetches the quotes older than QUOTE_MAX_AGE. The valued frame is shared until the holdings
+    or one of their quotes change; treat it as read-only.
+    """
+    df = get_portfolio_df() if df is None else df
+    if df.empty or 'stock_name' not in df: return df
+    if refresh: fetch_cmp_map(yf_symbols(df['stock_name']), provider=provider, max_age=QUOTE_MAX_AGE)
+    # Symbols after the fetch: the resolver may have moved a name to BSE
+    symbols = yf_symbols(df['stock_name'])
+    cmp_map = cached_quotes(symbols)
+    key = (int(pd.util.hash_pandas_object(df.astype(str), index=False).sum()), quote_times(symbols))
+    with _valuation_lock:
+        if _valuation.get("key") == key: return _valuation["df"]
+    valued = value_portfolio(df, cmp_map)
+    with _valuation_lock: _valuation.update(key=key, df=valued, dispatched=False)
+    return valued
+
+
+def dispatch_portfolio_alerts(df):
+    """Alerts for a valuation; one already dispatched (a rerun reusing it) sends nothing."""
+    with _valuation_lock:
+        if _valuation.get("df") is df and _valuation.get("dispatched"): return df.iloc[0:0]
+    fresh = dispatch_alerts(df, tab="Portfolio", key="stock_name", messages=portfolio_alert_messages)
+    with _valuation_lock:
+        if _valuation.get("df") is df: _valuation["dispatched"] = True
+    return fresh
+
+
+def add_portfolio_stock(data):
+    get_repo().append_row("Portfolio", [data['name'], data['date'], data['sl'], data['target'], data['cost']])
+
+def delete_portfolio_stock(stock_name):
+    get_repo().delete_row("Portfolio", stock_name)
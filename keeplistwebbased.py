@@ -1,31 +1,112 @@
 import streamlit as st
-import gspread
-from google.oauth2.service_account import Credentials
-import yfinance as yf
 import pandas as pd
 from datetime import datetime
+import io
 import time
-import requests
-
-# --- CONFIGURATION ---
-SHEET_NAME = "Pro Stock Manager DB"
-SCOPES = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive",
-]
+import metrics
+from core import (
+    ALERTS, REFRESH, STORAGE_BACKEND, add_portfolio_stock, add_trade, delete_portfolio_stock, delete_trade,
+    dispatch_alerts, dispatch_portfolio_alerts, export_tab, get_filtered_trades_advanced, get_portfolio_df,
+    get_portfolio_valuation, get_repo, get_trades_df, import_trades, init_db, run_refresh, save_portfolio_df,
+    send_telegram_message, update_trade,
+)
+from price_daemon import monitor_alive, read_status, request_refresh
+from quotes import get_symbol_resolver
+from sheets_client import get_sheets_guard
+from trade_io import read_table
+from trade_engine import PAGE_SIZES, PCT_BANDS, TABLE_COLUMNS, VIEW_COLUMNS, alert_styles, page_of
+from trade_snapshot import get_trade_snapshot
 
 st.set_page_config(page_title="Pro Stock Manager", layout="wide", page_icon="🚀")
+metrics.begin("render")
 
 # ==============================================================================
 #                           THEME & SESSION
 # ==============================================================================
 if 'dark_mode' not in st.session_state: st.session_state.dark_mode = False
 if 'edit_data' not in st.session_state: st.session_state.edit_data = None
-
-# TRACK PREVIOUS ALERTS TO PREVENT REPEATED POPUPS
-if 'previous_alerts' not in st.session_state: st.session_state.previous_alerts = {}
 if 'show_popup' not in st.session_state: st.session_state.show_popup = False
 if 'popup_data' not in st.session_state: st.session_state.popup_data = pd.DataFrame()
+if 'table_columns' not in st.session_state: st.session_state.table_columns = {}  # column -> shown, shared by the trade views
+
+
+def refresh_prices(fresh=False):
+    """
+    Hand the refresh to the background monitor when it's running; otherwise run it here,
+    shared with any other session refreshing at the same time. Returns (result, shared) or None.
+    """
+    if monitor_alive():
+        request_refresh()
+        return None
+    return run_refresh(fresh)
+
+
+def render_diagnostics():
+    """Where this session's previous render spent its time, plus Sheets quota use."""
+    snap = metrics.snapshot()
+    for kind in ("read", "write"):
+        used, limit = snap['quota'][kind], snap['limits'][kind]
+        st.progress(min(used / limit, 1.0), text=f"Sheets {kind}s: {used}/{limit} per min")
+    gs = get_sheets_guard().stats()
+    st.caption(f"Quota guard: {gs['waited_s']}s paced, {gs['retries']} retries, "
+               f"{gs['reads_coalesced']} reads shared, {gs['writes_batched']} writes merged")
+    rs = REFRESH.stats()
+    st.caption(f"Refreshes: {rs['runs']} run, {rs['joined']} joined, {rs['reused']} reused · {len(ALERTS)} alerts tracked")
+    ts = get_trade_snapshot().stats()
+    st.caption(f"Trades snapshot: {ts['rows']} rows, {ts['mb']} MB · {ts['builds']} built, "
+               f"{ts['warm_starts']} from disk, {ts['hits']} shared")
+
+    tr = st.session_state.get('last_trace')
+    if tr is None:
+        st.caption("No render recorded yet.")
+        return
+    st.caption(f"Last render ({tr.tags.get('page', '')}): {tr.duration_ms:.0f} ms")
+    rows = [{"what": k, "type": "stage", "n": n, "ms": round(ms, 1)} for k, (n, ms) in tr.stages.items()]
+    rows += [{"what": k, "type": "call", "n": n, "ms": round(ms, 1)} for k, (n, ms) in tr.calls.items()]
+    if rows:
+        st.dataframe(pd.DataFrame(rows).sort_values("ms", ascending=False), hide_index=True, use_container_width=True)
+
+    if st.button("Re-check Sheet schema"):
+        init_db(force=True)
+        st.toast("Tabs and columns checked.")
+
+
+TABLE_CONFIG = {
+    "dv_analysis": st.column_config.LinkColumn("View Chart", display_text="TradingView"),
+    "Trendlyne": st.column_config.LinkColumn("Fundls", display_text="Trendlyne"),
+    "cmp": st.column_config.NumberColumn(format="%.2f"),
+    "entry": st.column_config.NumberColumn(format="%.2f"),
+    "diff_pct": st.column_config.NumberColumn("% Diff", format="%.2f"),
+    "trigger_date": st.column_config.DatetimeColumn(format="YYYY-MM-DD HH:mm"),
+    "exit_date": st.column_config.DatetimeColumn(format="YYYY-MM-DD HH:mm"),
+}
+
+
+def render_trade_table(df, view, styled=False):
+    """Sorted, paginated trade table; only the visible page is styled and sent to the browser."""
+    available = [c for c in TABLE_COLUMNS if c in df.columns]
+    choices = st.session_state.table_columns
+    shown = [c for c in available if choices.get(c, c in VIEW_COLUMNS[view])]
+
+    t1, t2, t3, t4 = st.columns([5, 2, 1, 1])
+    picked = t1.multiselect("Columns", available, default=shown, key=f"cols_{view}")
+    choices.update({c: c in picked for c in set(picked) ^ set(shown)})  # remember only what the user toggled
+    sort_by = t2.selectbox("Sort by", available, index=available.index('id') if 'id' in available else 0, key=f"sort_{view}")
+    ascending = t3.toggle("Ascending", value=True, key=f"asc_{view}")
+    page_size = t4.selectbox("Rows", PAGE_SIZES, key=f"size_{view}")
+
+    page_key = f"page_{view}"
+    page, n_pages = page_of(df, sort_by, ascending, st.session_state.get(page_key, 1), page_size)
+    if st.session_state.get(page_key, 1) > n_pages: st.session_state[page_key] = n_pages
+
+    cols = [c for c in available if c in picked]
+    table = page[cols]
+    if styled and 'Alert' in page: table = table.style.apply(lambda _: alert_styles(page['Alert'], cols), axis=None)
+    st.dataframe(table, column_config=TABLE_CONFIG, use_container_width=True, hide_index=True)
+
+    p1, p2 = st.columns([1, 5])
+    p1.number_input("Page", min_value=1, max_value=n_pages, key=page_key, label_visibility="collapsed")
+    p2.caption(f"Page {st.session_state[page_key]} of {n_pages} · {len(df)} trades")
 
 
 def apply_theme(is_dark):
@@ -53,363 +134,6 @@ def apply_theme(is_dark):
         """
 
 
-# ==============================================================================
-#                           GOOGLE SHEETS CONNECTION
-# ==============================================================================
-@st.cache_resource
-def get_gsheet_client():
-    creds = Credentials.from_service_account_info(
-        st.secrets["gcp_service_account"], scopes=SCOPES
-    )
-    return gspread.authorize(creds)
-
-
-def get_db():
-    client = get_gsheet_client()
-    try:
-        sh = client.open(SHEET_NAME)
-        return sh
-    except gspread.exceptions.SpreadsheetNotFound:
-        st.error(f"Spreadsheet '{SHEET_NAME}' not found! Please create it.")
-        st.stop()
-
-
-def get_col_letter(col_idx):
-    col_idx += 1
-    letter = ''
-    while col_idx > 0:
-        col_idx, remainder = divmod(col_idx - 1, 26)
-        letter = chr(65 + remainder) + letter
-    return letter
-
-
-def init_db():
-    sh = get_db()
-    
-    # 1. TRADES TAB
-    try:
-        ws_trades = sh.worksheet("Trades")
-    except:
-        ws_trades = sh.add_worksheet(title="Trades", rows="100", cols="20")
-        ws_trades.append_row([
-            "id", "stock_name", "cmp", "entry", "stop_loss", "target",
-            "remark", "trade_type", "dv_analysis", "trade_zone",
-            "trigger_date", "exit_date", "status", "last_alert"
-        ])
-    
-    # Ensure "last_alert" column exists (Migration logic)
-    headers = ws_trades.row_values(1)
-    if "status" not in headers:
-        ws_trades.update_cell(1, len(headers) + 1, "status")
-        headers = ws_trades.row_values(1)
-    if "last_alert" not in headers:
-        ws_trades.update_cell(1, len(headers) + 1, "last_alert")
-
-    # 2. PORTFOLIO TAB
-    try:
-        ws_port = sh.worksheet("Portfolio")
-    except:
-        ws_port = sh.add_worksheet(title="Portfolio", rows="100", cols="10")
-        ws_port.append_row(["stock_name", "date", "stop_loss", "target", "actual_cost"])
-
-    # 3. LINKS TAB
-    try:
-        ws_links = sh.worksheet("Links")
-    except:
-        ws_links = sh.add_worksheet(title="Links", rows="100", cols="5")
-        ws_links.append_row(["stock_name", "link"])
-
-
-# ==============================================================================
-#                           TELEGRAM FUNCTION
-# ==============================================================================
-def send_telegram_message(message, test_mode=False):
-    if "telegram" not in st.secrets:
-        if test_mode: st.error("Secrets missing!")
-        return
-
-    try:
-        bot_token = st.secrets["telegram"]["bot_token"]
-        chat_ids = st.secrets["telegram"]["chat_id"]
-        if not isinstance(chat_ids, list): chat_ids = [str(chat_ids)]
-
-        for cid in chat_ids:
-            url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-            payload = {"chat_id": cid, "text": message, "parse_mode": "Markdown"}
-            requests.post(url, json=payload)
-
-    except Exception as e:
-        print(f"Telegram Error: {e}")
-
-
-# ==============================================================================
-#                           TRADES LOGIC
-# ==============================================================================
-def get_trades_df():
-    sh = get_db()
-    ws = sh.worksheet("Trades")
-    data = ws.get_all_records()
-    df = pd.DataFrame(data)
-
-    if not df.empty:
-        df['id'] = pd.to_numeric(df['id'], errors='coerce')
-        cols = ['cmp', 'entry', 'stop_loss', 'target']
-        for c in cols:
-            df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0.0)
-
-        if 'status' not in df.columns: df['status'] = "Pending"
-        if 'last_alert' not in df.columns: df['last_alert'] = ""
-        
-        df['status'] = df['status'].replace(r'^\s*$', 'Pending', regex=True).fillna('Pending')
-        df['last_alert'] = df['last_alert'].fillna("")
-        
-    return df
-
-
-def update_last_alert_in_db(trade_id, alert_msg):
-    try:
-        sh = get_db()
-        ws = sh.worksheet("Trades")
-        cell = ws.find(str(trade_id), in_column=1)
-        if cell:
-            headers = ws.row_values(1)
-            try:
-                col_idx = headers.index("last_alert") + 1
-                ws.update_cell(cell.row, col_idx, alert_msg)
-            except ValueError:
-                pass 
-    except Exception as e:
-        print(f"DB Update Error: {e}")
-
-
-def get_trendlyne_map():
-    sh = get_db()
-    try:
-        ws = sh.worksheet("Links")
-        data = ws.get_all_records()
-        return {str(row['stock_name']).strip().upper(): row['link'] for row in data}
-    except:
-        return {}
-
-
-def get_filtered_trades_advanced(f_status, f_zone, f_strat, f_pct):
-    df = get_trades_df()
-    if df.empty: return df
-
-    if f_status != "All": df = df[df['status'] == f_status]
-    if f_zone != "All": df = df[df['trade_zone'] == f_zone]
-    if f_strat != "All": df = df[df['trade_type'] == f_strat]
-
-    if df.empty: return df
-
-    def calc_alert(row):
-        # PRIORITY 1: Active
-        if row['status'] == 'Active': return 0.0, "Trade is Active"
-        
-        # PRIORITY 2: Proximity
-        if row['entry'] == 0: return 100, ""
-        diff = abs(row['cmp'] - row['entry'])
-        pct = (diff / row['entry']) * 100
-        
-        if pct <= 0.5: return pct, "Within 0.5% Range"
-        elif pct <= 1.0: return pct, "Within 1% Range"
-        return pct, ""
-
-    df[['diff_pct', 'Alert']] = df.apply(lambda row: pd.Series(calc_alert(row)), axis=1)
-
-    # --- UPDATED RANGE FILTER LOGIC ---
-    if f_pct != "All":
-        if f_pct == "0 - 0.5%":
-            df = df[df['diff_pct'] <= 0.5]
-        elif f_pct == "0.5% - 1%":
-            df = df[(df['diff_pct'] > 0.5) & (df['diff_pct'] <= 1.0)]
-        elif f_pct == "1% - 1.5%":
-            df = df[(df['diff_pct'] > 1.0) & (df['diff_pct'] <= 1.5)]
-        elif f_pct == "1.5% - 2%":
-            df = df[(df['diff_pct'] > 1.5) & (df['diff_pct'] <= 2.0)]
-        elif f_pct == "2% - 2.5%":
-            df = df[(df['diff_pct'] > 2.0) & (df['diff_pct'] <= 2.5)]
-        elif f_pct == "2.5% - 3%":
-            df = df[(df['diff_pct'] > 2.5) & (df['diff_pct'] <= 3.0)]
-
-    link_map = get_trendlyne_map()
-    df['Trendlyne'] = df['stock_name'].apply(lambda x: link_map.get(str(x).replace('.NS','').strip().upper()))
-    return df
-
-
-def get_next_id(df):
-    if df.empty or 'id' not in df.columns: return 1
-    try: return int(pd.to_numeric(df['id'], errors='coerce').max()) + 1
-    except: return 1
-
-
-def add_trade(data):
-    sh = get_db()
-    ws = sh.worksheet("Trades")
-    df = pd.DataFrame(ws.get_all_records())
-    new_id = get_next_id(df)
-    clean_stock = data['stock'].replace('.NS', '').replace('.BO', '')
-    link = f"https://in.tradingview.com/chart/?symbol=NSE:{clean_stock}"
-    
-    headers = ws.row_values(1)
-    
-    row_data = {
-        "id": new_id, "stock_name": data['stock'], "cmp": data['cmp'],
-        "entry": data['entry'], "stop_loss": data['sl'], "target": data['tgt'],
-        "remark": data['remark'], "trade_type": data['type'],
-        "dv_analysis": link, "trade_zone": data['zone'],
-        "trigger_date": "", "exit_date": "", "status": "Pending", "last_alert": ""
-    }
-    
-    final_row = [row_data.get(h, "") for h in headers]
-    ws.append_row(final_row)
-
-
-def update_trade(trade_id, data):
-    sh = get_db()
-    ws = sh.worksheet("Trades")
-    cell = ws.find(str(trade_id), in_column=1)
-    if cell:
-        clean_stock = data['stock'].replace('.NS', '').replace('.BO', '')
-        link = f"https://in.tradingview.com/chart/?symbol=NSE:{clean_stock}"
-        r = cell.row
-        ws.update_cell(r, 2, data['stock'])
-        ws.update_cell(r, 3, data['cmp'])
-        ws.update_cell(r, 4, data['entry'])
-        ws.update_cell(r, 5, data['sl'])
-        ws.update_cell(r, 6, data['tgt'])
-        ws.update_cell(r, 7, data['remark'])
-        ws.update_cell(r, 8, data['type'])
-        ws.update_cell(r, 9, link)
-        ws.update_cell(r, 10, data['zone'])
-
-
-def delete_trade(trade_id):
-    sh = get_db()
-    ws = sh.worksheet("Trades")
-    cell = ws.find(str(trade_id), in_column=1)
-    if cell: ws.delete_rows(cell.row)
-
-
-def update_prices_logic():
-    sh = get_db()
-    ws = sh.worksheet("Trades")
-    all_values = ws.get_all_values()
-    if not all_values: return 0, 0, 0
-    headers = all_values[0]
-    rows = all_values[1:]
-    
-    try:
-        col_map = {h: i for i, h in enumerate(headers)}
-        idx_stock = col_map["stock_name"]
-        idx_cmp = col_map["cmp"]
-        idx_entry = col_map["entry"]
-        idx_sl = col_map["stop_loss"]
-        idx_tgt = col_map["target"]
-        idx_trig = col_map["trigger_date"]
-        idx_exit = col_map["exit_date"]
-        idx_zone = col_map["trade_zone"]
-        idx_status = col_map["status"]
-    except KeyError: return 0, 0, 0
-    
-    updates = []
-    count = 0; new_triggers = 0; new_exits = 0
-    
-    def to_float(val):
-        try: return float(str(val).replace(',', '').strip())
-        except: return 0.0
-
-    for i, row in enumerate(rows):
-        row_num = i + 2
-        name = row[idx_stock]
-        if not name: continue
-        try:
-            current_status = row[idx_status].strip() if len(row) > idx_status else "Pending"
-            if not current_status: current_status = "Pending"
-            if current_status in ["Target-Hit", "SL-Hit"]: continue
-
-            tkr = name + ".NS" if not name.endswith((".NS", ".BO")) else name
-            data = yf.Ticker(tkr).history(period="1d")
-            if data.empty: continue
-            cmp_val = round(data['Close'].iloc[-1], 2)
-            
-            entry = to_float(row[idx_entry])
-            sl, tgt = to_float(row[idx_sl]), to_float(row[idx_tgt])
-            zone = row[idx_zone].strip()
-            
-            new_status = current_status
-            new_trig = row[idx_trig]
-            new_exit = row[idx_exit]
-            changed = False
-
-            # Logic
-            if new_status == "Pending":
-                triggered = False
-                if zone == "DEMAND" and cmp_val <= entry and entry > 0: triggered = True
-                elif zone == "SUPPLY" and cmp_val >= entry and entry > 0: triggered = True
-                
-                if triggered:
-                    new_status = "Active"
-                    new_trig = datetime.now().strftime("%Y-%m-%d %H:%M")
-                    new_triggers += 1; changed = True
-
-            elif new_status == "Active":
-                hit = False
-                if zone == "DEMAND":
-                    if cmp_val >= tgt and tgt > 0: new_status = "Target-Hit"; hit = True
-                    elif cmp_val <= sl and sl > 0: new_status = "SL-Hit"; hit = True
-                elif zone == "SUPPLY":
-                    if cmp_val <= tgt and tgt > 0: new_status = "Target-Hit"; hit = True
-                    elif cmp_val >= sl and sl > 0: new_status = "SL-Hit"; hit = True
-                if hit:
-                    new_exit = datetime.now().strftime("%Y-%m-%d %H:%M"); new_exits += 1; changed = True
-
-            # Prepare Batch
-            col_cmp_letter = get_col_letter(idx_cmp)
-            updates.append({'range': f'{col_cmp_letter}{row_num}', 'values': [[cmp_val]]})
-            
-            if changed or row[idx_status].strip() == "":
-                updates.append({'range': f'{get_col_letter(idx_status)}{row_num}', 'values': [[new_status]]})
-            
-            if changed:
-                updates.append({'range': f'{get_col_letter(idx_trig)}{row_num}', 'values': [[new_trig]]})
-                updates.append({'range': f'{get_col_letter(idx_exit)}{row_num}', 'values': [[new_exit]]})
-                
-            count += 1
-        except Exception: pass
-        
-    if updates: ws.batch_update(updates)
-    return count, new_triggers, new_exits
-
-
-# ==============================================================================
-#                           PORTFOLIO FUNCTIONS
-# ==============================================================================
-def get_portfolio_df():
-    sh = get_db()
-    ws = sh.worksheet("Portfolio")
-    data = ws.get_all_records()
-    return pd.DataFrame(data)
-
-def save_portfolio_df(df):
-    sh = get_db()
-    ws = sh.worksheet("Portfolio")
-    ws.clear()
-    data_to_save = [df.columns.values.tolist()] + df.values.tolist()
-    ws.update(range_name='A1', values=data_to_save)
-
-def add_portfolio_stock(data):
-    sh = get_db()
-    ws = sh.worksheet("Portfolio")
-    ws.append_row([data['name'], data['date'], data['sl'], data['target'], data['cost']])
-
-def delete_portfolio_stock(stock_name):
-    sh = get_db()
-    ws = sh.worksheet("Portfolio")
-    cell = ws.find(stock_name, in_column=1)
-    if cell: ws.delete_rows(cell.row)
-
-
 # ==============================================================================
 #                           UI POPUP COMPONENT
 # ==============================================================================
@@ -427,18 +151,38 @@ def show_alert_popup(alert_df):
 # ==============================================================================
 #                                   UI MAIN
 # ==============================================================================
-init_db()
+with metrics.stage("init_db"): init_db()
 if 'last_refresh' not in st.session_state: st.session_state.last_refresh = time.time()
 
 with st.sidebar:
     st.markdown("### 🧭 Navigation")
     nav_option = st.radio("Main Navigation", ["Dashboard", "Live Trades", "Past Trades", "Portfolio Watch"], label_visibility="collapsed")
+    metrics.current().tags['page'] = nav_option
     st.markdown("---")
     
     # --- TEST BUTTON ---
     if st.button("📢 Test Telegram"):
         send_telegram_message("✅ *Test Message!* Bot is working.", test_mode=True)
     
+    if STORAGE_BACKEND == "local":
+        repo = get_repo()
+        last_push = f" · last push {datetime.fromtimestamp(repo.syncer.last_push):%H:%M:%S}" if repo.syncer.last_push else ""
+        st.caption(f"☁️ Sheet sync: {repo.pending()} pending{last_push}")
+        if repo.syncer.last_error: st.caption(f"⚠️ {repo.syncer.last_error}")
+        conflict = repo.get_meta("sync_conflict")
+        if conflict: st.caption(f"🔀 {conflict}")
+
+    monitor = read_status()
+    if monitor_alive(monitor):
+        last_run = f"{datetime.fromtimestamp(monitor['last_run']):%H:%M:%S}" if monitor.get('last_run') else "—"
+        st.caption(f"🤖 Monitor: last run {last_run} · {monitor.get('checked', 0)} checked, "
+                   f"{monitor.get('triggered', 0)} activated, {monitor.get('exited', 0)} closed")
+        if monitor.get('last_error'): st.caption(f"⚠️ {monitor['last_error']}")
+    else:
+        st.caption("🤖 Monitor offline: start `python price_daemon.py` for background refresh and alerts")
+
+    if st.toggle("🩺 Diagnostics", value=False): render_diagnostics()
+
     st.markdown("---")
     is_dark = st.toggle("🌙 Dark Mode", value=False)
     st.markdown(apply_theme(is_dark), unsafe_allow_html=True)
@@ -464,11 +208,18 @@ with col_h1:
     st.markdown(f"""<div class='main-header'>📈 {nav_option}</div><div class='sub-header'>{sub_text}</div>""", unsafe_allow_html=True)
 
 with col_h2:
+    # Portfolio renders value holdings with the last refresh's quotes; only this button fetches
+    refresh_quotes = nav_option == "Portfolio Watch" and st.button("↻ Refresh Quotes")
     if nav_option != "Portfolio Watch":
         if st.button("↻ Cloud Update"):
             with st.spinner("Updating Prices & Status..."):
-                c, trig, ex = update_prices_logic()
-            st.toast(f"Checked {c} stocks. {trig} Activated, {ex} Closed.")
+                result = refresh_prices()
+            if result is None:
+                st.toast("Refresh requested. The monitor will update prices shortly.")
+            else:
+                (c, trig, ex, written, skipped), shared = result
+                note = " (shared with a refresh that just ran)" if shared else ""
+                st.toast(f"Checked {c} stocks. {trig} Activated, {ex} Closed. {written} cells written, {skipped} unchanged.{note}")
             st.session_state.last_refresh = time.time()
             time.sleep(1)
             st.rerun()
@@ -482,8 +233,18 @@ if nav_option == "Dashboard":
     with f3: f_strat = st.selectbox("Strategy", ["All", "QIT", "MIT", "WIT", "DIT"], index=0)
     
     # --- UPDATED DROPDOWN OPTIONS ---
-    pct_options = ["All", "0 - 0.5%", "0.5% - 1%", "1% - 1.5%", "1.5% - 2%", "2% - 2.5%", "2.5% - 3%"]
+    pct_options = ["All"] + list(PCT_BANDS)
     with f4: f_pct = st.selectbox("% CMP Diff", pct_options, index=0)
+
+    unresolved = get_symbol_resolver().unresolved()
+    if unresolved:
+        with st.expander(f"⚠️ {len(unresolved)} symbols without quotes on NSE or BSE"):
+            st.dataframe(pd.DataFrame([
+                {"stock": b, "tried": ", ".join(e.get("tried", [])), "attempts": e.get("attempts", 1),
+                 "retry after": datetime.fromtimestamp(e.get("retry_after", 0)).strftime("%d %b %H:%M")}
+                for b, e in sorted(unresolved.items())
+            ]), hide_index=True, use_container_width=True)
+            if st.button("Retry on next refresh"): get_symbol_resolver().forget(); st.rerun()
     
     st.markdown("---")
 
@@ -499,9 +260,19 @@ if nav_option == "Dashboard":
                 fc, fr = st.text_input("CMP"), st.text_input("Remark")
                 if st.form_submit_button("Save") and fst:
                     add_trade({"stock": fst.upper(), "cmp": fc, "entry": fe, "sl": fs, "tgt": ftg, "remark": fr, "type": ft, "zone": fz})
-                    with st.spinner("Processing..."): update_prices_logic()
+                    with st.spinner("Processing..."): refresh_prices(fresh=True)
                     st.success("Added!"); st.rerun()
 
+        with st.expander("📥 Bulk Import"):
+            upload = st.file_uploader("Watchlist (CSV / Excel)", type=["csv", "xlsx", "xls"])
+            st.caption("Columns: stock, entry, sl, tgt, type, zone (blank zone is read off the levels), cmp, remark")
+            if upload is not None and st.button("Import Trades"):
+                with st.spinner("Validating & importing..."): added, rejected = import_trades(read_table(upload))
+                st.success(f"{added} trades added.")
+                if len(rejected):
+                    st.warning(f"{len(rejected)} rows rejected:")
+                    st.dataframe(rejected, hide_index=True, use_container_width=True)
+
     with c2:
         with st.expander("✏️ Edit Trade"):
             eid = st.number_input("ID", min_value=1, step=1)
@@ -522,57 +293,34 @@ if nav_option == "Dashboard":
                     ec, er = st.text_input("CMP", t['cmp']), st.text_input("Remark", t['remark'])
                     if st.form_submit_button("Update"):
                         update_trade(t['id'], {"stock": est, "cmp": ec, "entry": ee, "sl": es, "tgt": etg, "remark": er, "type": et, "zone": ez})
-                        st.session_state.edit_data = None; update_prices_logic(); st.success("Updated!"); st.rerun()
+                        st.session_state.edit_data = None; refresh_prices(fresh=True); st.success("Updated!"); st.rerun()
+
+        with st.expander("📤 Export"):
+            x1, x2 = st.columns(2)
+            x_tab = x1.selectbox("Tab", ["Trades", "Portfolio"])
+            x_fmt = x2.selectbox("Format", ["csv", "parquet"])
+            if st.button("Prepare File"):
+                buf = io.BytesIO()
+                export_tab(x_tab, buf, x_fmt)
+                st.session_state.export_file = (f"{x_tab.lower()}.{x_fmt}", buf.getvalue())
+            if st.session_state.get('export_file'):
+                fname, data = st.session_state.export_file
+                st.download_button(f"⬇️ {fname}", data, file_name=fname)
 
     df = get_filtered_trades_advanced(f_status, f_zone, f_strat, f_pct)
 
     if not df.empty:
         # --- ROBUST ALERT SYSTEM ---
-        new_popup_alerts = []
-        
-        for idx, row in df.iterrows():
-            curr_alert = row['Alert']
-            last_alert = row['last_alert']
-            
-            if curr_alert != "" and curr_alert != last_alert:
-                new_popup_alerts.append(row)
-                
-                tele_msg = (
-                    f"🚀 *STOCK ALERT: {row['stock_name']}*\n"
-                    f"⚠️ Status: {curr_alert}\n"
-                    f"💰 CMP: {row['cmp']}\n"
-                    f"🎯 Entry: {row['entry']}\n"
-                    f"📊 Type: {row['trade_type']}"
-                )
-                send_telegram_message(tele_msg)
-                
-                update_last_alert_in_db(row['id'], curr_alert)
-
-        if new_popup_alerts:
-            st.session_state.popup_data = pd.DataFrame(new_popup_alerts)
+        fresh = dispatch_alerts(df)
+
+        if not fresh.empty:
+            st.session_state.popup_data = fresh
             st.session_state.show_popup = True
 
         if st.session_state.show_popup and not st.session_state.popup_data.empty:
             show_alert_popup(st.session_state.popup_data)
 
-        def highlight_alerts(row):
-            styles = [''] * len(row)
-            if row['Alert'] == "Trade is Active": return ['background-color: #4caf50; color: white; font-weight: bold'] * len(row)
-            elif row['Alert'] == "Within 0.5% Range": return ['background-color: #ffeb3b; color: black'] * len(row)
-            elif row['Alert'] == "Within 1% Range": return ['background-color: #90caf9; color: black'] * len(row)
-            return styles
-
-        st.dataframe(
-            df[['id', 'Alert', 'trade_type', 'status', 'stock_name', 'trade_zone', 'cmp', 'entry', 'stop_loss', 'target', 'dv_analysis', 'Trendlyne']]
-            .style.apply(highlight_alerts, axis=1),
-            column_config={
-                "dv_analysis": st.column_config.LinkColumn("View Chart", display_text="TradingView"),
-                "Trendlyne": st.column_config.LinkColumn("Fundls", display_text="Trendlyne"),
-                "cmp": st.column_config.NumberColumn(format="%.2f"),
-                "entry": st.column_config.NumberColumn(format="%.2f")
-            },
-            use_container_width=True, hide_index=True
-        )
+        with metrics.stage("table"): render_trade_table(df, "Dashboard", styled=True)
 
         with st.expander("🗑 Delete"):
             did = st.number_input("Del ID", min_value=0)
@@ -584,7 +332,7 @@ elif nav_option == "Live Trades":
     df_live = get_trades_df()
     df_live = df_live[df_live['status'] == 'Active']
     if not df_live.empty:
-        st.dataframe(df_live[['id', 'status', 'stock_name', 'cmp', 'entry', 'stop_loss', 'target', 'dv_analysis']], use_container_width=True, hide_index=True)
+        render_trade_table(df_live, "Live Trades")
     else:
         st.success("No Active trades.")
 
@@ -592,17 +340,40 @@ elif nav_option == "Past Trades":
     df_past = get_trades_df()
     df_past = df_past[df_past['status'].isin(['Target-Hit', 'SL-Hit'])]
     if not df_past.empty:
-        st.dataframe(df_past[['id', 'status', 'stock_name', 'cmp', 'stop_loss', 'target', 'exit_date']], use_container_width=True, hide_index=True)
+        render_trade_table(df_past, "Past Trades")
     else:
         st.info("No History.")
 
 elif nav_option == "Portfolio Watch":
     df_port = get_portfolio_df()
-    edited_df = st.data_editor(df_port, num_rows="dynamic", use_container_width=True)
-    if not edited_df.equals(df_port):
-        save_portfolio_df(edited_df)
-        st.toast("Saved!")
+    if not df_port.empty:
+        valued = get_portfolio_valuation(df_port, refresh=refresh_quotes)
+        dispatch_portfolio_alerts(valued)
+        qty = pd.to_numeric(valued['qty'], errors='coerce').fillna(1) if 'qty' in valued else 1
+        quoted = valued['cmp'].notna()
+        invested = (pd.to_numeric(valued['actual_cost'], errors='coerce').fillna(0) * qty)[quoted].sum()
+        pnl = valued['pnl'][quoted].sum()
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Invested", f"{invested:,.2f}")
+        m2.metric("Market Value", f"{invested + pnl:,.2f}")
+        m3.metric("P&L", f"{pnl:,.2f}", f"{pnl / invested * 100:.2f}%" if invested else None)
+        if not quoted.any(): st.caption("No quotes yet: press ↻ Refresh Quotes.")
+        pct = st.column_config.NumberColumn(format="%.2f%%")
+        st.dataframe(
+            valued.drop(columns=['last_alert'], errors='ignore'), use_container_width=True, hide_index=True,
+            column_config={
+                "cmp": st.column_config.NumberColumn("CMP", format="%.2f"),
+                "pnl": st.column_config.NumberColumn("P&L", format="%.2f"),
+                "pnl_pct": st.column_config.NumberColumn("P&L %", format="%.2f%%"),
+                "to_stop_pct": pct, "to_target_pct": pct,
+            },
+        )
+    with st.expander("✏️ Edit Holdings"):
+        edited_df = st.data_editor(df_port, num_rows="dynamic", use_container_width=True)
+        if save_portfolio_df(edited_df, df_port): st.toast("Saved!")
     with st.expander("Delete Stock"):
         if not df_port.empty:
             ds = st.selectbox("Stock", df_port['stock_name'].tolist())
             if st.button("Delete"): delete_portfolio_stock(ds); st.rerun()
+
+st.session_state.last_trace = metrics.end()
@@ -0,0 +1,207 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+# --- CONFIGURATION ---
+QUOTA_WINDOW = 60          # seconds; Google counts Sheets requests per minute
+SHEETS_READ_QUOTA = 60     # read requests per minute per user
+SHEETS_WRITE_QUOTA = 60    # write requests per minute per user
+KEEP_TRACES = 50           # finished traces kept in memory for the diagnostics panel
+LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perf_log.jsonl")  # None disables
+LOG_MAX_BYTES = 5 * 1024 * 1024  # rotate to .1 past this size
+
+SHEETS_READS = {"open", "worksheet", "worksheets", "get_all_values", "get_all_records", "get_values",
+                "row_values", "col_values", "find", "findall", "acell", "cell"}
+
+
+# ==============================================================================
+#                           TRACES
+# ==============================================================================
+class Trace:
+    """
+    Timings for one unit of work (a Dashboard render, a price refresh).
+
+    `stages` and `calls` map a name to [count, total ms]; stages are code sections,
+    calls are external requests (Sheets, quotes, Telegram).
+    """
+
+    def __init__(self, name, **tags):
+        self.name = name
+        self.tags = tags
+        self.started = time.time()
+        self.duration_ms = None
+        self.stages = {}
+        self.calls = {}
+        self._t0 = time.perf_counter()
+
+    @staticmethod
+    def _add(bucket, key, ms, n=1):
+        entry = bucket.setdefault(key, [0, 0.0])
+        entry[0] += n
+        entry[1] += ms
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self._t0) * 1e3
+        return self
+
+    def as_dict(self):
+        return {
+            "trace": self.name, "started": self.started, "ms": round(self.duration_ms or 0.0, 2), **self.tags,
+            "stages": {k: {"n": n, "ms": round(ms, 2)} for k, (n, ms) in self.stages.items()},
+            "calls": {k: {"n": n, "ms": round(ms, 2)} for k, (n, ms) in self.calls.items()},
+        }
+
+
+_local = threading.local()
+_lock = threading.Lock()
+_recent = deque(maxlen=KEEP_TRACES)
+totals = Counter()  # process-wide "kind.method" -> calls, including background threads
+
+
+def current():
+    return getattr(_local, 'trace', None)
+
+
+def begin(name, **tags):
+    """Start a trace on this thread; an unfinished one left by an interrupted run is closed first."""
+    if current() is not None: end(interrupted=True)
+    _local.trace = Trace(name, **tags)
+    return _local.trace
+
+
+def end(**tags):
+    tr = current()
+    if tr is None: return None
+    _local.trace = None
+    tr.tags.update(tags)
+    tr.finish()
+    with _lock: _recent.append(tr)
+    _log(tr.as_dict())
+    return tr
+
+
+@contextmanager
+def stage(name):
+    tr = current()
+    t0 = time.perf_counter()
+    try:
+        yield tr
+    finally:
+        if tr is not None: tr._add(tr.stages, name, (time.perf_counter() - t0) * 1e3)
+
+
+@contextmanager
+def trace(name, **tags):
+    """A trace of its own, or just a stage when one is already running on this thread."""
+    if current() is not None:
+        with stage(name) as tr: yield tr
+        return
+    tr = begin(name, **tags)
+    try:
+        yield tr
+    finally:
+        end()
+
+
+def traced(name):
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with trace(name): return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def recent(name=None):
+    with _lock: return [t for t in _recent if name is None or t.name == name]
+
+
+# ==============================================================================
+#                           CALL ACCOUNTING
+# ==============================================================================
+class QuotaTracker:
+    """Sheets requests in the last `window` seconds, split into reads and writes (this process only)."""
+
+    def __init__(self, window=QUOTA_WINDOW):
+        self.window = window
+        self._events = deque()
+        self._lock = threading.Lock()
+
+    def record(self, kind, n=1):
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(n): self._events.append((now, kind))
+            self._prune(now)
+
+    def _prune(self, now):
+        while self._events and now - self._events[0][0] > self.window: self._events.popleft()
+
+    def usage(self):
+        with self._lock:
+            self._prune(time.monotonic())
+            out = Counter(kind for _, kind in self._events)
+        return {"read": out["read"], "write": out["write"]}
+
+
+quota = QuotaTracker()
+
+
+def record_call(kind, method, ms=0.0, n=1):
+    key = f"{kind}.{method}"
+    with _lock: totals[key] += n
+    tr = current()
+    if tr is not None: tr._add(tr.calls, key, ms, n)
+    if kind == "sheets": quota.record("read" if method in SHEETS_READS else "write", n)
+
+
+class Instrumented:
+    """Proxy that times and counts every method call on a gspread client, Spreadsheet or Worksheet."""
+
+    def __init__(self, target, kind="sheets"):
+        self._target = target
+        self._kind = kind
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name.startswith("_") or not callable(attr): return attr
+
+        def call(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                out = attr(*args, **kwargs)
+            finally:
+                record_call(self._kind, name, (time.perf_counter() - t0) * 1e3)
+            # Handles fetched through an instrumented parent are instrumented too
+            if name in ("open", "worksheet", "add_worksheet"): return Instrumented(out, self._kind)
+            if name == "worksheets": return [Instrumented(w, self._kind) for w in out]
+            return out
+        return call
+
+    def __repr__(self):
+        return f"Instrumented({self._target!r})"
+
+
+def snapshot():
+    """Everything the diagnostics panel shows."""
+    usage = quota.usage()
+    with _lock: calls = dict(totals)
+    return {"quota": usage, "limits": {"read": SHEETS_READ_QUOTA, "write": SHEETS_WRITE_QUOTA}, "totals": calls}
+
+
+# ==============================================================================
+#                           JSON LOG
+# ==============================================================================
+def _log(record):
+    if not LOG_PATH: return
+    try:
+        line = json.dumps(record, default=str)
+        with _lock:
+            if os.path.exists(LOG_PATH) and os.path.getsize(LOG_PATH) > LOG_MAX_BYTES:
+                os.replace(LOG_PATH, f"{LOG_PATH}.1")
+            with open(LOG_PATH, "a", encoding="utf-8") as f: f.write(line + "\n")
+    except OSError as e:
+        print(f"Metrics Log Error: {e}")
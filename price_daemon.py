@@ -0,0 +1,223 @@
+"""
+Headless price monitor.
+
+    python price_daemon.py            # run forever on the market-hours schedule
+    python price_daemon.py --once     # one refresh + alert pass, then exit
+    python price_daemon.py --replay ticks.csv [--speed 10]   # drive trades from recorded ticks
+
+Runs the same update_prices_logic / alert path as the Dashboard, polls often
+while NSE is open and idles outside market hours, weekends and the exchange
+holidays listed in market_holidays.txt. Progress is written to a
+small JSON status file that the Streamlit app reads; the app asks for an
+immediate run by dropping a request file instead of refreshing inline.
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta, time as dtime
+from zoneinfo import ZoneInfo
+
+import metrics
+
+# --- CONFIGURATION ---
+IST = ZoneInfo("Asia/Kolkata")
+MARKET_OPEN = dtime(9, 15)
+MARKET_CLOSE = dtime(15, 30)
+MARKET_INTERVAL = 60        # seconds between refreshes while the market is open
+OFF_HOURS_INTERVAL = 3600   # longest sleep outside market hours
+TICK = 2                    # seconds between checks for refresh requests from the UI
+STALE_AFTER = 120           # UI treats the monitor as offline after this long without a heartbeat
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+STATUS_PATH = os.path.join(_HERE, "daemon_status.json")
+REQUEST_PATH = os.path.join(_HERE, "daemon_refresh.request")
+HOLIDAYS_PATH = os.path.join(_HERE, "market_holidays.txt")
+
+
+# ==============================================================================
+#                           MARKET CLOCK
+# ==============================================================================
+def load_holidays(path=HOLIDAYS_PATH):
+    """NSE trading holidays from `path`: one YYYY-MM-DD per line, '#' starts a comment."""
+    try:
+        with open(path, encoding="utf-8") as f: lines = f.read().splitlines()
+    except OSError:
+        return set()
+    days = set()
+    for n, line in enumerate(lines, start=1):
+        day = line.split("#", 1)[0].strip()
+        if not day: continue
+        try: days.add(datetime.strptime(day, "%Y-%m-%d").strftime("%Y-%m-%d"))
+        except ValueError: raise ValueError(f"{path}:{n}: expected YYYY-MM-DD, got {day!r}") from None
+    return days
+
+
+MARKET_HOLIDAYS = load_holidays()
+
+
+def is_trading_day(d):
+    return d.weekday() < 5 and d.strftime("%Y-%m-%d") not in MARKET_HOLIDAYS
+
+
+def market_is_open(now=None):
+    now = (now or datetime.now(IST)).astimezone(IST)
+    return is_trading_day(now.date()) and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def next_market_open(now=None):
+    now = (now or datetime.now(IST)).astimezone(IST)
+    d = now.date()
+    if now.time() >= MARKET_OPEN: d += timedelta(days=1)
+    while not is_trading_day(d): d += timedelta(days=1)
+    return datetime.combine(d, MARKET_OPEN, tzinfo=IST)
+
+
+def seconds_until_next_run(now=None, last_run=None):
+    """0 when a run is due now, otherwise how long to wait."""
+    now = (now or datetime.now(IST)).astimezone(IST)
+    if last_run is None: return 0.0
+    last_run = last_run.astimezone(IST)
+
+    if market_is_open(now):
+        return max(0.0, MARKET_INTERVAL - (now - last_run).total_seconds())
+
+    # One pass after the bell so closing prices land, then sleep towards the next open
+    close_today = datetime.combine(now.date(), MARKET_CLOSE, tzinfo=IST)
+    if is_trading_day(now.date()) and now >= close_today and last_run < close_today:
+        return 0.0
+    return min(OFF_HOURS_INTERVAL, (next_market_open(now) - now).total_seconds())
+
+
+# ==============================================================================
+#                           STATUS / REQUEST FILES
+# ==============================================================================
+def read_status(path=STATUS_PATH):
+    try:
+        with open(path, encoding="utf-8") as f: return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_status(status, path=STATUS_PATH):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f: json.dump(status, f)
+    os.replace(tmp, path)
+
+
+def monitor_alive(status=None):
+    status = read_status() if status is None else status
+    return time.time() - status.get("heartbeat", 0) < STALE_AFTER
+
+
+def request_refresh(path=REQUEST_PATH):
+    with open(path, "w", encoding="utf-8") as f: f.write(str(time.time()))
+
+
+def take_refresh_request(path=REQUEST_PATH):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+# ==============================================================================
+#                           MONITOR LOOP
+# ==============================================================================
+def run_cycle(provider=None):
+    """One refresh + alert pass over every trade. Returns a summary dict."""
+    from core import (
+        dispatch_alerts, dispatch_portfolio_alerts, get_filtered_trades_advanced, get_portfolio_valuation,
+        sync_bar_history, update_prices_logic,
+    )
+
+    t0 = time.perf_counter()
+    with metrics.trace("monitor"):
+        checked, triggered, exited, written, skipped = update_prices_logic(provider)
+        alerts = dispatch_alerts(get_filtered_trades_advanced("All", "All", "All", "All"))
+        holdings = dispatch_portfolio_alerts(get_portfolio_valuation(provider=provider, refresh=True))
+        bars = sync_bar_history()
+    return {
+        "checked": checked, "triggered": triggered, "exited": exited,
+        "cells_written": written, "cells_skipped": skipped,
+        "alerts": int(len(alerts)) + int(len(holdings)), "bars": bars, "duration": round(time.perf_counter() - t0, 3),
+    }
+
+
+def run_replay(path, speed=None):
+    """Feed recorded ticks through the tick-by-tick evaluator. Returns latency stats."""
+    from core import make_feed_runner
+    from quote_feed import ReplayFeed
+
+    runner = make_feed_runner()
+    feed = ReplayFeed(path, speed)
+    feed.subscribe(runner.on_tick)
+    with metrics.trace("replay"):
+        feed.run()
+        runner.flush()
+    return runner.stats()
+
+
+def shutdown():
+    """Flush queued Sheet writes and Telegram messages before the process exits."""
+    import streamlit as st
+    from core import STORAGE_BACKEND, get_alert_dispatcher, get_repo
+
+    if "telegram" in st.secrets: get_alert_dispatcher().drain(timeout=60)
+    if STORAGE_BACKEND == "local": get_repo().syncer.stop(flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless price and alert monitor for Pro Stock Manager.")
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    parser.add_argument("--replay", metavar="PATH", help="replay a ts,symbol,price tick file instead of polling")
+    parser.add_argument("--speed", type=float, help="replay pacing as a multiple of real time (default: flat out)")
+    args = parser.parse_args(argv)
+
+    from core import init_db
+    init_db()
+
+    year = str(datetime.now(IST).year)
+    if not any(d.startswith(year) for d in MARKET_HOLIDAYS):
+        print(f"Monitor Warning: {HOLIDAYS_PATH} lists no NSE holidays for {year}; "
+              "the monitor will poll and alert on exchange holidays.")
+
+    if args.replay:
+        try: print(run_replay(args.replay, args.speed))
+        finally: shutdown()
+        return
+
+    status = read_status()
+    status.update({"pid": os.getpid(), "started": time.time(), "heartbeat": time.time()})
+    write_status(status)
+    last_run = datetime.fromtimestamp(status["last_run"], IST) if status.get("last_run") else None
+
+    try:
+        while True:
+            requested = take_refresh_request()
+            if requested or seconds_until_next_run(last_run=last_run) <= 0:
+                try:
+                    summary = run_cycle()
+                    status.update(summary, last_error=None)
+                except Exception as e:
+                    status["last_error"] = f"{type(e).__name__}: {e}"
+                    print(f"Monitor Error: {status['last_error']}")
+                last_run = datetime.now(IST)
+                status.update(last_run=last_run.timestamp(), requested=requested)
+                if args.once: break
+
+            status.update(heartbeat=time.time(), market_open=market_is_open(),
+                          next_run_in=round(seconds_until_next_run(last_run=last_run)))
+            write_status(status)
+            time.sleep(TICK)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        status.update(heartbeat=0, pid=None)
+        write_status(status)
+        shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import csv
+import json
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+import metrics
+
+# --- CONFIGURATION ---
+FLUSH_INTERVAL = 2.0   # seconds between persistence flushes of tick-driven changes
+LATENCY_WINDOW = 10_000  # ticks kept for latency percentiles
+
+
+# ==============================================================================
+#                           FEEDS
+# ==============================================================================
+class QuoteFeed:
+    """Push-based quotes: every subscriber is called with (symbol, price, ts) for each tick."""
+
+    def __init__(self):
+        self._subscribers = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, fn):
+        self._subscribers.append(fn)
+        return fn
+
+    def publish(self, symbol, price, ts=None):
+        for fn in self._subscribers: fn(symbol, price, ts)
+
+    def run(self):
+        """Deliver ticks on the calling thread until the feed ends or `stop()`."""
+        raise NotImplementedError
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread: self._thread.join(timeout=timeout)
+
+
+class ReplayFeed(QuoteFeed):
+    """
+    Ticks recorded in a file: CSV with ts,symbol,price columns, or JSON lines with
+    the same keys. `speed` paces delivery at that multiple of the recorded gaps;
+    None replays as fast as subscribers keep up.
+    """
+
+    def __init__(self, path, speed=None):
+        super().__init__()
+        self.path = path
+        self.speed = speed
+
+    def ticks(self):
+        with open(self.path, encoding="utf-8", newline="") as f:
+            if self.path.endswith((".jsonl", ".json")):
+                rows = (json.loads(line) for line in f if line.strip())
+            else:
+                rows = csv.DictReader(f)
+            for row in rows:
+                yield row['symbol'], float(row['price']), float(row['ts']) if row.get('ts') not in (None, "") else None
+
+    def run(self):
+        sent, first_ts, t0 = 0, None, time.monotonic()
+        for symbol, price, ts in self.ticks():
+            if self._stop.is_set(): break
+            if self.speed and ts is not None:
+                if first_ts is None: first_ts = ts
+                wait = (ts - first_ts) / self.speed - (time.monotonic() - t0)
+                if wait > 0: time.sleep(wait)
+            self.publish(symbol, price, ts)
+            sent += 1
+        return sent
+
+
+def write_ticks(path, ticks):
+    """Record (ts, symbol, price) tuples as a CSV a ReplayFeed can play back."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["ts", "symbol", "price"])
+        w.writerows(ticks)
+
+
+# ==============================================================================
+#                           FEED -> TRADE BOOK
+# ==============================================================================
+class FeedRunner:
+    """
+    Applies each tick to a TradeBook. New alerts go to `notify(alert_rows)` at
+    once; field changes are merged and handed to `persist({trade_id: fields})`
+    at most every `flush_interval` seconds. Tick-to-alert latency is recorded.
+    """
+
+    def __init__(self, book, persist, notify, flush_interval=FLUSH_INTERVAL):
+        self.book = book
+        self.persist = persist
+        self.notify = notify
+        self.flush_interval = flush_interval
+        self.ticks = 0
+        self.latency_ms = deque(maxlen=LATENCY_WINDOW)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def on_tick(self, symbol, price, ts=None):
+        t0 = time.perf_counter()
+        with self._lock:
+            changes, alerts = self.book.on_tick(symbol, price)
+            for key, fields in changes.items():
+                self._pending.setdefault(key, {}).update(fields)
+            self.ticks += 1
+        if alerts is not None: self.notify(alerts)
+        ms = (time.perf_counter() - t0) * 1e3
+        self.latency_ms.append(ms)
+        metrics.record_call("feed", "tick", ms)
+        if time.monotonic() - self._last_flush >= self.flush_interval: self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if pending: self.persist(pending)
+        return len(pending)
+
+    def stats(self):
+        lat = np.fromiter(self.latency_ms, dtype=float)
+        if not len(lat): return {"ticks": self.ticks}
+        return {"ticks": self.ticks, "p50_ms": round(float(np.percentile(lat, 50)), 3),
+                "p99_ms": round(float(np.percentile(lat, 99)), 3), "max_ms": round(float(lat.max()), 3)}
@@ -0,0 +1,329 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+# --- CONFIGURATION ---
+BATCH_SIZE = 50        # tickers per yf.download call
+MAX_WORKERS = 8        # thread pool size for the per-ticker fallback
+TERMINAL_STATUSES = ("Target-Hit", "SL-Hit")
+EXCHANGE_SUFFIXES = (".NS", ".BO")  # tried in this order for a bare name
+DEAD_RETRY = 6 * 3600              # first wait before re-trying a name no exchange had data for
+DEAD_RETRY_MAX = 7 * 24 * 3600     # the wait doubles per failed attempt up to this
+MISS_LIMIT = 3                     # refreshes a verified symbol may come back empty before it is re-resolved
+SYMBOLS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "symbol_cache.json")
+
+
+# ==============================================================================
+#                           SYMBOL HELPERS
+# ==============================================================================
+def base_symbol(name):
+    """'reliance.ns ' -> 'RELIANCE': the exchange-free name used for links and lookups."""
+    name = str(name).strip().upper()
+    for suffix in EXCHANGE_SUFFIXES:
+        if name.endswith(suffix): return name[:-len(suffix)]
+    return name
+
+
+def to_yf_symbol(name):
+    """Yahoo symbol for a Trades/Portfolio name: as typed if suffixed, else the verified exchange, else NSE."""
+    name = str(name).strip().upper()
+    if not name: return ""
+    if name.endswith(EXCHANGE_SUFFIXES): return name
+    return (_resolver or get_symbol_resolver()).symbol(name) or name + EXCHANGE_SUFFIXES[0]
+
+
+def live_tickers(names, statuses):
+    """Unique yfinance symbols for every non-terminal row, in first-seen order."""
+    seen = {}
+    for name, status in zip(names, statuses):
+        if not str(name).strip(): continue
+        if str(status).strip() in TERMINAL_STATUSES: continue
+        seen.setdefault(to_yf_symbol(name), None)
+    return list(seen)
+
+
+# ==============================================================================
+#                           PRICE PROVIDERS
+# ==============================================================================
+class PriceProvider:
+    """Returns {yf_symbol: last close rounded to 2dp}; missing symbols are omitted."""
+
+    def get_quotes(self, symbols):
+        raise NotImplementedError
+
+    def fetch(self, symbols):
+        """
+        (quotes, errors): `errors` holds the missing symbols whose lookup failed (timeout,
+        throttling) rather than finding no data, so nobody concludes they don't exist.
+        """
+        return self.get_quotes(symbols), set()
+
+
+class YFinanceProvider(PriceProvider):
+    def __init__(self, batch_size=BATCH_SIZE, max_workers=MAX_WORKERS):
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+
+    def get_quotes(self, symbols):
+        return self.fetch(symbols)[0]
+
+    def fetch(self, symbols):
+        symbols = list(dict.fromkeys(symbols))
+        quotes, errors = {}, set()
+        for i in range(0, len(symbols), self.batch_size):
+            quotes.update(self._download_batch(symbols[i:i + self.batch_size]))
+
+        # Anything the batch missed, failed batches included, is asked for one by one
+        missing = [s for s in symbols if s not in quotes]
+        if missing:
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as pool:
+                for sym, (px, ok) in zip(missing, pool.map(self._fetch_one, missing)):
+                    if px is not None: quotes[sym] = px
+                    elif not ok: errors.add(sym)
+            metrics.record_call("quotes", "history", (time.perf_counter() - t0) * 1e3, n=len(missing))
+        return quotes, errors
+
+    def _download_batch(self, batch):
+        import yfinance as yf
+        t0 = time.perf_counter()
+        try:
+            data = yf.download(batch, period="1d", group_by="ticker", auto_adjust=False,
+                               threads=True, progress=False)
+        except Exception as e:
+            print(f"Quote Batch Error: {e}")
+            return {}
+        finally:
+            metrics.record_call("quotes", "download", (time.perf_counter() - t0) * 1e3)
+        if data is None or data.empty: return {}
+
+        out = {}
+        for sym in batch:
+            try:
+                close = data[sym]['Close'] if len(batch) > 1 else data['Close']
+                if hasattr(close, 'columns'): close = close.iloc[:, 0]
+                close = close.dropna()
+                if not close.empty: out[sym] = round(float(close.iloc[-1]), 2)
+            except (KeyError, IndexError):
+                continue
+        return out
+
+    @staticmethod
+    def _fetch_one(sym):
+        """(price, ok): (None, True) when Yahoo has no data for `sym`, (None, False) when the request failed."""
+        import yfinance as yf
+        try:
+            data = yf.Ticker(sym).history(period="1d")
+            if data.empty: return None, True
+            return round(float(data['Close'].iloc[-1]), 2), True
+        except Exception:
+            return None, False
+
+
+class FakePriceProvider(PriceProvider):
+    """Offline provider for tests and benchmarks: fixed prices plus optional per-call latency."""
+
+    def __init__(self, prices=None, latency=0.0):
+        self.prices = {to_yf_symbol(k): v for k, v in (prices or {}).items()}
+        self.latency = latency
+        self.calls = 0
+        self.symbols_requested = 0
+
+    def set_price(self, name, price):
+        self.prices[to_yf_symbol(name)] = price
+
+    def get_quotes(self, symbols):
+        self.calls += 1
+        self.symbols_requested += len(symbols)
+        if self.latency: time.sleep(self.latency)
+        return {s: round(float(self.prices[s]), 2) for s in symbols if s in self.prices}
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_price_provider():
+    global _provider
+    with _provider_lock:
+        if _provider is None: _provider = YFinanceProvider()
+        return _provider
+
+
+def set_price_provider(provider):
+    global _provider
+    with _provider_lock:
+        _provider = provider
+
+
+# ==============================================================================
+#                           SYMBOL RESOLUTION
+# ==============================================================================
+class SymbolResolver:
+    """
+    Base name -> exchange symbol that has returned a quote, plus names no exchange had
+    data for and when to try them again. Kept in a JSON file (`path=None`: memory only).
+    """
+
+    def __init__(self, path=SYMBOLS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        if path:
+            try:
+                with open(path, encoding="utf-8") as f: self._entries = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+    def symbol(self, base):
+        entry = self._entries.get(base)
+        return entry.get("symbol") if entry else None
+
+    def is_dead(self, base, now=None):
+        entry = self._entries.get(base)
+        return bool(entry) and entry.get("symbol") is None and (now or time.time()) < entry.get("retry_after", 0)
+
+    def resolved(self, base, symbol):
+        with self._lock:
+            entry = self._entries.get(base)
+            if entry and entry.get("symbol") == symbol and not entry.get("misses"): return
+            self._entries[base] = {"symbol": symbol, "verified": time.time()}
+            self._dirty = True
+
+    def missed(self, base):
+        """A verified symbol came back empty; forget it after MISS_LIMIT refreshes in a row."""
+        with self._lock:
+            entry = self._entries.get(base)
+            if not entry or entry.get("symbol") is None: return
+            entry["misses"] = entry.get("misses", 0) + 1
+            if entry["misses"] >= MISS_LIMIT: del self._entries[base]
+            self._dirty = True
+
+    def failed(self, base, tried):
+        with self._lock:
+            prev = self._entries.get(base) or {}
+            attempts = prev.get("attempts", 0) + 1 if prev.get("symbol") is None else 1
+            now = time.time()
+            self._entries[base] = {"symbol": None, "tried": list(tried), "attempts": attempts, "failed": now,
+                                   "retry_after": now + min(DEAD_RETRY * 2 ** (attempts - 1), DEAD_RETRY_MAX)}
+            self._dirty = True
+
+    def forget(self, bases=None):
+        """Drop entries (all unresolved ones by default) so they are looked up again on the next refresh."""
+        with self._lock:
+            for b in list(self._entries if bases is None else bases):
+                entry = self._entries.get(b)
+                if entry is not None and (bases is not None or entry.get("symbol") is None):
+                    del self._entries[b]
+                    self._dirty = True
+        self.save()
+
+    def unresolved(self):
+        with self._lock:
+            return {b: dict(e) for b, e in self._entries.items() if e.get("symbol") is None}
+
+    def save(self):
+        if not self.path or not self._dirty: return
+        with self._lock:
+            data, self._dirty = json.dumps(self._entries), False
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f: f.write(data)
+        os.replace(tmp, self.path)
+
+
+_resolver = None
+
+
+def get_symbol_resolver():
+    global _resolver
+    with _provider_lock:
+        if _resolver is None: _resolver = SymbolResolver()
+        return _resolver
+
+
+def set_symbol_resolver(resolver):
+    global _resolver
+    with _provider_lock:
+        _resolver = resolver
+
+
+def resolve_misses(requested, got, provider, resolver, errors=()):
+    """
+    Record which requested symbols answered and try BSE for NSE guesses that didn't.
+    Names still without data are marked dead, but only after a clean "no data" on every
+    exchange tried and when the provider answered for something else, so an outage or a
+    half-failed batch doesn't blacklist anything. `errors` are the requested symbols whose
+    lookup failed; they are left alone until a later refresh. Returns the extra quotes.
+    """
+    for s in got: resolver.resolved(base_symbol(s), s)
+    guesses = []
+    for s in requested:
+        if s in got or s in errors: continue
+        if resolver.symbol(base_symbol(s)) == s: resolver.missed(base_symbol(s))
+        else: guesses.append(s)
+
+    alt = {base_symbol(s) + EXCHANGE_SUFFIXES[1]: s for s in guesses if s.endswith(EXCHANGE_SUFFIXES[0])}
+    more, alt_errors = provider.fetch(list(alt)) if alt else ({}, set())
+    for s in more: resolver.resolved(base_symbol(s), s)
+    if got or more:
+        for s in guesses:
+            base = base_symbol(s)
+            bse = base + EXCHANGE_SUFFIXES[1]
+            if bse in more or bse in alt_errors: continue
+            resolver.failed(base, [s] + [a for a in alt if alt[a] == s])
+    resolver.save()
+    return more
+
+
+_recent = {}  # yf_symbol -> (monotonic time, price) of the last quote any caller fetched; price None for a miss
+_recent_lock = threading.Lock()
+
+
+def fetch_cmp_map(symbols, provider=None, max_age=0):
+    """
+    One provider call for all `symbols`. With `max_age`, quotes another caller
+    fetched in the last `max_age` seconds are reused and only the rest are requested;
+    a symbol that came back empty in that window is not asked for again, unless its
+    lookup failed. Names the resolver knows to be dead are skipped; NSE guesses that
+    come back empty are retried on BSE, and the quote is keyed by the symbol that answered.
+    """
+    resolver = get_symbol_resolver()
+    symbols = [s for s in dict.fromkeys(symbols) if s and not resolver.is_dead(base_symbol(s))]
+    if not symbols: return {}
+    out, known = {}, set()
+    if max_age:
+        now = time.monotonic()
+        with _recent_lock:
+            for s in symbols:
+                hit = _recent.get(s)
+                if not hit or now - hit[0] > max_age: continue
+                known.add(s)
+                if hit[1] is not None: out[s] = hit[1]
+    missing = [s for s in symbols if s not in known]
+    if missing:
+        provider = provider or get_price_provider()
+        with metrics.stage("quotes"):
+            got, errors = provider.fetch(missing)
+            got.update(resolve_misses(missing, got, provider, resolver, errors))
+        now = time.monotonic()
+        with _recent_lock:
+            _recent.update((s, (now, None)) for s in missing if s not in got and s not in errors)
+            _recent.update((s, (now, px)) for s, px in got.items())
+        out.update(got)
+    return out
+
+
+def cached_quotes(symbols):
+    """The last quote any caller fetched for each of `symbols`, however old. Never calls the provider."""
+    with _recent_lock: hits = [(s, _recent.get(s)) for s in symbols]
+    return {s: hit[1] for s, hit in hits if hit and hit[1] is not None}
+
+
+def quote_times(symbols):
+    """When each symbol's last quote (or miss) was fetched; None if never. Changes only when a fetch does."""
+    with _recent_lock: return tuple(_recent.get(s, (None,))[0] for s in symbols)
@@ -0,0 +1,138 @@
+import threading
+import time
+
+DEFAULT_TTL = 30  # seconds a tab snapshot is served from memory
+
+
+# ==============================================================================
+#                           RECORD CONVERSION
+# ==============================================================================
+def numericise(value):
+    """Same coercion gspread's get_all_records applies: int, then float, else the raw string."""
+    if value == "": return ""
+    if isinstance(value, str) and "_" in value: return value
+    try: return int(value)
+    except (TypeError, ValueError): pass
+    try: return float(value)
+    except (TypeError, ValueError): return value
+
+
+def records_from_values(values):
+    if not values: return []
+    headers = values[0]
+    out = []
+    for row in values[1:]:
+        row = list(row) + [""] * (len(headers) - len(row))
+        out.append({h: numericise(v) for h, v in zip(headers, row)})
+    return out
+
+
+# ==============================================================================
+#                           PROCESS-WIDE CACHE
+# ==============================================================================
+class SheetCache:
+    """
+    Read-through cache for the Spreadsheet handle, worksheet handles and tab snapshots.
+
+    Handles live until `reset()`; tab snapshots (the raw get_all_values grid) expire
+    after `ttl` seconds. Writers call `patch_*` when they know the exact change and
+    `invalidate` otherwise.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._sh = None
+        self._worksheets = {}
+        self._values = {}    # title -> (fetched_at, grid)
+        self._records = {}   # title -> (grid id, records)
+        self.hits = 0
+        self.misses = 0
+
+    # --- handles ---
+    def spreadsheet(self, opener):
+        with self._lock:
+            if self._sh is None: self._sh = opener()
+            return self._sh
+
+    def worksheet(self, sh, title):
+        with self._lock:
+            ws = self._worksheets.get(title)
+            if ws is None:
+                ws = sh.worksheet(title)
+                self._worksheets[title] = ws
+            return ws
+
+    # --- snapshots ---
+    def values(self, title, ws, fresh=False):
+        with self._lock:
+            entry = self._values.get(title)
+            if not fresh and entry and time.monotonic() - entry[0] < self.ttl:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        grid = ws.get_all_values()
+        with self._lock:
+            self._values[title] = (time.monotonic(), grid)
+        return grid
+
+    def records(self, title, ws):
+        grid = self.values(title, ws)
+        with self._lock:
+            memo = self._records.get(title)
+            if memo and memo[0] is grid: return memo[1]
+            recs = records_from_values(grid)
+            self._records[title] = (grid, recs)
+            return recs
+
+    # --- write-side maintenance ---
+    def _patched(self, title, fn):
+        with self._lock:
+            entry = self._values.get(title)
+            if not entry: return
+            grid = [list(r) for r in entry[1]]
+            if fn(grid) is False:
+                self._values.pop(title, None)
+            else:
+                self._values[title] = (entry[0], grid)
+
+    def patch_append(self, title, row):
+        self._patched(title, lambda grid: grid.append([str(v) for v in row]))
+
+    def patch_cells(self, title, cells):
+        """`cells` maps (sheet_row, col_idx) -> value, 1-based rows and 0-based columns."""
+        def apply(grid):
+            for (r, c), v in cells.items():
+                if r - 1 >= len(grid): return False
+                row = grid[r - 1]
+                if c >= len(row): row.extend([""] * (c + 1 - len(row)))
+                row[c] = "" if v is None else str(v)
+        self._patched(title, apply)
+
+    def patch_delete(self, title, sheet_row):
+        def apply(grid):
+            if sheet_row - 1 >= len(grid): return False
+            del grid[sheet_row - 1]
+        self._patched(title, apply)
+
+    def invalidate(self, title=None):
+        with self._lock:
+            if title is None:
+                self._values.clear()
+                self._records.clear()
+            else:
+                self._values.pop(title, None)
+                self._records.pop(title, None)
+
+    def reset(self):
+        with self._lock:
+            self._sh = None
+            self._worksheets.clear()
+            self.invalidate()
+
+
+_cache = SheetCache()
+
+
+def get_sheet_cache():
+    return _cache
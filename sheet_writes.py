@@ -0,0 +1,129 @@
+# ==============================================================================
+#                           A1 HELPERS
+# ==============================================================================
+def get_col_letter(col_idx):
+    """0-based column index -> A1 column letters."""
+    col_idx += 1
+    letter = ''
+    while col_idx > 0:
+        col_idx, remainder = divmod(col_idx - 1, 26)
+        letter = chr(65 + remainder) + letter
+    return letter
+
+
+def a1_range(row1, col1, row2, col2):
+    """1-based rows, 0-based columns, inclusive on both ends."""
+    start = f"{get_col_letter(col1)}{row1}"
+    if (row1, col1) == (row2, col2): return start
+    return f"{start}:{get_col_letter(col2)}{row2}"
+
+
+# ==============================================================================
+#                           DIFF AGAINST SNAPSHOT
+# ==============================================================================
+def same_cell(old, new):
+    """Sheets hands back formatted strings, so '101.5' and 101.50 count as equal."""
+    if old is None: old = ""
+    if new is None: new = ""
+    if str(old) == str(new): return True
+    try:
+        return abs(float(str(old).replace(',', '')) - float(new)) < 1e-9
+    except (TypeError, ValueError):
+        return False
+
+
+def diff_cells(all_values, cells):
+    """
+    Drop cells whose value already matches the get_all_values() snapshot.
+
+    `cells` maps (sheet_row, col_idx) -> value with 1-based rows and 0-based columns.
+    Returns (changed_cells, skipped_count).
+    """
+    changed = {}
+    skipped = 0
+    for (r, c), val in cells.items():
+        row = all_values[r - 1] if 0 < r <= len(all_values) else []
+        old = row[c] if c < len(row) else ""
+        if same_cell(old, val): skipped += 1
+        else: changed[(r, c)] = val
+    return changed, skipped
+
+
+def plain_value(v):
+    """Editor/pandas cell -> a JSON-safe scalar; NaN and None become ''."""
+    if v is None: return ""
+    if hasattr(v, 'item'): v = v.item()
+    if isinstance(v, float) and v != v: return ""
+    return v if isinstance(v, (str, int, float, bool)) else str(v)
+
+
+def diff_rows(old_rows, new_rows, headers, key):
+    """
+    Row-keyed diff of two tables over `headers` (lists of row lists, no header row).
+
+    Returns (updates {key: {header: value}}, inserts [row], deletes [key]) with cells
+    compared by `same_cell`, so dtype drift ('5' vs 5.0, NaN vs '') is not a change.
+    Rows with a blank key are left out. Returns None when a key repeats, since rows
+    can't then be addressed by key.
+    """
+    k = headers.index(key)
+
+    def keyed(rows):
+        out = {}
+        for row in rows:
+            row = [plain_value(v) for v in row] + [""] * (len(headers) - len(row))
+            name = str(row[k]).strip()
+            if not name: continue
+            if name in out: return None
+            out[name] = row
+        return out
+
+    old, new = keyed(old_rows), keyed(new_rows)
+    if old is None or new is None: return None
+    updates = {}
+    for name, row in new.items():
+        prev = old.get(name)
+        if prev is None: continue
+        fields = {h: v for h, v, p in zip(headers, row, prev) if not same_cell(p, v)}
+        if fields: updates[name] = fields
+    inserts = [row for name, row in new.items() if name not in old]
+    deletes = [name for name in old if name not in new]
+    return updates, inserts, deletes
+
+
+# ==============================================================================
+#                           RANGE MERGING
+# ==============================================================================
+def merge_ranges(cells):
+    """
+    Pack changed cells into as few rectangular A1 ranges as possible.
+
+    Adjacent cells in a row are joined into horizontal runs first, then runs that
+    cover the same columns on consecutive rows are stacked into one block.
+    Only cells present in `cells` are ever written.
+    """
+    runs = []
+    for r, c in sorted(cells):
+        if runs and runs[-1][0] == r and runs[-1][2] == c - 1:
+            runs[-1][2] = c
+        else:
+            runs.append([r, c, c])
+
+    blocks = {}
+    open_blocks = {}
+    for r, c1, c2 in runs:
+        key = (c1, c2)
+        blk = open_blocks.get(key)
+        if blk is not None and blk[1] == r - 1:
+            blk[1] = r
+        else:
+            blk = [r, r]
+            open_blocks[key] = blk
+            blocks.setdefault(key, []).append(blk)
+
+    spans = sorted((r1, c1, r2, c2) for (c1, c2), blks in blocks.items() for r1, r2 in blks)
+    return [
+        {'range': a1_range(r1, c1, r2, c2),
+         'values': [[cells[(r, c)] for c in range(c1, c2 + 1)] for r in range(r1, r2 + 1)]}
+        for r1, c1, r2, c2 in spans
+    ]
@@ -0,0 +1,187 @@
+"""
+Quota-aware access to Google Sheets.
+
+Every call on a guarded client / Spreadsheet / Worksheet takes a token from the read
+or write bucket, is retried with jittered exponential backoff on 429 and transient
+errors, and identical reads in flight at the same time are made once. batch_update
+calls arriving within WRITE_LINGER of each other go out as one request.
+"""
+import random
+import threading
+import time
+
+import requests
+
+import metrics
+from coordination import Coalescer
+
+# --- CONFIGURATION ---
+QUOTA_SHARE = 0.9        # fraction of the per-minute quota this process may use
+BURST = 10               # requests that may go out back to back before pacing starts
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0       # seconds; doubled per attempt, then jittered
+BACKOFF_CAP = 32.0
+WRITE_LINGER = 0.05      # seconds a batch_update waits for others to join it
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+NOT_IDEMPOTENT = {"append_row", "append_rows", "insert_row", "insert_rows", "delete_rows", "add_worksheet"}
+WRAP_RESULTS = {"open", "open_by_key", "worksheet", "add_worksheet", "worksheets"}
+
+
+# ==============================================================================
+#                           TOKEN BUCKET
+# ==============================================================================
+class TokenBucket:
+    """`rate` tokens per second up to `capacity`; take() blocks until one is free."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """Returns the seconds spent waiting."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= 1  # reserve now; a negative balance is the queue ahead of us
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait: time.sleep(wait)
+        return wait
+
+
+def bucket_for(quota, share=QUOTA_SHARE, burst=BURST):
+    # Burst plus a minute of refill must stay inside the per-minute quota
+    budget = quota * share
+    burst = min(burst, budget / 2)
+    return TokenBucket((budget - burst) / 60, burst)
+
+
+# ==============================================================================
+#                           GUARD
+# ==============================================================================
+def retryable(e, method):
+    status = getattr(getattr(e, 'response', None), 'status_code', None)
+    if status == 429: return True  # rejected before anything was written
+    if method in NOT_IDEMPOTENT: return False
+    if status is not None: return status in RETRY_STATUSES
+    return isinstance(e, (requests.ConnectionError, requests.Timeout))
+
+
+class _Batch:
+    def __init__(self):
+        self.data = []
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class SheetsGuard:
+    """Shared budget, retry policy, read coalescing and write batching for one process."""
+
+    def __init__(self, read_quota=metrics.SHEETS_READ_QUOTA, write_quota=metrics.SHEETS_WRITE_QUOTA,
+                 max_retries=MAX_RETRIES, linger=WRITE_LINGER):
+        self.buckets = {"read": bucket_for(read_quota), "write": bucket_for(write_quota)}
+        self.max_retries = max_retries
+        self.linger = linger
+        self._reads = Coalescer()
+        self._lock = threading.Lock()
+        self._batches = {}
+        self.writes = 0   # completed write calls; a read only joins flights started since the caller's last write
+        self.waited = 0.0
+        self.retries = self.batched = 0
+
+    def wrap(self, target):
+        return Guarded(target, self)
+
+    def call(self, method, fn, *args, **kwargs):
+        kind = "read" if method in metrics.SHEETS_READS else "write"
+        try:
+            return self._attempt(kind, method, fn, args, kwargs)
+        finally:
+            # Even a failed write may have landed, so reads issued after it must not reuse older flights
+            if kind == "write":
+                with self._lock: self.writes += 1
+
+    def _attempt(self, kind, method, fn, args, kwargs):
+        for attempt in range(self.max_retries + 1):
+            wait = self.buckets[kind].take()
+            if wait:
+                self.waited += wait
+                metrics.record_call("quota", f"{kind} wait", wait * 1e3)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.max_retries or not retryable(e, method): raise
+                self.retries += 1
+                metrics.record_call("quota", "retry")
+                time.sleep(min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt) * (0.5 + random.random()))
+
+    def read(self, target, method, fn, args, kwargs):
+        key = (self.writes, id(target), method, repr(args), repr(sorted(kwargs.items())))
+        return self._reads.run(key, lambda: self.call(method, fn, *args, **kwargs))
+
+    def batch_update(self, target, fn, data, kwargs):
+        """Join other batch_update calls on the same worksheet made within `linger` seconds."""
+        key = (id(target), repr(sorted(kwargs.items())))
+        with self._lock:
+            batch = self._batches.get(key)
+            leader = batch is None
+            if leader: batch = self._batches[key] = _Batch()
+            else: self.batched += 1
+            batch.data.extend(data)
+        if not leader:
+            batch.done.wait()
+            if batch.error is not None: raise batch.error
+            return batch.result
+
+        time.sleep(self.linger)
+        with self._lock: self._batches.pop(key, None)
+        try:
+            batch.result = self.call("batch_update", fn, batch.data, **kwargs)
+            return batch.result
+        except BaseException as e:
+            batch.error = e
+            raise
+        finally:
+            batch.done.set()
+
+    def stats(self):
+        return {"waited_s": round(self.waited, 2), "retries": self.retries,
+                "reads_coalesced": self._reads.joined, "writes_batched": self.batched}
+
+
+class Guarded:
+    """Proxy routing every method call on a gspread object through a SheetsGuard."""
+
+    def __init__(self, target, guard):
+        self._target = target
+        self._guard = guard
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name.startswith("_") or not callable(attr): return attr
+        guard = self._guard
+
+        def call(*args, **kwargs):
+            if name == "batch_update" and args and isinstance(args[0], (list, tuple)):
+                return guard.batch_update(self._target, attr, list(args[0]), kwargs)
+            if name in metrics.SHEETS_READS and name not in WRAP_RESULTS:
+                return guard.read(self._target, name, attr, args, kwargs)
+            out = guard.call(name, attr, *args, **kwargs)
+            if name == "worksheets": return [Guarded(w, guard) for w in out]
+            if name in WRAP_RESULTS: return Guarded(out, guard)
+            return out
+        return call
+
+    def __repr__(self):
+        return f"Guarded({self._target!r})"
+
+
+_guard = SheetsGuard()
+
+
+def get_sheets_guard():
+    return _guard
@@ -0,0 +1,889 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from sheet_cache import records_from_values
+from sheet_writes import diff_cells, merge_ranges, same_cell
+
+# Column that identifies a row in each tab; writes are addressed by this key, never by row number
+KEY_COLUMNS = {"Trades": "id", "Portfolio": "stock_name", "Links": "stock_name"}
+UNIQUE_KEY_TABS = ("Trades",)  # an append whose key already exists remotely is pushed under a new id
+TABS = tuple(KEY_COLUMNS)
+META_TAB = "Meta"  # key/value rows in the Sheet; holds the Sheets backend's id counters
+INDEX_TTL = 10  # seconds a key->row index is trusted before re-checking the key column
+
+
+def cell_text(v):
+    """How a value reads back from get_all_values(): always a string."""
+    if v is None: return ""
+    if hasattr(v, 'item'): v = v.item()
+    if isinstance(v, float) and v != v: return ""
+    return str(v)
+
+
+def _json_default(v):
+    if hasattr(v, 'item'): return v.item()
+    return str(v)
+
+
+def _dumps(v):
+    return json.dumps(v, default=_json_default)
+
+
+def key_text(v):
+    """Row key as text; ids that went through a float column (5.0) still match '5'."""
+    text = cell_text(v).strip()
+    if text.endswith(".0") and text[:-2].lstrip("-").isdigit(): return text[:-2]
+    return text
+
+
+def _key_of(headers, tab, row):
+    try: i = headers.index(KEY_COLUMNS[tab])
+    except ValueError: return ""
+    return key_text(row[i]) if i < len(row) else ""
+
+
+def _still_keyed(tab, cells, grid, keys):
+    """
+    Split update_cells() input into ({data row index: {header: value}}, cells dropped), keeping
+    a cell only while keys[index], the store's current key for that row, is the one it had in `grid`.
+    """
+    by_row, dropped = {}, 0
+    for (r, c), v in cells.items():
+        expected = _key_of(grid[0], tab, grid[r - 1]) if 2 <= r <= len(grid) else ""
+        if not expected or r - 2 >= len(keys) or keys[r - 2] != expected or c >= len(grid[0]):
+            dropped += 1
+            continue
+        by_row.setdefault(r - 2, {})[grid[0][c]] = v
+    return by_row, dropped
+
+
+# ==============================================================================
+#                           REPOSITORY INTERFACE
+# ==============================================================================
+class Repository:
+    """
+    Tab-level storage used by the UI. Grids look exactly like gspread's
+    get_all_values(): a header row followed by rows of strings.
+    """
+
+    def values(self, tab, fresh=False):
+        raise NotImplementedError
+
+    def version(self, tab):
+        """Token that changes with every write to `tab`, or None if the store can't tell."""
+        return None
+
+    def records(self, tab):
+        grid = self.values(tab)
+        memo = getattr(self, '_records_memo', None)
+        if memo is None: memo = self._records_memo = {}
+        hit = memo.get(tab)
+        if hit and hit[0] is grid: return hit[1]
+        recs = records_from_values(grid)
+        memo[tab] = (grid, recs)
+        return recs
+
+    def headers(self, tab):
+        grid = self.values(tab)
+        return grid[0] if grid else []
+
+    def iter_rows(self, tab, chunk_size=1000):
+        """Data rows (no header) in lists of up to `chunk_size`."""
+        rows = self.values(tab)[1:]
+        for i in range(0, len(rows), chunk_size): yield rows[i:i + chunk_size]
+
+    def next_id(self, tab, count=1, floor=1):
+        """
+        Reserve `count` consecutive integer ids, none below `floor`; returns the first.
+        Never hands out an id twice.
+        """
+        raise NotImplementedError
+
+    def append_row(self, tab, row):
+        raise NotImplementedError
+
+    def update_fields(self, tab, key, fields):
+        """Set {header: value} on the row whose key column equals `key`. Returns False if absent."""
+        raise NotImplementedError
+
+    def update_many(self, tab, changes):
+        """Apply {key: {header: value}} in one write. Returns the keys that were found."""
+        raise NotImplementedError
+
+    def update_cells(self, tab, cells, grid):
+        """
+        `cells` maps (sheet_row, col_idx) of `grid`, a values() snapshot, -> value. A cell whose
+        row no longer holds the key it had in `grid` is dropped. Returns the cells dropped.
+        """
+        raise NotImplementedError
+
+    def claim_fields(self, tab, column, values):
+        """
+        Set `column` to values[key] on every row where it still differs, as one check-and-write.
+        Returns {key: previous value} for the keys the caller won; a key whose row or column is
+        missing is returned with None, since the store can't tell whether it was claimed.
+        """
+        raise NotImplementedError
+
+    def delete_row(self, tab, key):
+        raise NotImplementedError
+
+    def apply_changes(self, tab, updates=None, inserts=(), deletes=()):
+        """Keyed updates, appended rows and deleted keys in as few writes as the backend allows."""
+        if updates: self.update_many(tab, updates)
+        for key in deletes: self.delete_row(tab, key)
+        for row in inserts: self.append_row(tab, row)
+
+    def replace_all(self, tab, grid):
+        raise NotImplementedError
+
+
+# ==============================================================================
+#                           GOOGLE SHEETS (DIRECT)
+# ==============================================================================
+class RowIndex:
+    """key -> sheet row number for one tab, kept in step with our own appends and deletes."""
+
+    def __init__(self, keys, validated=None):
+        self.load(keys)
+        if validated is not None: self.validated = validated
+
+    def load(self, keys):
+        self.keys = [key_text(k) for k in keys]   # position 0 is sheet row 2
+        self._reindex()
+        self.validated = time.monotonic()
+
+    def _reindex(self):
+        self.rows = {}
+        for i, k in enumerate(self.keys):
+            self.rows.setdefault(k, i + 2)
+
+    def row_of(self, key):
+        return self.rows.get(key_text(key))
+
+    def max_int(self):
+        ints = [int(k) for k in self.keys if k.lstrip("-").isdigit()]
+        return max(ints, default=0)
+
+    def on_append(self, key):
+        key = key_text(key)
+        self.keys.append(key)
+        self.rows.setdefault(key, len(self.keys) + 1)
+
+    def on_delete(self, row):
+        del self.keys[row - 2]
+        self._reindex()
+
+    def matches(self, keys):
+        return [key_text(k) for k in keys] == self.keys
+
+
+class SheetsRepository(Repository):
+    """
+    Every call goes to Google Sheets, with snapshots served from a SheetCache.
+
+    Writes locate rows through a RowIndex instead of ws.find. Every update and
+    delete first re-reads the key column (one read) and rebuilds the index if any
+    row moved, so edits made by other sessions or directly in the Sheet can't send
+    a write to the wrong row. Id allocation trusts the index for INDEX_TTL and keeps
+    its counter in the Meta tab, so a restart can't reuse the id of a deleted row.
+    """
+
+    def __init__(self, open_ws, cache, index_ttl=INDEX_TTL):
+        self.open_ws = open_ws
+        self.cache = cache
+        self.index_ttl = index_ttl
+        self._indexes = {}
+        self._next_ids = {}
+        self._headers = {}
+        self._lock = threading.RLock()
+
+    def values(self, tab, fresh=False):
+        grid = self.cache.values(tab, self.open_ws(tab), fresh=fresh)
+        if grid:
+            self._headers[tab] = grid[0]
+            if fresh: self._indexes[tab] = RowIndex([_key_of(grid[0], tab, r) for r in grid[1:]])
+        return grid
+
+    def records(self, tab):
+        self.values(tab)  # remembers headers for later writes
+        return self.cache.records(tab, self.open_ws(tab))
+
+    def headers(self, tab):
+        if tab not in self._headers: self._headers[tab] = self.open_ws(tab).row_values(1)
+        return self._headers[tab]
+
+    def _index(self, tab, validate=False):
+        idx = self._indexes.get(tab)
+        if idx is None: idx = self._indexes[tab] = RowIndex([], validated=0.0)
+        if validate or time.monotonic() - idx.validated > self.index_ttl:
+            headers = self.headers(tab)
+            col = headers.index(KEY_COLUMNS[tab]) + 1
+            keys = self.open_ws(tab).col_values(col)[1:]
+            if idx.matches(keys): idx.validated = time.monotonic()
+            else:
+                idx.load(keys)
+                self.cache.invalidate(tab)  # someone else changed the tab; the snapshot is stale too
+        return idx
+
+    def _meta_ws(self):
+        try: return self.open_ws(META_TAB)
+        except Exception: return None  # Sheet not migrated yet: the counter lives in memory only
+
+    def next_id(self, tab, count=1, floor=1):
+        with self._lock:
+            name = f"next_id:{tab}"
+            ws = self._meta_ws()
+            rows = ws.get_all_values() if ws is not None else []
+            at = next((i for i, r in enumerate(rows, start=1) if r and r[0] == name), None)
+            stored = int(rows[at - 1][1]) if at and len(rows[at - 1]) > 1 and rows[at - 1][1].isdigit() else 1
+            start = max(stored, self._next_ids.get(tab, 1), self._index(tab).max_int() + 1, floor)
+            self._next_ids[tab] = start + count
+            if ws is not None:
+                if at: ws.update_cell(at, 2, str(start + count))
+                else: ws.append_row([name, str(start + count)])
+            return start
+
+    def append_row(self, tab, row):
+        with self._lock:
+            self.open_ws(tab).append_row(row)
+            self.cache.patch_append(tab, row)
+            idx = self._indexes.get(tab)
+            if idx is not None: idx.on_append(_key_of(self.headers(tab), tab, row))
+
+    def update_fields(self, tab, key, fields):
+        return bool(self.update_many(tab, {key: fields}))
+
+    def update_many(self, tab, changes):
+        # One key-column check, one index lookup per key and a single batch_update
+        if not changes: return []
+        with self._lock:
+            idx = self._index(tab, validate=True)
+            headers = self.headers(tab)
+            cells, found = {}, []
+            for key, fields in changes.items():
+                r = idx.row_of(key)
+                if not r: continue
+                found.append(key)
+                cells.update({(r, headers.index(h)): v for h, v in fields.items() if h in headers})
+            self._write_cells(tab, cells)
+            return found
+
+    def update_cells(self, tab, cells, grid):
+        if not cells: return 0
+        with self._lock:
+            by_row, dropped = _still_keyed(tab, cells, grid, self._index(tab, validate=True).keys)
+            headers = self.headers(tab)
+            self._write_cells(tab, {(i + 2, headers.index(h)): v for i, fields in by_row.items()
+                                    for h, v in fields.items() if h in headers})
+            return dropped
+
+    def _write_cells(self, tab, cells):
+        if not cells: return
+        self.open_ws(tab).batch_update(merge_ranges(cells))
+        self.cache.patch_cells(tab, cells)
+
+    def claim_fields(self, tab, column, values):
+        # Sheets has no conditional write: the column is read fresh under the lock, so only
+        # another process writing in the same second can slip through
+        if not values: return {}
+        with self._lock:
+            headers = self.headers(tab)
+            if column not in headers: return dict.fromkeys(values)
+            idx = self._index(tab, validate=True)
+            col = headers.index(column)
+            current = self.open_ws(tab).col_values(col + 1)
+            claimed, cells = {}, {}
+            for key, v in values.items():
+                r = idx.row_of(key)
+                if not r:
+                    claimed[key] = None
+                    continue
+                prev = current[r - 1] if r - 1 < len(current) else ""
+                if same_cell(prev, v): continue
+                claimed[key] = prev
+                cells[(r, col)] = v
+            self._write_cells(tab, cells)
+            return claimed
+
+    def delete_row(self, tab, key):
+        with self._lock:
+            idx = self._index(tab, validate=True)
+            r = idx.row_of(key)
+            if not r: return False
+            self.open_ws(tab).delete_rows(r)
+            idx.on_delete(r)
+            self.cache.patch_delete(tab, r)
+            return True
+
+    def apply_changes(self, tab, updates=None, inserts=(), deletes=()):
+        # One batch_update for cells, one delete_rows per contiguous run, one append_rows
+        with self._lock:
+            if updates: self.update_many(tab, updates)
+            ws = self.open_ws(tab)
+            if deletes:
+                idx = self._index(tab, validate=True)
+                for lo, hi in row_runs(r for r in map(idx.row_of, deletes) if r):
+                    ws.delete_rows(lo, hi)
+                    for r in range(hi, lo - 1, -1):
+                        idx.on_delete(r)
+                        self.cache.patch_delete(tab, r)
+            if inserts:
+                ws.append_rows([list(r) for r in inserts])
+                idx = self._indexes.get(tab)
+                for row in inserts:
+                    self.cache.patch_append(tab, row)
+                    if idx is not None: idx.on_append(_key_of(self.headers(tab), tab, row))
+
+    def replace_all(self, tab, grid):
+        with self._lock:
+            ws = self.open_ws(tab)
+            ws.clear()
+            ws.update(range_name='A1', values=grid)
+            self.cache.invalidate(tab)
+            self._indexes.pop(tab, None)
+            self._headers.pop(tab, None)
+
+
+# ==============================================================================
+#                           LOCAL SQLITE STORE
+# ==============================================================================
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sheet_headers (tab TEXT PRIMARY KEY, headers TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS sheet_rows (
+    tab TEXT NOT NULL, pos INTEGER NOT NULL, key TEXT NOT NULL, data TEXT NOT NULL,
+    PRIMARY KEY (tab, pos)
+);
+CREATE INDEX IF NOT EXISTS sheet_rows_key_pos ON sheet_rows (tab, key, pos);
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT, tab TEXT NOT NULL, op TEXT NOT NULL,
+    key TEXT NOT NULL, payload TEXT NOT NULL, created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+class LocalRepository(Repository):
+    """
+    SQLite mirror of the three tabs and the app's source of truth.
+
+    Every write updates the local grid and queues an outbox op in the same
+    transaction; SheetSyncer pushes the outbox to Google Sheets in batches and
+    pulls remote edits back when nothing is pending for a tab.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # Identifies this database file, so versions of a recreated one never match old snapshots
+        self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('db_id', ?)", (uuid.uuid4().hex,))
+        self.db_id = self._conn.execute("SELECT value FROM meta WHERE key='db_id'").fetchone()[0]
+        self._grids = {}   # tab -> (version, grid)
+        self.on_write = None
+
+    # --- plumbing ---
+    def _version(self, tab):
+        # Bumped by every write to the tab, from this process or any other sharing the file
+        row = self._conn.execute("SELECT value FROM meta WHERE key=?", (f"ver:{tab}",)).fetchone()
+        return row[0] if row else None
+
+    def version(self, tab):
+        with self._lock: return f"{self.db_id}:{self._version(tab) or 0}"
+
+    @staticmethod
+    def _bump(conn, tab):
+        conn.execute("INSERT INTO meta (key, value) VALUES (?, '1') "
+                     "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1", (f"ver:{tab}",))
+
+    def _write(self, fn, notify=True):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn(self._conn)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if notify and self.on_write: self.on_write()
+        return out
+
+    def _headers(self, conn, tab):
+        row = conn.execute("SELECT headers FROM sheet_headers WHERE tab=?", (tab,)).fetchone()
+        return json.loads(row[0]) if row else []
+
+    @staticmethod
+    def _enqueue(conn, tab, op, key, payload):
+        conn.execute("INSERT INTO outbox (tab, op, key, payload, created) VALUES (?, ?, ?, ?, ?)",
+                     (tab, op, key, _dumps(payload), time.time()))
+
+    # --- reads ---
+    def is_empty(self, tab):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM sheet_headers WHERE tab=?", (tab,)).fetchone() is None
+
+    def values(self, tab, fresh=False):
+        with self._lock:
+            ver = self._version(tab)
+            hit = self._grids.get(tab)
+            if hit and hit[0] == ver: return hit[1]
+            headers = self._headers(self._conn, tab)
+            rows = [json.loads(d) for (d,) in self._conn.execute(
+                "SELECT data FROM sheet_rows WHERE tab=? ORDER BY pos", (tab,))]
+            grid = [headers] + rows if headers else []
+            self._grids[tab] = (ver, grid)
+            return grid
+
+    def iter_rows(self, tab, chunk_size=1000):
+        # Own connection: one consistent snapshot without holding the write lock while the caller streams
+        conn = sqlite3.connect(self.path)
+        try:
+            cur = conn.execute("SELECT data FROM sheet_rows WHERE tab=? ORDER BY pos", (tab,))
+            while True:
+                batch = cur.fetchmany(chunk_size)
+                if not batch: return
+                yield [json.loads(d) for (d,) in batch]
+        finally:
+            conn.close()
+
+    def pending(self, tab=None):
+        with self._lock:
+            if tab is None: return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM outbox WHERE tab=?", (tab,)).fetchone()[0]
+
+    # --- writes ---
+    def next_id(self, tab, count=1, floor=1):
+        def tx(conn):
+            name = f"next_id:{tab}"
+            hit = conn.execute("SELECT value FROM meta WHERE key=?", (name,)).fetchone()
+            stored = int(hit[0]) if hit else 1
+            # Rows pulled from the Sheet may carry ids past the counter; the key index answers without a table scan
+            top = conn.execute("SELECT MAX(CAST(key AS INTEGER)) FROM sheet_rows WHERE tab=? AND key GLOB '[0-9]*'",
+                               (tab,)).fetchone()[0]
+            start = max(stored, (top or 0) + 1, floor)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (name, str(start + count)))
+            return start
+        return self._write(tx, notify=False)
+
+    @staticmethod
+    def _find(conn, tab, key):
+        return conn.execute("SELECT pos, data FROM sheet_rows WHERE tab=? AND key=? ORDER BY pos LIMIT 1",
+                            (tab, key_text(key))).fetchone()
+
+    def _append(self, conn, tab, headers, row):
+        text = [cell_text(v) for v in row]
+        pos = conn.execute("SELECT COALESCE(MAX(pos), 0) + 1 FROM sheet_rows WHERE tab=?", (tab,)).fetchone()[0]
+        key = _key_of(headers, tab, text)
+        conn.execute("INSERT INTO sheet_rows (tab, pos, key, data) VALUES (?, ?, ?, ?)",
+                     (tab, pos, key, json.dumps(text)))
+        self._enqueue(conn, tab, "append", key, {"headers": headers, "row": list(row)})
+        self._bump(conn, tab)
+
+    def _delete(self, conn, tab, key):
+        hit = self._find(conn, tab, key)
+        if not hit: return False
+        conn.execute("DELETE FROM sheet_rows WHERE tab=? AND pos=?", (tab, hit[0]))
+        self._enqueue(conn, tab, "delete", key_text(key), None)
+        self._bump(conn, tab)
+        return True
+
+    def append_row(self, tab, row):
+        self._write(lambda conn: self._append(conn, tab, self._headers(conn, tab), row))
+
+    def _set_fields(self, conn, tab, headers, pos, data, fields):
+        changed = {}
+        for h, v in fields.items():
+            if h not in headers: continue
+            i = headers.index(h)
+            if i >= len(data): data.extend([""] * (i + 1 - len(data)))
+            if not same_cell(data[i], v):
+                data[i] = cell_text(v)
+                changed[h] = v
+        if not changed: return
+        key = _key_of(headers, tab, data)
+        conn.execute("UPDATE sheet_rows SET data=?, key=? WHERE tab=? AND pos=?", (json.dumps(data), key, tab, pos))
+        self._enqueue(conn, tab, "set", key, changed)
+        self._bump(conn, tab)
+
+    def update_fields(self, tab, key, fields):
+        def tx(conn):
+            headers = self._headers(conn, tab)
+            hit = self._find(conn, tab, key)
+            if not hit: return False
+            self._set_fields(conn, tab, headers, hit[0], json.loads(hit[1]), fields)
+            return True
+        return self._write(tx)
+
+    def update_many(self, tab, changes):
+        def tx(conn):
+            headers = self._headers(conn, tab)
+            found = []
+            for key, fields in changes.items():
+                hit = self._find(conn, tab, key)
+                if not hit: continue
+                found.append(key)
+                self._set_fields(conn, tab, headers, hit[0], json.loads(hit[1]), fields)
+            return found
+        return self._write(tx) if changes else []
+
+    def claim_fields(self, tab, column, values):
+        # Compare and set in one IMMEDIATE transaction, so processes sharing the file can't both win
+        def tx(conn):
+            headers = self._headers(conn, tab)
+            if column not in headers: return dict.fromkeys(values)
+            i = headers.index(column)
+            claimed = {}
+            for key, v in values.items():
+                hit = self._find(conn, tab, key)
+                if not hit:
+                    claimed[key] = None
+                    continue
+                data = json.loads(hit[1])
+                prev = data[i] if i < len(data) else ""
+                if same_cell(prev, v): continue
+                claimed[key] = prev
+                self._set_fields(conn, tab, headers, hit[0], data, {column: v})
+            return claimed
+        return self._write(tx) if values else {}
+
+    def update_cells(self, tab, cells, grid):
+        if not cells: return 0
+
+        def tx(conn):
+            headers = self._headers(conn, tab)
+            rows = conn.execute("SELECT pos, key FROM sheet_rows WHERE tab=? ORDER BY pos", (tab,)).fetchall()
+            by_row, dropped = _still_keyed(tab, cells, grid, [key for _, key in rows])
+            for i, fields in by_row.items():
+                pos = rows[i][0]
+                data = json.loads(conn.execute("SELECT data FROM sheet_rows WHERE tab=? AND pos=?",
+                                               (tab, pos)).fetchone()[0])
+                self._set_fields(conn, tab, headers, pos, data, fields)
+            return dropped
+        return self._write(tx)
+
+    def delete_row(self, tab, key):
+        return self._write(lambda conn: self._delete(conn, tab, key))
+
+    def apply_changes(self, tab, updates=None, inserts=(), deletes=()):
+        # One transaction; the syncer pushes the coalesced ops with one read and batched writes
+        def tx(conn):
+            headers = self._headers(conn, tab)
+            for key, fields in (updates or {}).items():
+                hit = self._find(conn, tab, key)
+                if hit: self._set_fields(conn, tab, headers, hit[0], json.loads(hit[1]), fields)
+            for key in deletes: self._delete(conn, tab, key)
+            for row in inserts: self._append(conn, tab, headers, row)
+        if updates or inserts or deletes: self._write(tx)
+
+    def replace_all(self, tab, grid):
+        def tx(conn):
+            # A full replace supersedes anything still queued for the tab
+            conn.execute("DELETE FROM outbox WHERE tab=?", (tab,))
+            self._load(conn, tab, grid)
+            self._enqueue(conn, tab, "replace", "", [list(r) for r in grid])
+        self._write(tx)
+
+    # --- sync side ---
+    def _load(self, conn, tab, grid):
+        headers = [cell_text(h) for h in grid[0]] if grid else []
+        conn.execute("DELETE FROM sheet_rows WHERE tab=?", (tab,))
+        conn.execute("INSERT OR REPLACE INTO sheet_headers (tab, headers) VALUES (?, ?)", (tab, json.dumps(headers)))
+        conn.executemany(
+            "INSERT INTO sheet_rows (tab, pos, key, data) VALUES (?, ?, ?, ?)",
+            [(tab, pos, _key_of(headers, tab, text), json.dumps(text))
+             for pos, text in enumerate(([cell_text(v) for v in r] for r in grid[1:]), start=1)],
+        )
+        self._bump(conn, tab)
+
+    def load_remote(self, tab, grid):
+        """Replace the local copy with a remote snapshot unless local edits are still queued."""
+        def tx(conn):
+            if conn.execute("SELECT 1 FROM outbox WHERE tab=? LIMIT 1", (tab,)).fetchone(): return False
+            if grid == self._grid_for_compare(conn, tab): return False
+            self._load(conn, tab, grid)
+            return True
+        return self._write(tx, notify=False)
+
+    def _grid_for_compare(self, conn, tab):
+        headers = self._headers(conn, tab)
+        if not headers: return None
+        return [headers] + [json.loads(d) for (d,) in conn.execute(
+            "SELECT data FROM sheet_rows WHERE tab=? ORDER BY pos", (tab,))]
+
+    def outbox(self, tab):
+        with self._lock:
+            return [(seq, op, key, json.loads(payload)) for seq, op, key, payload in self._conn.execute(
+                "SELECT seq, op, key, payload FROM outbox WHERE tab=? ORDER BY seq", (tab,))]
+
+    def ack(self, tab, upto_seq, renames=None):
+        """Drop pushed ops; `renames` {old key: new key} re-keys rows the push appended under a new id."""
+        def tx(conn):
+            conn.execute("DELETE FROM outbox WHERE tab=? AND seq<=?", (tab, upto_seq))
+            if not renames: return
+            headers = self._headers(conn, tab)
+            col = headers.index(KEY_COLUMNS[tab])
+            for old, new in renames.items():
+                hit = self._find(conn, tab, old)
+                if hit:
+                    data = json.loads(hit[1])
+                    if col >= len(data): data.extend([""] * (col + 1 - len(data)))
+                    data[col] = new
+                    conn.execute("UPDATE sheet_rows SET data=?, key=? WHERE tab=? AND pos=?",
+                                 (json.dumps(data), new, tab, hit[0]))
+                # Edits queued during the push were made to this row
+                conn.execute("UPDATE outbox SET key=? WHERE tab=? AND key=? AND op!='append'", (new, tab, old))
+            self._bump(conn, tab)
+        self._write(tx, notify=False)
+
+    def get_meta(self, name):
+        with self._lock:
+            hit = self._conn.execute("SELECT value FROM meta WHERE key=?", (name,)).fetchone()
+            return hit[0] if hit else None
+
+    def set_meta(self, name, value):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (name, str(value)))
+
+    def acquire_lease(self, name, owner, ttl):
+        """Cross-process mutex kept in meta: True while `owner` holds (or just took) `name`."""
+        def tx(conn):
+            now = time.time()
+            hit = conn.execute("SELECT value FROM meta WHERE key=?", (f"lease:{name}",)).fetchone()
+            if hit:
+                holder, expires = json.loads(hit[0])
+                if holder != owner and expires > now: return False
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                         (f"lease:{name}", json.dumps([owner, now + ttl])))
+            return True
+        return self._write(tx, notify=False)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# ==============================================================================
+#                           WRITE-BEHIND SYNC
+# ==============================================================================
+def _coalesce(ops, remote, unique=False):
+    """
+    Fold a tab's queued ops (none of them a replace) into (sets, appends, deletes).
+
+    `remote` maps key -> the sheet rows holding it, in order. Every append op stays its
+    own row. A set or delete goes where the local store applied it: the first remote row
+    with its key, else the oldest pending append with that key. With `unique` keys a
+    pending append wins, since the local copy can't hold a second row with its key.
+    Returns ({sheet_row: fields}, [(key, {header: value})] in queue order, [sheet_row]).
+    """
+    remote = {k: list(rows) for k, rows in remote.items()}
+    sets, appends, deletes = {}, [], []
+    for _, op, key, payload in ops:
+        if op == "append":
+            appends.append([key, dict(zip(payload["headers"], payload["row"]))])
+            continue
+        pending = next((a for a in appends if a[1] is not None and a[0] == key), None)
+        rows = remote.get(key)
+        if pending is not None and (unique or not rows):
+            if op == "set": pending[1].update(payload)
+            elif op == "delete": pending[1] = None
+        elif rows:
+            if op == "set": sets.setdefault(rows[0], {}).update(payload)
+            elif op == "delete":
+                r = rows.pop(0)
+                sets.pop(r, None)
+                deletes.append(r)
+    return sets, [(key, row) for key, row in appends if row is not None], deletes
+
+
+def row_runs(rows):
+    """Sheet rows -> (first, last) runs of consecutive rows, bottom run first so deletes don't shift each other."""
+    runs = []
+    for r in sorted(set(rows), reverse=True):
+        if runs and runs[-1][0] == r + 1: runs[-1][0] = r
+        else: runs.append([r, r])
+    return [tuple(run) for run in runs]
+
+
+def _same_but_key(cells, remote_row, k):
+    remote_row = remote_row + [""] * (len(cells) - len(remote_row))
+    return all(same_cell(a, b) for i, (a, b) in enumerate(zip(cells, remote_row)) if i != k)
+
+
+class LeaseLost(RuntimeError):
+    """Another process took the sync lease mid-push; the ops stay queued for it."""
+
+
+def push_tab(ws, tab, ops, renew=None, new_id=None):
+    """
+    Apply queued ops for one tab to its worksheet. Returns (API writes, {old key: new key}).
+
+    `renew()` is called before every write and must return True to go on; otherwise
+    LeaseLost is raised, so a push that outlives its lease stops instead of racing the new holder.
+    On a UNIQUE_KEY_TABS tab, an append whose key another writer already used remotely goes
+    in under `new_id(floor)` (default: `floor`, one past the highest id on the Sheet) unless
+    the same row is already there; the returned renames say which local rows to re-key.
+    """
+    def lease():
+        if renew is not None and not renew(): raise LeaseLost(tab)
+
+    writes = 0
+    last = max((i for i, op in enumerate(ops) if op[1] == "replace"), default=None)
+    if last is not None:
+        lease()
+        ws.clear()
+        ws.update(range_name='A1', values=ops[last][3])
+        writes += 2
+        ops = ops[last + 1:]
+        if not ops: return writes, {}
+
+    grid = ws.get_all_values()
+    headers = grid[0] if grid else []
+    col = {h: i for i, h in enumerate(headers)}
+    remote = {}
+    for r, row in enumerate(grid[1:], start=2):
+        remote.setdefault(_key_of(headers, tab, row), []).append(r)
+    unique = tab in UNIQUE_KEY_TABS
+    sets, appends, deletes = _coalesce(ops, remote, unique)
+
+    cells = {}
+    for r, fields in sets.items():
+        for h, v in fields.items():
+            if h in col: cells[(r, col[h])] = v
+    changed, _ = diff_cells(grid, cells)
+    if changed:
+        lease()
+        ws.batch_update(merge_ranges(changed))
+        writes += 1
+
+    gone = set(deletes)
+    new_rows, renames = [], {}
+    for key, row in appends:
+        cells = [row.get(h, "") for h in headers] if headers else list(row.values())
+        if unique and any(r not in gone for r in remote.get(key, ())):
+            k = col[KEY_COLUMNS[tab]]
+            # A push that died before its ack may have landed this row already, perhaps re-keyed
+            mine = remote.get(key, [])
+            landed = next((r for r in mine + [r for r in range(2, len(grid) + 1) if r not in mine]
+                           if r not in gone and _same_but_key(cells, grid[r - 1], k)), None)
+            if landed is not None:
+                renames[key] = key_text(grid[landed - 1][k])
+                continue
+            ids = [int(v) for v in list(remote) + list(renames.values()) if v.lstrip("-").isdigit()]
+            floor = max(ids, default=0) + 1
+            cells[k] = renames[key] = str(new_id(floor) if new_id else floor)
+            print(f"Sync Conflict: {tab} {key} was already on the Sheet; pushed as {cells[k]}")
+        new_rows.append(cells)
+    if new_rows:
+        lease()
+        ws.append_rows(new_rows)
+        writes += 1
+
+    for lo, hi in row_runs(deletes):
+        lease()
+        ws.delete_rows(lo, hi)
+        writes += 1
+    return writes, {old: new for old, new in renames.items() if old != new}
+
+
+class SheetSyncer:
+    """
+    Background thread that drains the LocalRepository outbox into Google Sheets.
+
+    Writes are debounced by `push_delay` so bursts (a refresh, a row of alerts)
+    go out together; remote edits are pulled every `pull_interval` seconds.
+    When several processes share the store (the app and price_daemon), only the
+    holder of the "sheet_sync" lease pushes and pulls; the others just queue.
+    """
+
+    def __init__(self, store, open_ws, push_delay=2.0, pull_interval=60.0, on_pushed=None,
+                 poll_interval=5.0, lease_ttl=60.0):
+        self.store = store
+        self.poll_interval = poll_interval
+        self.lease_ttl = lease_ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{id(self)}"
+        self.open_ws = open_ws
+        self.push_delay = push_delay
+        self.pull_interval = pull_interval
+        self.on_pushed = on_pushed
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_pull = 0.0
+        self.last_error = None
+        self.last_push = None
+        self.last_pull = None
+        store.on_write = self._wake.set
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return self
+        self._thread = threading.Thread(target=self._run, name="sheet-syncer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, flush=True):
+        self._stop.set()
+        self._wake.set()
+        if self._thread: self._thread.join(timeout=30)
+        if flush: self.push()
+
+    def _run(self):
+        backoff = self.push_delay
+        while not self._stop.is_set():
+            until_pull = self.pull_interval - (time.monotonic() - self._last_pull)
+            self._wake.wait(timeout=max(0.0, min(self.poll_interval, until_pull)))
+            if self._stop.is_set(): break
+            if self._wake.is_set():
+                time.sleep(self.push_delay)  # let a burst of writes collect
+                self._wake.clear()
+            try:
+                self.push()
+                if time.monotonic() - self._last_pull >= self.pull_interval: self.pull()
+                backoff = self.push_delay
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"Sync Error: {self.last_error}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 300)
+                self._wake.set()
+
+    def is_leader(self):
+        return self.store.acquire_lease("sheet_sync", self.owner, self.lease_ttl)
+
+    def push(self):
+        if not self.store.pending() or not self.is_leader(): return 0
+        writes = 0
+        try:
+            for tab in TABS:
+                ops = self.store.outbox(tab)
+                if not ops: continue
+                # Every write renews the lease, so a long push under quota backoff keeps it
+                n, renames = push_tab(self.open_ws(tab), tab, ops, renew=self.is_leader,
+                                      new_id=lambda floor: self.store.next_id(tab, floor=floor))
+                self.store.ack(tab, ops[-1][0], renames)
+                writes += n
+                if renames:
+                    moved = ", ".join(f"{old} -> {new}" for old, new in renames.items())
+                    self.store.set_meta("sync_conflict", f"{tab} ids taken on the Sheet were re-keyed: {moved}")
+        except LeaseLost as e:
+            self.last_error = f"Sync lease lost while pushing {e}; the new holder pushes the rest"
+            print(f"Sync Error: {self.last_error}")
+        if writes:
+            self.last_push = time.time()
+            if self.on_pushed: self.on_pushed()
+        return writes
+
+    def pull(self, tabs=TABS):
+        self._last_pull = time.monotonic()
+        if not self.is_leader(): return
+        for tab in tabs:
+            if self.store.pending(tab): continue
+            self.store.load_remote(tab, self.open_ws(tab).get_all_values())
+        self.last_pull = time.time()
@@ -0,0 +1,192 @@
+import queue
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# --- CONFIGURATION ---
+API_BASE = "https://api.telegram.org"
+REQUEST_TIMEOUT = 10       # seconds per HTTPS call
+MAX_RETRIES = 5
+PER_CHAT_INTERVAL = 1.0    # Telegram: ~1 message/second into the same chat
+GLOBAL_INTERVAL = 1 / 30   # Telegram: ~30 messages/second per bot
+MAX_MESSAGE_LEN = 4096
+COOLDOWN_SKIP = 0.25      # a chat further than this from its next slot is skipped, not waited on
+
+
+class TelegramDispatcher:
+    """
+    Queue of outgoing alerts drained by one background worker.
+
+    Uses a pooled keep-alive session, spaces messages to stay under Telegram's
+    per-chat and per-bot limits, honours `retry_after` on 429 and backs off on
+    transport errors / 5xx. Messages for a chat that is backing off wait in that
+    chat's own line, in order, without holding up other chats. Inside `with dispatcher.digest():` messages from the
+    calling thread are held and sent as one combined message per chat on exit.
+    """
+
+    def __init__(self, bot_token, chat_ids, api_base=API_BASE, timeout=REQUEST_TIMEOUT,
+                 max_retries=MAX_RETRIES, per_chat_interval=PER_CHAT_INTERVAL,
+                 global_interval=GLOBAL_INTERVAL, session=None):
+        if not isinstance(chat_ids, (list, tuple)): chat_ids = [chat_ids]
+        self.chat_ids = [str(c) for c in chat_ids]
+        self.url = f"{api_base.rstrip('/')}/bot{bot_token}/sendMessage"
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.per_chat_interval = per_chat_interval
+        self.global_interval = global_interval
+
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._queue = queue.Queue()
+        self._held = {}    # chat id -> deque of (cid, message, attempt); worker thread only
+        self._local = threading.local()
+        self._next_chat = {}
+        self._next_global = 0.0
+        self._lock = threading.Lock()
+        self.sent = self.failed = self.retried = 0
+        self.last_error = None
+        self._thread = threading.Thread(target=self._run, name="telegram-dispatch", daemon=True)
+        self._thread.start()
+
+    # --- producer side ---
+    def send(self, message):
+        buf = getattr(self._local, 'digest', None)
+        if buf is not None:
+            buf.append(message)
+            return
+        for cid in self.chat_ids:
+            self._queue.put((cid, message, 0))
+
+    @contextmanager
+    def digest(self, header="🔔 *Alerts*"):
+        outer = getattr(self._local, 'digest', None)
+        if outer is not None:
+            yield
+            return
+        self._local.digest = []
+        try:
+            yield
+        finally:
+            buf, self._local.digest = self._local.digest, None
+            if len(buf) == 1: self.send(buf[0])
+            elif buf:
+                for chunk in _pack(buf, header): self.send(chunk)
+
+    def drain(self, timeout=None):
+        """Block until everything queued so far has been delivered or dropped."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline: return False
+            time.sleep(0.01)
+        return True
+
+    def pending(self):
+        return self._queue.unfinished_tasks
+
+    # --- worker side ---
+    def _reserve(self, cid):
+        """Claim the next send slot for `cid`; returns seconds to wait, or None if the chat is cooling down."""
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next_global, self._next_chat.get(cid, 0.0))
+            if at - now > COOLDOWN_SKIP: return None
+            self._next_global = at + self.global_interval
+            self._next_chat[cid] = at + self.per_chat_interval
+            return at - now
+
+    def _until_ready(self):
+        """Seconds until the first held chat may send again, or None when nothing is held."""
+        if not self._held: return None
+        with self._lock:
+            now = time.monotonic()
+            at = min(max(self._next_global, self._next_chat.get(cid, 0.0)) for cid in self._held)
+        return max(0.0, at - now - COOLDOWN_SKIP)
+
+    def _run(self):
+        while True:
+            # Sleep on the queue until a new message arrives or a held chat's slot opens
+            timeout = self._until_ready()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout != 0 else self._queue.get_nowait()
+                while True:
+                    self._held.setdefault(item[0], deque()).append(item)
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            for cid in list(self._held):
+                wait = self._reserve(cid)
+                if wait is None: continue
+                if wait: time.sleep(wait)
+                self._send_next(cid)
+
+    def _send_next(self, cid):
+        line = self._held[cid]
+        _, message, attempt = line.popleft()
+        try:
+            done = self._deliver(cid, message, attempt)
+        except Exception as e:
+            self.failed += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"Telegram Error: {self.last_error}")
+            done = True
+        if not done: line.appendleft((cid, message, attempt + 1))  # retried before anything newer
+        if not line: del self._held[cid]
+        if done: self._queue.task_done()
+
+    def _deliver(self, cid, message, attempt):
+        """True once the message is finished with (sent or given up on), False to retry it."""
+        payload = {"chat_id": cid, "text": message, "parse_mode": "Markdown"}
+        delay = None
+        t0 = time.perf_counter()
+        try:
+            resp = self.session.post(self.url, json=payload, timeout=self.timeout)
+            metrics.record_call("telegram", "sendMessage", (time.perf_counter() - t0) * 1e3)
+            if resp.status_code == 200:
+                self.sent += 1
+                return True
+            if resp.status_code == 429:
+                try: delay = float(resp.json().get("parameters", {}).get("retry_after", 1))
+                except (ValueError, TypeError, AttributeError): delay = 1.0
+                with self._lock:
+                    self._next_chat[cid] = time.monotonic() + delay
+            elif resp.status_code < 500:
+                self.failed += 1
+                self.last_error = f"HTTP {resp.status_code}: {resp.text[:200]}"
+                print(f"Telegram Error: {self.last_error}")
+                return True
+            self.last_error = f"HTTP {resp.status_code}"
+        except requests.RequestException as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+
+        if attempt + 1 >= self.max_retries:
+            self.failed += 1
+            print(f"Telegram Error: giving up on chat {cid}: {self.last_error}")
+            return True
+        self.retried += 1
+        if delay is None:
+            with self._lock:
+                self._next_chat[cid] = time.monotonic() + min(2 ** attempt, 30) * (0.5 + random.random())
+        return False
+
+
+def _pack(messages, header):
+    """Join alerts into as few messages as fit Telegram's length limit."""
+    chunks, cur = [], header
+    for m in messages:
+        piece = "\n\n" + m
+        if len(cur) + len(piece) > MAX_MESSAGE_LEN and cur != header:
+            chunks.append(cur)
+            cur = header
+        cur += piece
+    chunks.append(cur)
+    return chunks
@@ -0,0 +1,104 @@
+"""
+Shared test setup. The app modules and benchmarks' fakes import from the repo root,
+and nothing here touches the real symbol cache, snapshot file or Google Sheet.
+"""
+import os
+import sys
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import pytest  # noqa: E402
+
+from coordination import AlertLedger, SingleFlight  # noqa: E402
+from fakes import TRADES_HEADERS, synthetic_book  # noqa: E402
+from quotes import SymbolResolver, set_symbol_resolver  # noqa: E402
+from storage import LocalRepository  # noqa: E402
+from trade_snapshot import TradeSnapshot, set_trade_snapshot  # noqa: E402
+
+NOW = datetime(2024, 3, 1, 11, 15)   # the clock trade rules are evaluated at
+
+
+def trade_row(id, name, cmp="", entry="100", sl="95", tgt="110", zone="DEMAND", status="Pending"):
+    """One Trades row in TRADES_HEADERS order, as the Sheet returns it."""
+    return [str(id), name, str(cmp), str(entry), str(sl), str(tgt), "", "QIT", "", zone, "", "", status, ""]
+
+
+def trades_grid(*rows):
+    return [list(TRADES_HEADERS)] + [list(r) for r in rows]
+
+
+def edge_grid():
+    """Rows the synthetic book doesn't produce: blanks, zeros, commas, every trigger and exit path."""
+    rows = [
+        # name, cmp, entry, stop_loss, target, zone, status
+        ("DEM_TRIG", "", "100", "95", "110", "DEMAND", "Pending"),
+        ("DEM_WAIT", "", "100", "95", "110", "DEMAND", "Pending"),
+        ("SUP_TRIG", "", "100", "105", "90", "SUPPLY", "Pending"),
+        ("SUP_WAIT", "", "100", "105", "90", "SUPPLY", ""),
+        ("DEM_TGT", "", "100", "95", "110", "DEMAND", "Active"),
+        ("DEM_SL", "", "100", "95", "110", "DEMAND", "Active"),
+        ("SUP_TGT", "", "100", "105", "90", "SUPPLY", "Active"),
+        ("SUP_SL", "", "100", "105", "90", "SUPPLY", "Active"),
+        ("BOTH_HIT", "", "100", "120", "110", "DEMAND", "Active"),
+        ("ZERO_ENTRY", "", "0", "95", "110", "DEMAND", "Pending"),
+        ("BLANK_ENTRY", "", "", "95", "110", "SUPPLY", " "),
+        ("ZERO_TGT", "", "100", "95", "0", "DEMAND", "Active"),
+        ("BLANK_SL", "", "100", "", "", "DEMAND", "Active"),
+        ("COMMA", "", "1,234.5", "1,200", "1,300", "DEMAND", "Pending"),
+        ("NO_ZONE", "", "100", "95", "110", "", "Pending"),
+        ("NO_QUOTE", "", "100", "95", "110", "DEMAND", "Pending"),
+        ("", "", "100", "95", "110", "DEMAND", "Pending"),
+        ("DONE", "", "100", "95", "110", "DEMAND", "Target-Hit"),
+    ]
+    prices = {"DEM_TRIG": 99.5, "DEM_WAIT": 100.5, "SUP_TRIG": 100.0, "SUP_WAIT": 99.0, "DEM_TGT": 110.0,
+              "DEM_SL": 94.0, "SUP_TGT": 89.0, "SUP_SL": 105.0, "BOTH_HIT": 115.0, "ZERO_ENTRY": 1.0,
+              "BLANK_ENTRY": 1.0, "ZERO_TGT": 500.0, "BLANK_SL": 1.0, "COMMA": 1234.5, "NO_ZONE": 50.0,
+              "DONE": 200.0}
+    grid = [TRADES_HEADERS]
+    for i, (name, cmp, entry, sl, tgt, zone, status) in enumerate(rows):
+        grid.append([str(i + 1), name, cmp, entry, sl, tgt, "", "QIT", "", zone, "", "", status, ""])
+    return grid, prices
+
+
+def synthetic_case(n=400):
+    grids, quotes = synthetic_book(n)
+    grid = grids["Trades"]
+    prices = {row[1]: quotes[row[1].split(".")[0]] for row in grid[1:]}
+    return grid, prices
+
+
+@pytest.fixture(autouse=True)
+def memory_resolver():
+    # Symbols resolve to NSE without reading or writing symbol_cache.json
+    set_symbol_resolver(SymbolResolver(path=None))
+    yield
+    set_symbol_resolver(None)
+
+
+@pytest.fixture
+def local_repo(tmp_path):
+    repo = LocalRepository(str(tmp_path / "store.db"))
+    yield repo
+    repo.close()
+
+
+@pytest.fixture
+def bind_core(monkeypatch):
+    """bind_core(repo) -> the core module reading and writing `repo`, with fresh process-wide state."""
+    import core
+    import quotes
+
+    def bind(repo):
+        monkeypatch.setattr(core, "get_repo", lambda: repo)
+        monkeypatch.setattr(core, "ALERTS", AlertLedger())
+        monkeypatch.setattr(core, "REFRESH", SingleFlight())
+        monkeypatch.setattr(quotes, "_recent", {})
+        core._valuation.clear()
+        set_trade_snapshot(TradeSnapshot(path=None))
+        return core
+
+    yield bind
+    set_trade_snapshot(None)
@@ -0,0 +1,62 @@
+"""BarStore against a scripted download: gap-only fetches, merging, and quotes only from fresh tails."""
+import numpy as np
+import pandas as pd
+
+import bar_store
+from bar_store import BarStore, StoredBarsProvider
+
+
+class Downloads:
+    """Scripted download_bars: daily bars up to `end`, from `start` or for 30 days; logs every call."""
+
+    def __init__(self, end="2024-03-01"):
+        self.end = pd.Timestamp(end)
+        self.calls = []
+        self.down = set()
+
+    def __call__(self, symbols, interval, start=None, period=None):
+        self.calls.append((tuple(symbols), start, period))
+        begin = pd.Timestamp(start) if start is not None else self.end - pd.Timedelta(days=30)
+        idx = pd.date_range(begin, self.end, freq="D", tz="Asia/Kolkata")
+        close = np.arange(len(idx)) + 100.0
+        return {s: pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 10.0},
+                                index=idx) for s in symbols if s not in self.down}
+
+
+def test_first_update_fetches_history_then_only_the_gap(tmp_path, monkeypatch):
+    fetch = Downloads()
+    store = BarStore(str(tmp_path), fetch=fetch)
+    assert store.update(["A.NS", "B.NS"]) == {"A.NS": 31, "B.NS": 31}
+    monkeypatch.setattr(bar_store, "MIN_REFETCH", 0)
+    fetch.end += pd.Timedelta(days=2)
+    assert store.update(["A.NS", "B.NS"]) == {"A.NS": 2, "B.NS": 2}
+    (syms, start, period), = fetch.calls[1:]
+    assert syms == ("A.NS", "B.NS") and period is None
+    assert start == pd.Timestamp("2024-03-01")   # the last stored day is fetched again, it may still be forming
+    assert len(store.load("A.NS")) == 33
+
+
+def test_recent_fetches_are_served_from_disk(tmp_path):
+    fetch = Downloads()
+    store = BarStore(str(tmp_path), fetch=fetch)
+    store.update(["A.NS"])
+    store.update(["A.NS"])
+    assert len(fetch.calls) == 1
+
+
+def test_a_restarted_store_reads_the_files(tmp_path):
+    BarStore(str(tmp_path), fetch=Downloads()).update(["A.NS"])
+    reopened = BarStore(str(tmp_path), fetch=Downloads())
+    assert reopened.last_close(["A.NS", "C.NS"]) == {"A.NS": 130.0}
+    assert reopened.last_timestamp("A.NS") == pd.Timestamp("2024-03-01", tz="Asia/Kolkata").tz_convert("UTC")
+    assert len(reopened.history(["A.NS"], days=100000)["A.NS"]) == 31
+
+
+def test_provider_quotes_only_symbols_whose_tail_just_arrived(tmp_path):
+    fetch = Downloads()
+    store = BarStore(str(tmp_path), fetch=fetch)
+    store.append("B.NS", fetch(["B.NS"], "1d")["B.NS"])   # stored earlier, not refreshed now
+    fetch.down = {"B.NS"}
+    quotes, errors = StoredBarsProvider(store).fetch(["A.NS", "B.NS", "C.NS"])
+    assert quotes == {"A.NS": 130.0, "C.NS": 130.0}
+    assert errors == {"B.NS"}
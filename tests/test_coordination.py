@@ -0,0 +1,113 @@
+"""SingleFlight, Coalescer and alert claiming, within one process and across processes sharing the store."""
+import threading
+import time
+from contextlib import nullcontext
+
+import pandas as pd
+import pytest
+
+from conftest import trade_row, trades_grid
+from coordination import AlertLedger, Coalescer, SingleFlight
+from storage import LocalRepository
+
+
+def slow(result, started, release):
+    def fn():
+        started.set()
+        release.wait(5)
+        return result
+    return fn
+
+
+# ==============================================================================
+#                           SINGLE-FLIGHT RUNS
+# ==============================================================================
+def test_concurrent_callers_share_one_run():
+    flight, calls = SingleFlight(), []
+    started, release = threading.Event(), threading.Event()
+
+    def fn():
+        calls.append(1)
+        return slow("quotes", started, release)()
+
+    out = []
+    leader = threading.Thread(target=lambda: out.append(flight.run(fn)))
+    leader.start()
+    started.wait(5)
+    waiters = [threading.Thread(target=lambda: out.append(flight.run(fn))) for _ in range(3)]
+    for t in waiters: t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in [leader] + waiters: t.join(5)
+    assert len(calls) == 1
+    assert sorted(out) == [("quotes", False)] + [("quotes", True)] * 3
+
+
+def test_cooldown_reuses_and_not_before_refuses_older_runs():
+    flight = SingleFlight(cooldown=60)
+    assert flight.run(lambda: 1) == (1, False)
+    assert flight.run(lambda: 2) == (1, True)
+    assert flight.run(lambda: 3, not_before=time.monotonic()) == (3, False)
+    assert flight.stats()["runs"] == 2 and flight.stats()["reused"] == 1
+
+
+def test_failed_run_is_not_reused():
+    flight = SingleFlight(cooldown=60)
+
+    def boom(): raise RuntimeError("quota")
+    with pytest.raises(RuntimeError): flight.run(boom)
+    assert flight.run(lambda: "ok") == ("ok", False)
+
+
+def test_coalescer_shares_by_key():
+    co = Coalescer()
+    started, release = threading.Event(), threading.Event()
+    out = []
+    t = threading.Thread(target=lambda: out.append(co.run("Trades", slow("grid", started, release))))
+    t.start()
+    started.wait(5)
+    joiner = threading.Thread(target=lambda: out.append(co.run("Trades", lambda: "second")))
+    joiner.start()
+    time.sleep(0.05)
+    assert co.run("Links", lambda: "links") == "links"
+    release.set()
+    t.join(5)
+    joiner.join(5)
+    assert out == ["grid", "grid"] and co.joined == 1
+
+
+# ==============================================================================
+#                           ALERT CLAIMS
+# ==============================================================================
+def test_ledger_claims_each_alert_once():
+    ledger = AlertLedger()
+    assert ledger.claim("Trades", [1, 2], ["Entry", "SL"]).tolist() == [True, True]
+    assert ledger.claim("Trades", [1, 2], ["Entry", "Target"]).tolist() == [False, True]
+
+
+def test_claim_fields_lets_one_process_win(local_repo, tmp_path):
+    local_repo.load_remote("Trades", trades_grid(trade_row(1, "AAA"), trade_row(2, "BBB")))
+    other = LocalRepository(str(tmp_path / "store.db"))   # the daemon, sharing the file
+    try:
+        assert local_repo.claim_fields("Trades", "last_alert", {"1": "Entry", "9": "Entry"}) == {"1": "", "9": None}
+        assert other.claim_fields("Trades", "last_alert", {"1": "Entry", "2": "SL"}) == {"2": ""}
+    finally:
+        other.close()
+
+
+def test_dispatch_records_alerts_even_when_telegram_fails(local_repo, bind_core, monkeypatch):
+    local_repo.load_remote("Trades", trades_grid(trade_row(1, "AAA"), trade_row(2, "BBB")))
+    core = bind_core(local_repo)
+    sent = []
+
+    def flaky(msg, test_mode=False):
+        sent.append(msg)
+        print("Telegram Error: timed out")   # what send_telegram_message does on failure
+    monkeypatch.setattr(core, "send_telegram_message", flaky)
+    monkeypatch.setattr(core, "telegram_digest", nullcontext)
+    df = pd.DataFrame(local_repo.records("Trades")).assign(Alert=["", "SL HIT"])
+    assert core.dispatch_alerts(df)['id'].tolist() == [2]
+    assert len(sent) == 1
+    # At most once: the next render does not send it again
+    assert core.dispatch_alerts(df).empty and len(sent) == 1
+    assert local_repo.values("Trades")[2][13] == "SL HIT"
@@ -0,0 +1,32 @@
+"""Portfolio valuation: renders read the last refresh's quotes, only an explicit refresh fetches."""
+from conftest import trade_row, trades_grid
+from fakes import PORTFOLIO_HEADERS
+from quotes import FakePriceProvider
+
+HOLDINGS = [PORTFOLIO_HEADERS, ["AAA", "2024-01-01", "90", "120", "100", ""],
+            ["BBB", "2024-01-01", "45", "60", "50", ""]]
+
+
+def test_render_never_fetches(local_repo, bind_core):
+    local_repo.load_remote("Portfolio", HOLDINGS)
+    core = bind_core(local_repo)
+    provider = FakePriceProvider({"AAA": 110, "BBB": 55})
+    valued = core.get_portfolio_valuation(provider=provider)
+    assert provider.calls == 0 and valued['cmp'].isna().all()
+
+    refreshed = core.get_portfolio_valuation(provider=provider, refresh=True)
+    assert provider.calls == 1
+    assert refreshed['cmp'].tolist() == [110.0, 55.0]
+    assert refreshed['pnl'].tolist() == [10.0, 5.0]
+    assert core.get_portfolio_valuation(provider=provider) is refreshed   # the next render reuses it
+    assert provider.calls == 1
+
+
+def test_render_uses_the_quotes_of_a_trades_refresh(local_repo, bind_core):
+    local_repo.load_remote("Portfolio", HOLDINGS)
+    local_repo.load_remote("Trades", trades_grid(trade_row(1, "CCC")))
+    core = bind_core(local_repo)
+    provider = FakePriceProvider({"AAA": 110, "BBB": 55, "CCC": 101})
+    core.update_prices_logic(provider)
+    assert core.get_portfolio_valuation()['cmp'].tolist() == [110.0, 55.0]
+    assert provider.calls == 1
@@ -0,0 +1,61 @@
+"""TradeBook and FeedRunner: tick-driven evaluation must agree with the batch engine."""
+import numpy as np
+import pytest
+
+from conftest import NOW, edge_grid, synthetic_case
+from quote_feed import FeedRunner, ReplayFeed, write_ticks
+from quotes import to_yf_symbol
+from trade_engine import TradeBook, evaluate_trades, frame_from_values
+
+
+# ==============================================================================
+#                           TRADEBOOK
+# ==============================================================================
+@pytest.mark.parametrize("case", [edge_grid, synthetic_case])
+def test_tradebook_ticks_match_evaluate_trades(case):
+    grid, prices = case()
+    table = frame_from_values(grid)
+    res = evaluate_trades(table, [prices.get(name, np.nan) for name in table['stock_name']], NOW)
+
+    book = TradeBook(grid)
+    quotes = {to_yf_symbol(name): price for name, price in prices.items()}
+    changes = {}
+    for symbol in list(book.by_symbol):
+        if symbol not in quotes: continue
+        for key, fields in book.on_tick(symbol, quotes[symbol], NOW).changes.items():
+            changes.setdefault(key, {}).update(fields)
+
+    assert book.status.tolist() == res.values['status'].tolist()
+    assert book.trigger_date.tolist() == res.values['trigger_date'].tolist()
+    assert book.exit_date.tolist() == res.values['exit_date'].tolist()
+    moved = {grid[i + 1][0] for i in np.flatnonzero(res.write_mask['status'].to_numpy())}
+    assert {k for k, f in changes.items() if "status" in f} == moved
+
+
+def test_tradebook_alerts_once_per_change():
+    grid, prices = edge_grid()
+    book = TradeBook(grid)
+    first = book.on_tick(to_yf_symbol("DEM_TRIG"), prices["DEM_TRIG"], NOW)
+    assert first.alerts['Alert'].tolist() == ["Trade is Active"]
+    assert first.changes["1"]["last_alert"] == "Trade is Active"
+    again = book.on_tick(to_yf_symbol("DEM_TRIG"), prices["DEM_TRIG"], NOW)
+    assert again.alerts is None and again.changes == {}
+
+
+
+# ==============================================================================
+#                           FEED RUNNER
+# ==============================================================================
+def test_replayed_ticks_alert_at_once_and_persist_in_one_flush(tmp_path):
+    grid, prices = edge_grid()
+    path = str(tmp_path / "ticks.csv")
+    write_ticks(path, [(1.0, to_yf_symbol(n), prices[n]) for n in ("DEM_TRIG", "DEM_SL", "DEM_TRIG")])
+    alerts, flushed = [], []
+    runner = FeedRunner(TradeBook(grid), flushed.append, alerts.append, flush_interval=3600)
+    feed = ReplayFeed(path)
+    feed.subscribe(runner.on_tick)
+    assert feed.run() == 3
+    assert [a['Alert'].tolist() for a in alerts] == [["Trade is Active"]]   # the repeat tick sends nothing
+    assert flushed == [] and runner.flush() == 2
+    assert flushed[0]["1"]["status"] == "Active" and flushed[0]["6"]["status"] == "SL-Hit"
+    assert runner.stats()["ticks"] == 3
@@ -0,0 +1,67 @@
+"""Symbol resolution and the shared quote cache: what gets negative-cached and what is retried."""
+import pandas as pd
+
+from bar_store import BarStore, StoredBarsProvider
+from quotes import FakePriceProvider, SymbolResolver, YFinanceProvider, fetch_cmp_map, resolve_misses
+
+
+class FlakyProvider(FakePriceProvider):
+    """FakePriceProvider whose lookups fail for `down` (a timeout, not an unknown symbol)."""
+
+    def __init__(self, prices=None, down=()):
+        super().__init__(prices)
+        self.down = set(down)
+
+    def fetch(self, symbols):
+        quotes = self.get_quotes([s for s in symbols if s not in self.down])
+        return quotes, {s for s in symbols if s in self.down}
+
+
+def test_yfinance_reports_failed_lookups_apart_from_empty_ones(monkeypatch):
+    provider = YFinanceProvider()
+    monkeypatch.setattr(provider, "_download_batch", lambda batch: {"AAA.NS": 10.0})
+    answers = {"BBB.NS": (None, True), "CCC.NS": (None, False), "DDD.NS": (30.0, True)}
+    monkeypatch.setattr(provider, "_fetch_one", answers.get)
+    assert provider.fetch(["AAA.NS", "BBB.NS", "CCC.NS", "DDD.NS"]) == ({"AAA.NS": 10.0, "DDD.NS": 30.0}, {"CCC.NS"})
+
+
+def test_clean_miss_is_retried_on_bse_then_marked_dead():
+    resolver = SymbolResolver(path=None)
+    more = resolve_misses(["AAA.NS", "BBB.NS", "CCC.NS"], {"AAA.NS": 10.0},
+                          FakePriceProvider({"BBB.BO": 20.0}), resolver)
+    assert more == {"BBB.BO": 20.0}
+    assert resolver.symbol("BBB") == "BBB.BO"
+    assert resolver.is_dead("CCC") and not resolver.is_dead("AAA")
+
+
+def test_failed_lookups_are_not_marked_dead():
+    resolver = SymbolResolver(path=None)
+    provider = FlakyProvider({"AAA.NS": 10.0}, down={"BBB.NS", "CCC.BO"})
+    got, errors = provider.fetch(["AAA.NS", "BBB.NS", "CCC.NS"])
+    assert errors == {"BBB.NS"}
+    resolve_misses(["AAA.NS", "BBB.NS", "CCC.NS"], got, provider, resolver, errors)
+    assert resolver.unresolved() == {}   # BBB timed out on NSE, CCC on its BSE retry
+
+
+def test_failed_lookups_are_asked_for_again(bind_core, local_repo):
+    bind_core(local_repo)
+    provider = FlakyProvider({"AAA.NS": 10.0, "BBB.NS": 20.0}, down={"BBB.NS"})
+    assert fetch_cmp_map(["AAA.NS", "BBB.NS"], provider, max_age=60) == {"AAA.NS": 10.0}
+    provider.down.clear()
+    assert fetch_cmp_map(["AAA.NS", "BBB.NS"], provider, max_age=60) == {"AAA.NS": 10.0, "BBB.NS": 20.0}
+    assert provider.calls == 2 and provider.symbols_requested == 2   # AAA came from the cache
+
+
+def test_clean_miss_is_not_asked_for_again_within_max_age(bind_core, local_repo):
+    bind_core(local_repo)
+    provider = FakePriceProvider({"AAA.NS": 10.0})
+    fetch_cmp_map(["AAA.NS", "ZZZ.BO"], provider, max_age=60)
+    calls = provider.calls
+    assert fetch_cmp_map(["AAA.NS", "ZZZ.BO"], provider, max_age=60) == {"AAA.NS": 10.0}
+    assert provider.calls == calls
+
+
+def test_stored_bars_count_a_missing_tail_as_a_failed_lookup(tmp_path):
+    store = BarStore(root=str(tmp_path), fetch=lambda symbols, interval, **kw: {})   # the download fails
+    store.append("AAA.NS", pd.DataFrame({"Close": [10.0]}, index=pd.to_datetime(["2026-10-15"])))
+    assert StoredBarsProvider(store).fetch(["AAA.NS", "BBB.NS"]) == ({}, {"AAA.NS"})
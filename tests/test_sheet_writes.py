@@ -0,0 +1,74 @@
+"""Cell and row diffs against a get_all_values() snapshot, and the A1 ranges they are written as."""
+import numpy as np
+
+from fakes import PORTFOLIO_HEADERS
+from sheet_writes import diff_cells, diff_rows, merge_ranges
+
+
+# ==============================================================================
+#                           CELL DIFFS
+# ==============================================================================
+def test_diff_cells_skips_equal_values():
+    grid = [["id", "cmp", "status"], ["1", "101.50", "Active"], ["2", "1,200", ""]]
+    changed, skipped = diff_cells(grid, {(2, 1): 101.5, (2, 2): "Active", (3, 1): 1200.0,
+                                         (3, 2): "Pending", (4, 1): ""})
+    assert changed == {(3, 2): "Pending"}
+    assert skipped == 4
+
+
+def test_merge_ranges_packs_runs_into_blocks():
+    cells = {(2, 1): "a", (2, 2): "b", (3, 1): "c", (3, 2): "d", (5, 1): "e", (2, 12): "f", (3, 27): "g"}
+    assert merge_ranges(cells) == [
+        {'range': 'B2:C3', 'values': [["a", "b"], ["c", "d"]]},
+        {'range': 'M2', 'values': [["f"]]},
+        {'range': 'AB3', 'values': [["g"]]},
+        {'range': 'B5', 'values': [["e"]]},
+    ]
+
+
+def test_merge_ranges_never_writes_a_cell_it_was_not_given():
+    cells = {(2, 0): 1, (2, 2): 3, (3, 0): 4, (3, 1): 5, (3, 2): 6}
+    written = {}
+    for rng in merge_ranges(cells):
+        assert rng['values'] and all(v is not None for row in rng['values'] for v in row)
+        written[rng['range']] = rng['values']
+    assert sum(len(row) for vals in written.values() for row in vals) == len(cells)
+
+
+# ==============================================================================
+#                           ROW DIFFS
+# ==============================================================================
+def test_diff_rows_keyed_updates_inserts_deletes():
+    headers = ["stock_name", "stop_loss", "target"]
+    old = [["AAA", "10", "20"], ["BBB", "5", ""], ["CCC", "1", "2"], ["", "9", "9"]]
+    new = [["BBB", 5.0, np.nan], ["AAA", "10", 21], ["DDD", 1, 2]]
+    updates, inserts, deletes = diff_rows(old, new, headers, "stock_name")
+    assert updates == {"AAA": {"target": 21}}
+    assert inserts == [["DDD", 1, 2]]
+    assert deletes == ["CCC"]
+
+
+def test_diff_rows_refuses_duplicate_keys():
+    headers = ["stock_name", "target"]
+    assert diff_rows([["AAA", "1"], ["AAA", "2"]], [["AAA", "1"]], headers, "stock_name") is None
+
+
+def test_portfolio_save_writes_only_the_edited_rows(local_repo, bind_core):
+    local_repo.load_remote("Portfolio", [PORTFOLIO_HEADERS, ["AAA", "2024-01-01", "90", "120", "100", ""],
+                                         ["BBB", "2024-01-01", "45", "60", "50", ""]])
+    core = bind_core(local_repo)
+    loaded = core.get_portfolio_df()
+    edited = loaded.copy()
+    edited.loc[1, 'target'] = 65
+    assert core.save_portfolio_df(edited, loaded) == 1
+    assert [op[1:3] for op in local_repo.outbox("Portfolio")] == [("set", "BBB")]
+    assert core.save_portfolio_df(edited, edited) == 0
+
+
+def test_portfolio_save_rewrites_the_tab_when_names_repeat(local_repo, bind_core):
+    local_repo.load_remote("Portfolio", [PORTFOLIO_HEADERS, ["AAA", "2024-01-01", "90", "120", "100", ""]])
+    core = bind_core(local_repo)
+    loaded = core.get_portfolio_df()
+    doubled = loaded.iloc[[0, 0]].reset_index(drop=True)
+    assert core.save_portfolio_df(doubled, loaded) == 2
+    assert [op[1] for op in local_repo.outbox("Portfolio")] == ["replace"]
@@ -0,0 +1,127 @@
+"""SheetsGuard against benchmarks' FakeSpreadsheet: pacing, retries, merged writes and shared reads."""
+import threading
+import time
+
+import pytest
+import requests
+
+import sheets_client
+from fakes import FakeSpreadsheet
+from sheets_client import SheetsGuard, TokenBucket, bucket_for
+
+
+class HTTPError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.response = requests.Response()
+        self.response.status_code = status
+
+
+def failing(times, status, result="ok"):
+    calls = []
+
+    def fn(*args):
+        calls.append(args)
+        if len(calls) <= times: raise HTTPError(status)
+        return result
+    return fn, calls
+
+
+@pytest.fixture
+def guard(monkeypatch):
+    monkeypatch.setattr(sheets_client, "BACKOFF_BASE", 0.0)
+    return SheetsGuard(read_quota=6000, write_quota=6000, max_retries=3, linger=0.05)
+
+
+# ==============================================================================
+#                           TOKEN BUCKET
+# ==============================================================================
+def test_bucket_never_exceeds_the_quota_share():
+    for quota in (60, 300, 6000):
+        b = bucket_for(quota)
+        assert b.capacity + 60 * b.rate <= quota * sheets_client.QUOTA_SHARE + 1e-9
+
+
+def test_bucket_paces_past_the_burst():
+    bucket = TokenBucket(rate=50, capacity=2)
+    t0 = time.monotonic()
+    waits = [bucket.take() for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2:] == [pytest.approx(0.02, abs=0.01)] * 2   # one token every 1/rate seconds
+    assert time.monotonic() - t0 >= 0.035
+
+
+# ==============================================================================
+#                           RETRIES
+# ==============================================================================
+def test_throttled_calls_are_retried(guard):
+    fn, calls = failing(2, 429)
+    assert guard.call("append_rows", fn, [["x"]]) == "ok"   # a 429 was never applied, so even appends retry
+    assert len(calls) == 3 and guard.retries == 2
+
+
+def test_server_errors_retry_only_idempotent_calls(guard):
+    fn, calls = failing(1, 503)
+    assert guard.call("batch_update", fn, []) == "ok" and len(calls) == 2
+    fn, calls = failing(1, 503)
+    with pytest.raises(HTTPError): guard.call("append_rows", fn, [["x"]])
+    assert len(calls) == 1
+
+
+def test_retries_give_up_after_max_retries(guard):
+    fn, calls = failing(10, 500)
+    with pytest.raises(HTTPError): guard.call("get_all_values", fn)
+    assert len(calls) == guard.max_retries + 1
+
+
+# ==============================================================================
+#                           MERGED WRITES AND SHARED READS
+# ==============================================================================
+def test_concurrent_batch_updates_go_out_as_one(guard):
+    sh = FakeSpreadsheet({"Trades": [["id", "cmp"], ["1", ""], ["2", ""]]})
+    ws = guard.wrap(sh).worksheet("Trades")
+    sh.reset_calls()
+    writers = [threading.Thread(target=ws.batch_update, args=([{"range": f"B{r}", "values": [[f"{r}0"]]}],))
+               for r in (2, 3)]
+    for t in writers: t.start()
+    for t in writers: t.join(5)
+    assert sh.calls["batch_update"] == 1 and guard.batched == 1
+    assert sh.grid("Trades")[1:] == [["1", "20"], ["2", "30"]]
+
+
+def test_identical_reads_in_flight_are_made_once(guard):
+    sh = FakeSpreadsheet({"Trades": [["id"], ["1"]]}, latency=0.1)
+    ws = guard.wrap(sh).worksheet("Trades")
+    sh.reset_calls()
+    out = []
+    readers = [threading.Thread(target=lambda: out.append(ws.get_all_values())) for _ in range(3)]
+    for t in readers: t.start()
+    for t in readers: t.join(5)
+    assert sh.calls["get_all_values"] == 1 and out == [[["id"], ["1"]]] * 3
+
+
+def test_a_read_after_a_write_does_not_join_an_older_read(guard):
+    sh = FakeSpreadsheet({"Trades": [["id"], ["1"]]})
+    ws = guard.wrap(sh).worksheet("Trades")
+    started, release = threading.Event(), threading.Event()
+    slow_read = sh._tabs["Trades"].get_all_values
+
+    def stalled():
+        started.set()
+        release.wait(5)
+        return slow_read()
+    sh._tabs["Trades"].get_all_values = stalled
+    before = threading.Thread(target=ws.get_all_values)
+    before.start()
+    started.wait(5)
+    sh._tabs["Trades"].get_all_values = slow_read
+    ws.update_cell(2, 1, "9")
+    after = []
+    reader = threading.Thread(target=lambda: after.append(ws.get_all_values()))
+    reader.start()
+    reader.join(2)   # joining the older read would block until it is released
+    answered = list(after)
+    release.set()
+    before.join(5)
+    reader.join(5)
+    assert answered == [[["id"], ["9"]]]
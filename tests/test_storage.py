@@ -0,0 +1,178 @@
+"""LocalRepository writes, the outbox and SheetSyncer, against benchmarks' FakeSpreadsheet."""
+import time
+
+import pytest
+
+from conftest import trade_row, trades_grid
+from fakes import PORTFOLIO_HEADERS, FakeSpreadsheet
+from quotes import FakePriceProvider
+from sheet_cache import SheetCache
+from storage import META_TAB, LeaseLost, SheetSyncer, SheetsRepository, push_tab
+
+
+def trades(repo):
+    return {row[0]: row for row in repo.values("Trades")[1:]}
+
+
+def synced(repo, tabs):
+    """A FakeSpreadsheet holding `tabs`, the local copy seeded from it, and a syncer (not started)."""
+    sh = FakeSpreadsheet(tabs)
+    for tab, grid in tabs.items(): repo.load_remote(tab, grid)
+    return sh, SheetSyncer(repo, sh.worksheet, push_delay=0)
+
+
+# ==============================================================================
+#                           KEYED WRITES
+# ==============================================================================
+def test_update_cells_drops_rows_that_moved(local_repo):
+    local_repo.load_remote("Trades", trades_grid(trade_row(1, "AAA"), trade_row(2, "BBB"), trade_row(3, "CCC")))
+    grid = local_repo.values("Trades")
+    local_repo.delete_row("Trades", "1")
+    # Row 3 of the old grid was BBB; it now sits on row 2, and row 3 holds CCC
+    dropped = local_repo.update_cells("Trades", {(3, 2): "20.0", (4, 2): "30.0"}, grid)
+    assert dropped == 2
+    assert trades(local_repo)["3"][2] == ""
+    assert local_repo.update_cells("Trades", {(3, 2): "30.0"}, local_repo.values("Trades")) == 0
+    assert trades(local_repo)["3"][2] == "30.0"
+
+
+def test_refresh_survives_a_delete_mid_run(local_repo, bind_core):
+    local_repo.load_remote("Trades", trades_grid(trade_row(1, "AAA"), trade_row(2, "BBB"), trade_row(3, "CCC")))
+    core = bind_core(local_repo)
+
+    class DeletingProvider(FakePriceProvider):
+        def get_quotes(self, symbols):
+            local_repo.delete_row("Trades", "1")  # another session deletes while quotes are fetched
+            return super().get_quotes(symbols)
+
+    checked, _, _, written, _ = core.update_prices_logic(DeletingProvider({"AAA": 120, "BBB": 130, "CCC": 131}))
+    rows = trades(local_repo)
+    assert checked == 3 and written == 2
+    assert rows["2"][1:3] == ["BBB", "130.0"]
+    assert rows["3"][1:3] == ["CCC", "131.0"]
+
+
+# ==============================================================================
+#                           OUTBOX PUSH
+# ==============================================================================
+def test_same_name_appends_both_reach_the_sheet(local_repo):
+    sh, syncer = synced(local_repo, {"Portfolio": [PORTFOLIO_HEADERS, ["TCS", "2024-01-01", "1", "2", "3", ""]]})
+    local_repo.append_row("Portfolio", ["INFY", "2024-02-01", "10", "20", "15", ""])
+    local_repo.append_row("Portfolio", ["INFY", "2024-03-01", "11", "21", "16", ""])
+    syncer.push()
+    syncer.pull(["Portfolio"])
+    for grid in (sh.grid("Portfolio"), local_repo.values("Portfolio")):
+        assert [r[:2] for r in grid[1:]] == [["TCS", "2024-01-01"], ["INFY", "2024-02-01"], ["INFY", "2024-03-01"]]
+    assert local_repo.pending() == 0
+
+
+def test_edits_follow_the_row_the_local_store_changed(local_repo):
+    sh, syncer = synced(local_repo, {"Portfolio": [PORTFOLIO_HEADERS, ["TCS", "2024-01-01", "1", "2", "3", ""],
+                                                   ["SBIN", "2024-01-01", "4", "5", "6", ""]]})
+    local_repo.append_row("Portfolio", ["INFY", "2024-02-01", "10", "20", "15", ""])
+    local_repo.append_row("Portfolio", ["INFY", "2024-03-01", "11", "21", "16", ""])
+    local_repo.update_fields("Portfolio", "INFY", {"target": "25"})   # the first INFY, still pending
+    local_repo.update_fields("Portfolio", "TCS", {"target": "9"})     # a row already on the Sheet
+    local_repo.delete_row("Portfolio", "SBIN")
+    syncer.push()
+    assert sh.grid("Portfolio")[1:] == [r for r in local_repo.values("Portfolio")[1:]]
+    assert [r[0] for r in sh.grid("Portfolio")[1:]] == ["TCS", "INFY", "INFY"]
+    assert [r[3] for r in sh.grid("Portfolio")[1:]] == ["9", "25", "21"]
+
+
+def test_replace_then_edits(local_repo):
+    sh, syncer = synced(local_repo, {"Portfolio": [PORTFOLIO_HEADERS, ["TCS", "2024-01-01", "1", "2", "3", ""]]})
+    local_repo.replace_all("Portfolio", [PORTFOLIO_HEADERS, ["WIPRO", "2024-01-01", "1", "2", "3", ""]])
+    local_repo.update_fields("Portfolio", "WIPRO", {"stop_loss": "0.5"})
+    syncer.push()
+    assert sh.grid("Portfolio")[1:] == [["WIPRO", "2024-01-01", "0.5", "2", "3", ""]]
+
+
+# ==============================================================================
+#                           SYNC LEASE
+# ==============================================================================
+def test_push_tab_stops_when_the_lease_is_gone(local_repo):
+    sh, _ = synced(local_repo, {"Portfolio": [PORTFOLIO_HEADERS, ["TCS", "2024-01-01", "1", "2", "3", ""]]})
+    local_repo.update_fields("Portfolio", "TCS", {"target": "9"})
+    local_repo.append_row("Portfolio", ["INFY", "2024-02-01", "10", "20", "15", ""])
+    answers = iter([True, False])
+    with pytest.raises(LeaseLost):
+        push_tab(sh.worksheet("Portfolio"), "Portfolio", local_repo.outbox("Portfolio"), renew=lambda: next(answers))
+    assert [r[0] for r in sh.grid("Portfolio")[1:]] == ["TCS"]   # the edit went out, the append did not
+    assert sh.grid("Portfolio")[1][3] == "9"
+
+
+def test_push_hands_over_when_another_process_takes_the_lease(local_repo):
+    sh, slow = synced(local_repo, {"Portfolio": [PORTFOLIO_HEADERS, ["TCS", "2024-01-01", "1", "2", "3", ""]]})
+    slow.lease_ttl = 0.05
+    other = SheetSyncer(local_repo, sh.worksheet, push_delay=0)
+
+    class Stalling:
+        """The first write outlasts the lease, and the other process takes it meanwhile."""
+        def __init__(self, ws): self.ws = ws
+        def __getattr__(self, name): return getattr(self.ws, name)
+        def batch_update(self, data, **kw):
+            time.sleep(0.1)
+            assert other.is_leader()
+            return self.ws.batch_update(data, **kw)
+
+    slow.open_ws = lambda tab: Stalling(sh.worksheet(tab))
+    local_repo.update_fields("Portfolio", "TCS", {"target": "9"})
+    local_repo.append_row("Portfolio", ["INFY", "2024-02-01", "10", "20", "15", ""])
+    slow.push()
+    assert "lease lost" in slow.last_error and local_repo.pending() == 2
+    other.push()
+    assert local_repo.pending() == 0
+    assert sh.grid("Portfolio")[1:] == local_repo.values("Portfolio")[1:]
+
+
+# ==============================================================================
+#                           SHEETS BACKEND AND ID CONFLICTS
+# ==============================================================================
+def sheets_repo(tabs):
+    sh = FakeSpreadsheet(tabs)
+    return sh, SheetsRepository(sh.worksheet, SheetCache())
+
+
+def test_sheets_update_cells_drops_rows_that_moved():
+    sh, repo = sheets_repo({"Trades": trades_grid(trade_row(1, "AAA"), trade_row(2, "BBB"), trade_row(3, "CCC"))})
+    grid = repo.values("Trades")
+    sh.worksheet("Trades").delete_rows(2)          # another session deletes id 1
+    assert repo.update_cells("Trades", {(3, 2): "20.0", (4, 2): "30.0"}, grid) == 2
+    assert [r[2] for r in sh.grid("Trades")[1:]] == ["", ""]
+    assert repo.update_cells("Trades", {(3, 2): "30.0"}, repo.values("Trades", fresh=True)) == 0
+    assert sh.grid("Trades")[2][2] == "30.0"
+
+
+def test_sheets_ids_survive_a_restart_through_the_meta_tab():
+    sh, repo = sheets_repo({"Trades": trades_grid(trade_row(1, "AAA"), trade_row(2, "BBB")),
+                            META_TAB: [["key", "value"]]})
+    assert repo.next_id("Trades", 3) == 3
+    sh.worksheet("Trades").delete_rows(3)          # the highest id is gone from the Sheet
+    restarted = SheetsRepository(sh.worksheet, SheetCache())
+    assert restarted.next_id("Trades") == 6
+    assert sh.grid(META_TAB)[1:] == [["next_id:Trades", "7"]]
+
+
+def test_colliding_trade_append_is_pushed_under_a_new_id(local_repo):
+    sh, syncer = synced(local_repo, {"Trades": trades_grid(trade_row(1, "AAA"))})
+    local_repo.append_row("Trades", trade_row(2, "BBB"))
+    local_repo.update_fields("Trades", "2", {"cmp": "101"})
+    sh.worksheet("Trades").append_row(trade_row(2, "ZZZ"))   # another writer took id 2 first
+    syncer.push()
+    assert [r[:2] for r in sh.grid("Trades")[1:]] == [["1", "AAA"], ["2", "ZZZ"], ["3", "BBB"]]
+    assert sh.grid("Trades")[3][2] == "101"
+    assert [r[:2] for r in local_repo.values("Trades")[1:]] == [["1", "AAA"], ["3", "BBB"]]
+    assert "2 -> 3" in local_repo.get_meta("sync_conflict")
+    assert local_repo.next_id("Trades") == 4
+    syncer.pull(["Trades"])
+    assert local_repo.values("Trades") == sh.grid("Trades")
+
+
+def test_append_that_already_landed_is_not_pushed_twice(local_repo):
+    sh, _ = synced(local_repo, {"Trades": trades_grid(trade_row(1, "AAA"))})
+    local_repo.append_row("Trades", trade_row(2, "BBB"))
+    ops = local_repo.outbox("Trades")
+    push_tab(sh.worksheet("Trades"), "Trades", ops)   # lands, but the process dies before the ack
+    assert push_tab(sh.worksheet("Trades"), "Trades", ops) == (0, {})
+    assert [r[:2] for r in sh.grid("Trades")[1:]] == [["1", "AAA"], ["2", "BBB"]]
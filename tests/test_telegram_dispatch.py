@@ -0,0 +1,71 @@
+"""TelegramDispatcher against benchmarks' StubTelegramServer: ordering, digests, 429s and retries."""
+from fakes import StubTelegramServer
+from telegram_dispatch import MAX_MESSAGE_LEN, TelegramDispatcher
+
+
+def dispatcher(stub, chats=("1",), **kw):
+    kw = {"per_chat_interval": 0, "global_interval": 0, **kw}
+    return TelegramDispatcher("TEST", list(chats), api_base=stub.url, **kw)
+
+
+def texts(stub, chat):
+    return [m["text"] for m in stub.messages if m["chat_id"] == chat]
+
+
+def test_dispatcher_delivers_to_every_chat_in_order():
+    with StubTelegramServer() as stub:
+        d = dispatcher(stub, chats=("1", "2"))
+        for i in range(5): d.send(f"m{i}")
+        assert d.drain(timeout=10)
+    assert texts(stub, "1") == texts(stub, "2") == [f"m{i}" for i in range(5)]
+    assert (d.sent, d.failed, d.retried) == (10, 0, 0)
+
+
+def test_dispatcher_digest_packs_one_message():
+    with StubTelegramServer() as stub:
+        d = dispatcher(stub)
+        with d.digest():
+            d.send("a")
+            d.send("b")
+        assert d.drain(timeout=10)
+    assert len(stub.messages) == 1
+    assert stub.messages[0]["text"].endswith("a\n\nb")
+
+
+def test_dispatcher_honours_429_and_keeps_order():
+    with StubTelegramServer(throttle_every=3, retry_after=0) as stub:
+        d = dispatcher(stub)
+        for i in range(8): d.send(f"m{i}")
+        assert d.drain(timeout=10)
+    assert texts(stub, "1") == [f"m{i}" for i in range(8)]
+    assert d.retried >= 3 and d.failed == 0
+
+
+def test_dispatcher_retries_server_errors():
+    with StubTelegramServer(fail_every=2) as stub:
+        d = dispatcher(stub)
+        for i in range(3): d.send(f"m{i}")
+        assert d.drain(timeout=30)
+    assert texts(stub, "1") == ["m0", "m1", "m2"]
+    assert d.retried >= 1 and d.failed == 0
+
+
+def test_dispatcher_gives_up_after_max_retries():
+    with StubTelegramServer(fail_every=1) as stub:
+        d = dispatcher(stub, max_retries=2)
+        d.send("lost")
+        assert d.drain(timeout=30)
+    assert stub.messages == []
+    assert (d.sent, d.failed, d.retried) == (0, 1, 1)
+    assert d.last_error == "HTTP 500"
+
+
+
+def test_digest_splits_at_the_message_length_limit():
+    with StubTelegramServer() as stub:
+        d = dispatcher(stub)
+        with d.digest():
+            for i in range(3): d.send(f"{i}" * (MAX_MESSAGE_LEN // 2))
+        assert d.drain(timeout=10)
+    assert len(stub.messages) == 3
+    assert all(len(m["text"]) <= MAX_MESSAGE_LEN for m in stub.messages)
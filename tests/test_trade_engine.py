@@ -0,0 +1,105 @@
+"""
+Pins evaluate_trades to the per-row loop the app used before the vectorized engine.
+
+    python -m pytest -q tests
+"""
+import numpy as np
+import pytest
+
+from conftest import NOW, edge_grid, synthetic_case
+from trade_engine import ENGINE_COLUMNS, WRITE_COLUMNS, evaluate_trades, frame_from_values
+
+STAMP = NOW.strftime("%Y-%m-%d %H:%M")
+
+
+# ==============================================================================
+#                           LEGACY RULES
+# ==============================================================================
+def legacy_updates(grid, prices):
+    """
+    The pre-vectorized update_prices_logic loop, minus the Sheet and yfinance calls.
+    `prices` maps each stock_name to its quote (missing = no data). Returns
+    ({(row index, column): value}, evaluated, triggered, exited).
+    """
+    col = {h: i for i, h in enumerate(grid[0])}
+
+    def to_float(val):
+        try: return float(str(val).replace(',', '').strip())
+        except: return 0.0
+
+    updates = {}
+    count = new_triggers = new_exits = 0
+    for i, row in enumerate(grid[1:]):
+        name = row[col["stock_name"]]
+        if not name: continue
+        current_status = row[col["status"]].strip() or "Pending"
+        if current_status in ["Target-Hit", "SL-Hit"]: continue
+        if name not in prices: continue
+        cmp_val = prices[name]
+
+        entry = to_float(row[col["entry"]])
+        sl, tgt = to_float(row[col["stop_loss"]]), to_float(row[col["target"]])
+        zone = row[col["trade_zone"]].strip()
+        new_status, new_trig, new_exit = current_status, row[col["trigger_date"]], row[col["exit_date"]]
+        changed = False
+
+        if new_status == "Pending":
+            if (zone == "DEMAND" and cmp_val <= entry and entry > 0) or (zone == "SUPPLY" and cmp_val >= entry and entry > 0):
+                new_status, new_trig = "Active", STAMP
+                new_triggers += 1; changed = True
+        elif new_status == "Active":
+            hit = False
+            if zone == "DEMAND":
+                if cmp_val >= tgt and tgt > 0: new_status = "Target-Hit"; hit = True
+                elif cmp_val <= sl and sl > 0: new_status = "SL-Hit"; hit = True
+            elif zone == "SUPPLY":
+                if cmp_val <= tgt and tgt > 0: new_status = "Target-Hit"; hit = True
+                elif cmp_val >= sl and sl > 0: new_status = "SL-Hit"; hit = True
+            if hit:
+                new_exit = STAMP; new_exits += 1; changed = True
+
+        updates[(i, "cmp")] = cmp_val
+        if changed or row[col["status"]].strip() == "": updates[(i, "status")] = new_status
+        if changed:
+            updates[(i, "trigger_date")] = new_trig
+            updates[(i, "exit_date")] = new_exit
+        count += 1
+    return updates, count, new_triggers, new_exits
+
+
+def engine_updates(grid, prices):
+    table = frame_from_values(grid, ENGINE_COLUMNS)
+    cmp = [prices.get(name, np.nan) for name in table['stock_name']]
+    res = evaluate_trades(table, cmp, NOW)
+    updates = {(i, c): res.values[c].iloc[i]
+               for c in WRITE_COLUMNS for i in np.flatnonzero(res.write_mask[c].to_numpy())}
+    return updates, int(res.evaluated.sum()), int(res.triggered.sum()), int(res.exited.sum())
+
+
+# ==============================================================================
+#                           EVALUATE_TRADES
+# ==============================================================================
+@pytest.mark.parametrize("case", [edge_grid, synthetic_case])
+def test_evaluate_trades_matches_legacy_loop(case):
+    grid, prices = case()
+    old, new = legacy_updates(grid, prices), engine_updates(grid, prices)
+    assert new[1:] == old[1:]
+    assert new[0].keys() == old[0].keys()
+    for cell, value in old[0].items():
+        assert new[0][cell] == value, cell
+
+
+def test_edge_rows_take_the_expected_path():
+    grid, prices = edge_grid()
+    status = {grid[i + 1][1]: v for (i, c), v in engine_updates(grid, prices)[0].items() if c == "status"}
+    assert status == {
+        "DEM_TRIG": "Active", "SUP_TRIG": "Active", "SUP_WAIT": "Pending", "DEM_TGT": "Target-Hit",
+        "DEM_SL": "SL-Hit", "SUP_TGT": "Target-Hit", "SUP_SL": "SL-Hit", "BOTH_HIT": "Target-Hit",
+        "BLANK_ENTRY": "Pending", "COMMA": "Active",
+    }
+
+
+def test_evaluate_trades_rejects_misaligned_quotes():
+    grid, _ = edge_grid()
+    with pytest.raises(ValueError):
+        evaluate_trades(frame_from_values(grid), [1.0], NOW)
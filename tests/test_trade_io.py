@@ -0,0 +1,94 @@
+"""Trade uploads and exports: validation, the import write and refresh, typed Parquet."""
+import threading
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from conftest import trade_row, trades_grid
+from quotes import FakePriceProvider
+from trade_io import export_rows, validate_trades
+
+
+# ==============================================================================
+#                           IMPORT VALIDATION
+# ==============================================================================
+def test_validate_trades_splits_clean_and_rejected():
+    df = pd.DataFrame({
+        "Stock": ["reliance", "tcs.ns", "", "bad name!", "WIPRO", "INFY", "HDFC", "infy"],
+        "Entry": ["2,500", "3500", "100", "10", "500", "1500", "0", "1500"],
+        "SL": ["2400", "3600", "90", "9", "450", "1450", "1", "1450"],
+        "Target": ["2700", "3300", "110", "11", "600", "1600", "2", "1600"],
+        "Zone": ["", "supply", "DEMAND", "DEMAND", "DEMAND", "DEMAND", "DEMAND", "DEMAND"],
+        "Type": ["qit", "MIT", "QIT", "QIT", "Swing", "WIT", "DIT", "DIT"],
+    })
+    clean, rejected = validate_trades(df)
+    assert clean['stock_name'].tolist() == ["RELIANCE", "TCS.NS", "INFY"]
+    assert clean['trade_zone'].tolist() == ["DEMAND", "SUPPLY", "DEMAND"]
+    assert clean['entry'].tolist() == [2500.0, 3500.0, 1500.0]
+    assert clean['cmp'].tolist() == clean['entry'].tolist()  # a blank cmp starts at the entry
+    errors = dict(zip(rejected['stock_name'], rejected['error']))
+    assert errors[""] == "missing stock"
+    assert errors["bad name!"] == "bad symbol"
+    assert errors["HDFC"].startswith("bad entry")
+    assert errors["WIPRO"].startswith("type must be one of")
+    assert errors["infy"] == "duplicate of an earlier row"
+
+
+def test_validate_trades_checks_level_order():
+    df = pd.DataFrame({"stock_name": ["AAA", "BBB"], "entry": [100, 100], "stop_loss": [90, 110],
+                       "target": [95, 120], "trade_zone": ["DEMAND", "SUPPLY"], "trade_type": ["QIT", "QIT"]})
+    clean, rejected = validate_trades(df)
+    assert clean.empty
+    assert rejected['error'].tolist() == ["DEMAND needs stop < entry < target", "SUPPLY needs target < entry < stop"]
+
+
+# ==============================================================================
+#                           IMPORT AND EXPORT
+# ==============================================================================
+def test_import_appends_a_block_of_ids_and_refreshes_through_the_shared_flight(local_repo, bind_core):
+    local_repo.load_remote("Trades", trades_grid(trade_row(1, "AAA")))
+    core = bind_core(local_repo)
+    df = pd.DataFrame({"stock_name": ["BBB", "CCC"], "entry": [100, 200], "stop_loss": [95, 190],
+                       "target": [110, 220], "trade_zone": ["DEMAND", "DEMAND"], "trade_type": ["QIT", "QIT"]})
+    added, rejected = core.import_trades(df, FakePriceProvider({"AAA": 101, "BBB": 102, "CCC": 150}))
+    assert (added, len(rejected)) == (2, 0)
+    rows = local_repo.values("Trades")[1:]
+    assert [r[:3] for r in rows] == [["1", "AAA", "101.0"], ["2", "BBB", "102.0"], ["3", "CCC", "150.0"]]
+    assert core.REFRESH.stats()["runs"] == 1
+
+
+def test_import_waits_out_a_refresh_that_started_before_its_write(local_repo, bind_core):
+    local_repo.load_remote("Trades", trades_grid(trade_row(1, "AAA")))
+    core = bind_core(local_repo)
+    started, release = threading.Event(), threading.Event()
+
+    class Stalling(FakePriceProvider):
+        def get_quotes(self, symbols):
+            if not started.is_set():
+                started.set()
+                release.wait(5)
+            return super().get_quotes(symbols)
+
+    provider = Stalling({"AAA": 101, "BBB": 102})
+    daemon = threading.Thread(target=core.run_refresh, kwargs={"provider": provider})
+    daemon.start()
+    started.wait(5)
+    df = pd.DataFrame({"stock_name": ["BBB"], "entry": [100], "stop_loss": [95], "target": [110],
+                       "trade_zone": ["DEMAND"], "trade_type": ["QIT"]})
+    importer = threading.Thread(target=core.import_trades, args=(df, provider))
+    importer.start()
+    release.set()
+    daemon.join(5)
+    importer.join(5)
+    assert core.REFRESH.stats()["runs"] == 2   # the import did not join the older run
+    assert local_repo.values("Trades")[2][:3] == ["2", "BBB", "102.0"]
+
+
+def test_parquet_export_keeps_ids_as_integers(tmp_path):
+    dest = tmp_path / "trades.parquet"
+    rows = [trade_row(1, "AAA", cmp="101.5"), trade_row("2.0", "BBB"), trade_row("x", "CCC")]
+    assert export_rows(trades_grid()[0], [rows[:2], rows[2:]], str(dest), "parquet") == 3
+    table = pq.read_table(dest)
+    assert str(table.schema.field("id").type) == "int64"
+    assert table.column("id").to_pylist() == [1, 2, None]
+    assert table.column("cmp").to_pylist() == [101.5, None, None]
@@ -0,0 +1,41 @@
+"""The typed Trades frame: its schema, when it is rebuilt, and warm starts from Parquet."""
+import pandas as pd
+
+from conftest import trade_row, trades_grid
+from trade_snapshot import TradeSnapshot, load_snapshot, save_snapshot, typed_trades
+
+
+def test_typed_trades_schema():
+    grid = trades_grid(trade_row(1, "AAA", cmp="101.5"), trade_row(2, "BBB", entry="", status=""))
+    grid[1][10] = "2024-03-01 11:15"
+    df = typed_trades(grid)
+    assert str(df['id'].dtype) == "Int64"
+    assert df['cmp'].tolist() == [101.5, 0.0] and df['entry'].tolist() == [100.0, 0.0]
+    assert df['status'].dtype == "category" and df['status'].tolist() == ["Pending", "Pending"]
+    assert df['trigger_date'].iloc[0] == pd.Timestamp("2024-03-01 11:15") and pd.isna(df['trigger_date'].iloc[1])
+    assert df['stock_name'].tolist() == ["AAA", "BBB"]
+
+
+def test_frame_is_shared_until_the_store_changes(local_repo):
+    local_repo.load_remote("Trades", trades_grid(trade_row(1, "AAA")))
+    snap = TradeSnapshot(path=None)
+    first = snap.frame(local_repo)
+    first['extra'] = 1   # a caller's column stays in its copy
+    assert 'extra' not in snap.frame(local_repo)
+    assert (snap.builds, snap.hits) == (1, 1)
+    local_repo.update_fields("Trades", "1", {"remark": "edited"})
+    assert snap.frame(local_repo)['remark'].tolist() == ["edited"] and snap.builds == 2
+
+
+def test_warm_start_only_from_a_file_of_the_same_version(local_repo, tmp_path):
+    grid = trades_grid(trade_row(1, "AAA", status="Active"), trade_row(2, "BBB"))
+    grid[1][10] = "2024-03-01 11:15"
+    local_repo.load_remote("Trades", grid)
+    path = str(tmp_path / "snap.parquet")
+    built = typed_trades(local_repo.values("Trades"))
+    save_snapshot(built, path, local_repo.version("Trades"))
+    assert load_snapshot(path, "another store:1") is None
+
+    restarted = TradeSnapshot(path)
+    pd.testing.assert_frame_equal(restarted.frame(local_repo), built)
+    assert (restarted.warm, restarted.builds) == (1, 0)
@@ -0,0 +1,415 @@
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from quotes import base_symbol, to_yf_symbol
+
+TERMINAL_STATUSES = ("Target-Hit", "SL-Hit")
+ENGINE_COLUMNS = ["stock_name", "cmp", "entry", "stop_loss", "target",
+                  "trade_zone", "status", "trigger_date", "exit_date"]
+WRITE_COLUMNS = ["cmp", "status", "trigger_date", "exit_date"]
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M"
+
+# values: new cell values for WRITE_COLUMNS; write_mask: which of those cells the old loop wrote
+EngineResult = namedtuple("EngineResult", ["values", "write_mask", "evaluated", "triggered", "exited"])
+# changes: {trade_id: {column: value}} to persist; alerts: DataFrame of new alert rows or None
+TickResult = namedtuple("TickResult", ["changes", "alerts"])
+
+
+# ==============================================================================
+#                           COLUMN HELPERS
+# ==============================================================================
+def frame_from_values(all_values, columns=ENGINE_COLUMNS):
+    """Columnar view of a get_all_values() grid; raises KeyError if a column is missing."""
+    headers = all_values[0] if all_values else []
+    rows = all_values[1:]
+    col_map = {h: i for i, h in enumerate(headers)}
+    out = {}
+    for c in columns:
+        i = col_map[c]
+        out[c] = [r[i] if len(r) > i else "" for r in rows]
+    return pd.DataFrame(out, columns=columns, dtype=object)
+
+
+def _map_unique(values, func):
+    # Sheet columns repeat a lot (zones, statuses, round prices): parse each distinct value once
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+    return np.asarray([func(u) for u in uniques], dtype=object)[codes] if len(codes) else np.array([], dtype=object)
+
+
+def _to_float(val):
+    try: return float(str(val).replace(',', '').strip())
+    except: return 0.0
+
+
+def to_float_array(values):
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float).fillna(0.0).to_numpy()
+    return _map_unique(values, _to_float).astype(float)
+
+
+def clean_text(values):
+    return _map_unique(values, lambda v: "" if v is None or v != v else str(v).strip())
+
+
+# ==============================================================================
+#                           STATE MACHINE
+# ==============================================================================
+def transitions(live, status, zone, cmp, entry, sl, tgt):
+    """The trigger/exit rules on aligned arrays; only `live` rows can move. Returns (triggered, tgt_hit, sl_hit)."""
+    demand, supply = zone == "DEMAND", zone == "SUPPLY"
+    pending = live & (status == "Pending")
+    active = live & (status == "Active")
+
+    with np.errstate(invalid='ignore'):
+        triggered = pending & (entry > 0) & ((demand & (cmp <= entry)) | (supply & (cmp >= entry)))
+        tgt_hit = active & (tgt > 0) & ((demand & (cmp >= tgt)) | (supply & (cmp <= tgt)))
+        sl_hit = active & ~tgt_hit & (sl > 0) & ((demand & (cmp <= sl)) | (supply & (cmp >= sl)))
+    return triggered, tgt_hit, sl_hit
+
+
+def evaluate_trades(table, cmp, now=None):
+    """
+    One vectorized pass of the Pending -> Active -> Target-Hit / SL-Hit rules.
+
+    `table` holds the raw ENGINE_COLUMNS (strings straight from the sheet are fine),
+    `cmp` is the fetched price per row with NaN where no quote came back.
+    """
+    n = len(table)
+    stamp = (now or datetime.now()).strftime(TIMESTAMP_FORMAT)
+
+    name = clean_text(table['stock_name'])
+    raw_status = clean_text(table['status'])
+    status = np.where(raw_status == "", "Pending", raw_status).astype(object)
+    zone = clean_text(table['trade_zone'])
+    cmp = pd.to_numeric(pd.Series(cmp, dtype=object), errors='coerce').to_numpy(dtype=float)
+    if len(cmp) != n: raise ValueError("cmp must align with table rows")
+
+    entry = to_float_array(table['entry'])
+    sl = to_float_array(table['stop_loss'])
+    tgt = to_float_array(table['target'])
+
+    evaluated = (name != "") & ~np.isin(status, TERMINAL_STATUSES) & ~np.isnan(cmp)
+    triggered, tgt_hit, sl_hit = transitions(evaluated, status, zone, cmp, entry, sl, tgt)
+    exited = tgt_hit | sl_hit
+    changed = triggered | exited
+
+    new_status = np.select([triggered, tgt_hit, sl_hit], ["Active", "Target-Hit", "SL-Hit"], status)
+    trig = np.where(triggered, stamp, table['trigger_date'].fillna("").to_numpy(dtype=object))
+    exit_ = np.where(exited, stamp, table['exit_date'].fillna("").to_numpy(dtype=object))
+
+    values = pd.DataFrame({
+        "cmp": np.where(evaluated, cmp, np.nan),
+        "status": pd.Series(new_status, index=table.index, dtype=object),
+        "trigger_date": pd.Series(trig, index=table.index, dtype=object),
+        "exit_date": pd.Series(exit_, index=table.index, dtype=object),
+    }, index=table.index)
+    write_mask = pd.DataFrame({
+        "cmp": evaluated,
+        "status": changed | (evaluated & (raw_status == "")),
+        "trigger_date": changed,
+        "exit_date": changed,
+    }, index=table.index)
+    return EngineResult(values, write_mask, evaluated, triggered, exited)
+
+
+# ==============================================================================
+#                           DASHBOARD VIEWS
+# ==============================================================================
+PRICE_COLUMNS = ['cmp', 'entry', 'stop_loss', 'target']
+ALERT_ACTIVE = "Trade is Active"
+ALERT_HALF_PCT = "Within 0.5% Range"
+ALERT_ONE_PCT = "Within 1% Range"
+
+# "% CMP Diff" filter: label -> (exclusive lower, inclusive upper) bound on diff_pct
+PCT_BANDS = {
+    "0 - 0.5%": (-np.inf, 0.5),
+    "0.5% - 1%": (0.5, 1.0),
+    "1% - 1.5%": (1.0, 1.5),
+    "1.5% - 2%": (1.5, 2.0),
+    "2% - 2.5%": (2.0, 2.5),
+    "2.5% - 3%": (2.5, 3.0),
+}
+
+
+def trades_frame(records):
+    """Trades records -> DataFrame with numeric prices and a filled-in status/last_alert."""
+    df = pd.DataFrame(records)
+    if df.empty: return df
+
+    df['id'] = pd.to_numeric(df['id'], errors='coerce')
+    for c in PRICE_COLUMNS:
+        df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0.0)
+
+    if 'status' not in df.columns: df['status'] = "Pending"
+    if 'last_alert' not in df.columns: df['last_alert'] = ""
+
+    df['status'] = df['status'].replace(r'^\s*$', 'Pending', regex=True).fillna('Pending')
+    df['last_alert'] = df['last_alert'].fillna("")
+    return df
+
+
+def classify_alerts(status, cmp, entry):
+    """
+    Vectorized proximity alert: Active trades first, then distance of CMP from entry.
+    Returns (diff_pct, alert) arrays.
+    """
+    status = np.asarray(status, dtype=object)
+    cmp = np.asarray(cmp, dtype=float)
+    entry = np.asarray(entry, dtype=float)
+
+    active = status == "Active"
+    no_entry = entry == 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.abs(cmp - entry) / entry * 100
+    diff_pct = np.select([active, no_entry], [0.0, 100.0], pct)
+    alert = np.select(
+        [active, no_entry, diff_pct <= 0.5, diff_pct <= 1.0],
+        [ALERT_ACTIVE, "", ALERT_HALF_PCT, ALERT_ONE_PCT],
+        "",
+    ).astype(object)
+    return diff_pct, alert
+
+
+def filter_trades(df, f_status="All", f_zone="All", f_strat="All", f_pct="All"):
+    """Dashboard filters as one boolean mask; adds diff_pct and Alert to the surviving rows."""
+    if df.empty: return df
+
+    mask = np.ones(len(df), dtype=bool)
+    if f_status != "All": mask &= (df['status'] == f_status).to_numpy()
+    if f_zone != "All": mask &= (df['trade_zone'] == f_zone).to_numpy()
+    if f_strat != "All": mask &= (df['trade_type'] == f_strat).to_numpy()
+    if not mask.any(): return df.iloc[0:0]
+
+    diff_pct, alert = classify_alerts(df['status'].to_numpy(), df['cmp'].to_numpy(), df['entry'].to_numpy())
+    if f_pct != "All":
+        lo, hi = PCT_BANDS[f_pct]
+        mask &= (diff_pct > lo) & (diff_pct <= hi)
+
+    out = df[mask].copy()
+    out['diff_pct'] = diff_pct[mask]
+    out['Alert'] = alert[mask]
+    return out
+
+
+# Trade tables: one column picker for Dashboard / Live Trades / Past Trades, defaults per view
+TABLE_COLUMNS = ['id', 'Alert', 'trade_type', 'status', 'stock_name', 'trade_zone', 'cmp', 'entry',
+                 'stop_loss', 'target', 'diff_pct', 'trigger_date', 'exit_date', 'remark', 'dv_analysis', 'Trendlyne']
+VIEW_COLUMNS = {
+    "Dashboard": ['id', 'Alert', 'trade_type', 'status', 'stock_name', 'trade_zone', 'cmp', 'entry',
+                  'stop_loss', 'target', 'dv_analysis', 'Trendlyne'],
+    "Live Trades": ['id', 'status', 'stock_name', 'cmp', 'entry', 'stop_loss', 'target', 'dv_analysis'],
+    "Past Trades": ['id', 'status', 'stock_name', 'cmp', 'stop_loss', 'target', 'exit_date'],
+}
+PAGE_SIZES = (25, 50, 100, 250)
+ALERT_STYLES = {
+    ALERT_ACTIVE: 'background-color: #4caf50; color: white; font-weight: bold',
+    ALERT_HALF_PCT: 'background-color: #ffeb3b; color: black',
+    ALERT_ONE_PCT: 'background-color: #90caf9; color: black',
+}
+
+
+def page_of(df, sort_by=None, ascending=True, page=1, page_size=PAGE_SIZES[0]):
+    """
+    One page of `df` after a stable sort on `sort_by`. Only the sort column is
+    ordered; the rows of the page are then taken by position.
+    Returns (page_df, page_count) with `page` clamped to the valid range.
+    """
+    n_pages = max(1, -(-len(df) // page_size))
+    page = min(max(1, page), n_pages)
+    if sort_by in df.columns:
+        keys = df[sort_by].reset_index(drop=True)
+        order = keys.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+    else:
+        order = np.arange(len(df))
+    return df.iloc[order[(page - 1) * page_size: page * page_size]], n_pages
+
+
+def alert_styles(alerts, columns):
+    """Styler.apply(axis=None) frame: each row's ALERT_STYLES css across `columns`."""
+    css = pd.Series(alerts, dtype=object).map(ALERT_STYLES).fillna('').to_numpy()
+    return pd.DataFrame(np.repeat(css[:, None], len(columns), axis=1), index=alerts.index, columns=columns)
+
+
+def link_key(names):
+    """Symbol as used for the Links tab lookup."""
+    return pd.Series(_map_unique(names, base_symbol), dtype=object)
+
+
+def join_links(df, link_map):
+    if df.empty: return df
+    keys = link_key(df['stock_name'].to_numpy())
+    df['Trendlyne'] = keys.map(link_map).to_numpy()
+    return df
+
+
+# ==============================================================================
+#                           ALERTS
+# ==============================================================================
+def new_alerts(df):
+    """Rows whose current Alert is set and differs from the last one we sent."""
+    if df.empty or 'Alert' not in df.columns: return df.iloc[0:0]
+    alert = df['Alert'].fillna("").astype(str)
+    last = df['last_alert'].fillna("").astype(str) if 'last_alert' in df.columns else ""
+    return df[(alert != "") & (alert != last)]
+
+
+def alert_messages(df):
+    """Telegram text for each alert row, built column-wise."""
+    def s(col): return df[col].astype(str)
+    return (
+        "🚀 *STOCK ALERT: " + s('stock_name') + "*\n"
+        + "⚠️ Status: " + s('Alert') + "\n"
+        + "💰 CMP: " + s('cmp') + "\n"
+        + "🎯 Entry: " + s('entry') + "\n"
+        + "📊 Type: " + s('trade_type')
+    )
+
+
+# ==============================================================================
+#                           PORTFOLIO VALUATION
+# ==============================================================================
+PORTFOLIO_SL_HIT = "Stop Loss Breached"
+PORTFOLIO_TARGET_HIT = "Target Reached"
+
+
+def yf_symbols(names):
+    return _map_unique(names, to_yf_symbol)
+
+
+def value_portfolio(df, cmp_map):
+    """
+    Holdings at `cmp_map` prices ({yf_symbol: price}), all columns computed at once:
+    cmp, pnl (per share, times qty when the tab has one), pnl_pct, to_stop_pct and
+    to_target_pct (distance left as % of CMP, negative once crossed), and an Alert
+    when CMP is through the stop or the target. Holdings without a quote get NaN.
+    """
+    if df.empty: return df
+    out = df.copy()
+    n = len(out)
+    num = lambda c: to_float_array(out[c]) if c in out else np.zeros(n)
+    cost, sl, tgt = num('actual_cost'), num('stop_loss'), num('target')
+    qty = to_float_array(out['qty']) if 'qty' in out else np.ones(n)
+    cmp = pd.Series(yf_symbols(out['stock_name'])).map(cmp_map).to_numpy(dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out['cmp'] = cmp
+        out['pnl'] = (cmp - cost) * qty
+        out['pnl_pct'] = np.where(cost > 0, (cmp - cost) / cost * 100, np.nan)
+        out['to_stop_pct'] = np.where(sl > 0, (cmp - sl) / cmp * 100, np.nan)
+        out['to_target_pct'] = np.where(tgt > 0, (tgt - cmp) / cmp * 100, np.nan)
+        out['Alert'] = np.select(
+            [(sl > 0) & (cmp <= sl), (tgt > 0) & (cmp >= tgt)], [PORTFOLIO_SL_HIT, PORTFOLIO_TARGET_HIT], "",
+        ).astype(object)
+    if 'last_alert' not in out: out['last_alert'] = ""
+    out['last_alert'] = out['last_alert'].fillna("")
+    return out
+
+
+def portfolio_alert_messages(df):
+    def s(col): return df[col].astype(str)
+    return (
+        "💼 *PORTFOLIO ALERT: " + s('stock_name') + "*\n"
+        + "⚠️ Status: " + s('Alert') + "\n"
+        + "💰 CMP: " + df['cmp'].round(2).astype(str) + "\n"
+        + "🛑 SL: " + s('stop_loss') + " | 🎯 Target: " + s('target') + "\n"
+        + "📈 P&L: " + df['pnl_pct'].round(2).astype(str) + "%"
+    )
+
+
+# ==============================================================================
+#                           TICK-BY-TICK EVALUATION
+# ==============================================================================
+class TradeBook:
+    """
+    Trades held as NumPy columns, grouped by yfinance symbol.
+
+    A quote for one symbol re-runs only that symbol's trades through the same
+    `transitions` rules as evaluate_trades and returns the field changes (keyed
+    by trade id, so they survive rows moving in the Sheet) plus any new alerts.
+    """
+
+    def __init__(self, all_values):
+        headers = all_values[0] if all_values else []
+        optional = [c for c in ("id", "trade_type", "last_alert") if c in headers]
+        table = frame_from_values(all_values, ENGINE_COLUMNS + optional)
+        n = len(table)
+        col = lambda c: clean_text(table[c]) if c in table else np.full(n, "", dtype=object)
+
+        self.ids = col("id")
+        self.name = clean_text(table['stock_name'])
+        self.raw_blank = clean_text(table['status']) == ""
+        self.status = np.where(self.raw_blank, "Pending", clean_text(table['status'])).astype(object)
+        self.zone = clean_text(table['trade_zone'])
+        self.entry = to_float_array(table['entry'])
+        self.sl = to_float_array(table['stop_loss'])
+        self.tgt = to_float_array(table['target'])
+        self.cmp = np.array(to_float_array(table['cmp']))
+        self.trigger_date = np.array(table['trigger_date'].fillna(""), dtype=object)
+        self.exit_date = np.array(table['exit_date'].fillna(""), dtype=object)
+        self.trade_type = col("trade_type")
+        self.last_alert = col("last_alert")
+
+        live = (self.name != "") & ~np.isin(self.status, TERMINAL_STATUSES)
+        symbols = np.array([to_yf_symbol(x) for x in self.name], dtype=object)
+        rows = np.flatnonzero(live)
+        codes, uniques = pd.factorize(symbols[rows])
+        order = np.argsort(codes, kind="stable")
+        bounds = np.flatnonzero(np.diff(codes[order])) + 1
+        self.by_symbol = dict(zip(uniques, np.split(rows[order], bounds))) if len(rows) else {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows_for(self, symbol):
+        return self.by_symbol.get(symbol)
+
+    def on_tick(self, symbol, price, now=None):
+        rows = self.by_symbol.get(symbol)
+        if rows is None or price != price: return TickResult({}, None)
+        status = self.status[rows]
+        live = ~np.isin(status, TERMINAL_STATUSES)
+        if not live.all():
+            rows, status = rows[live], status[live]
+            self.by_symbol[symbol] = rows  # closed trades never move again
+        if not len(rows): return TickResult({}, None)
+
+        price = float(price)
+        cmp = np.full(len(rows), price)
+        entry = self.entry[rows]
+        triggered, tgt_hit, sl_hit = transitions(np.ones(len(rows), dtype=bool), status, self.zone[rows],
+                                                 cmp, entry, self.sl[rows], self.tgt[rows])
+        changed = triggered | tgt_hit | sl_hit
+        new_status = np.select([triggered, tgt_hit, sl_hit], ["Active", "Target-Hit", "SL-Hit"], status)
+        _, alert = classify_alerts(new_status, cmp, entry)
+        fresh = (alert != "") & (alert != self.last_alert[rows])
+        cmp_moved = np.abs(self.cmp[rows] - price) >= 1e-9
+
+        changes = {}
+        if changed.any():
+            stamp = (now or datetime.now()).strftime(TIMESTAMP_FORMAT)
+            self.trigger_date[rows[triggered]] = stamp
+            self.exit_date[rows[tgt_hit | sl_hit]] = stamp
+        for i in np.flatnonzero(cmp_moved | changed | self.raw_blank[rows] | fresh):
+            r = rows[i]
+            fields = {"cmp": price} if cmp_moved[i] else {}
+            if changed[i] or self.raw_blank[r]: fields["status"] = new_status[i]
+            if changed[i]: fields.update(trigger_date=self.trigger_date[r], exit_date=self.exit_date[r])
+            if fresh[i]: fields["last_alert"] = alert[i]
+            changes[self.ids[r]] = fields
+
+        self.cmp[rows] = price
+        self.status[rows] = new_status
+        self.raw_blank[rows] = False
+        alerts = None
+        if fresh.any():
+            hit = rows[fresh]
+            self.last_alert[hit] = alert[fresh]
+            alerts = pd.DataFrame({
+                "id": self.ids[hit], "stock_name": self.name[hit], "Alert": alert[fresh],
+                "cmp": price, "entry": self.entry[hit], "trade_type": self.trade_type[hit],
+            })
+        return TickResult(changes, alerts)
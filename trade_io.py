@@ -0,0 +1,212 @@
+"""
+Bulk import of trade setups and streaming export of the tabs.
+
+    python trade_io.py import watchlist.csv [--dry-run] [--errors rejected.csv]
+    python trade_io.py export Trades trades.parquet
+    python trade_io.py export Portfolio portfolio.csv
+
+Import columns (case-insensitive, aliases accepted): stock, entry, sl, tgt, zone,
+type, cmp, remark. Rows are checked in one vectorized pass; rejected rows come back
+with a reason instead of stopping the import.
+"""
+import argparse
+import csv
+import io
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from quotes import base_symbol
+
+# --- CONFIGURATION ---
+TRADE_TYPES = ("QIT", "MIT", "WIT", "DIT")
+TRADE_ZONES = ("DEMAND", "SUPPLY")
+EXPORT_CHUNK = 2_000     # rows per CSV write / Parquet row group
+NUMERIC_COLUMNS = {"cmp", "entry", "stop_loss", "target", "actual_cost", "qty"}
+INTEGER_COLUMNS = {"id"}
+COLUMN_ALIASES = {
+    "stock": "stock_name", "symbol": "stock_name", "name": "stock_name", "ticker": "stock_name",
+    "sl": "stop_loss", "stop": "stop_loss", "stoploss": "stop_loss",
+    "tgt": "target", "type": "trade_type", "strategy": "trade_type", "zone": "trade_zone",
+    "price": "cmp",
+}
+IMPORT_COLUMNS = ["stock_name", "entry", "stop_loss", "target", "trade_zone", "trade_type", "cmp", "remark"]
+SYMBOL_RE = r"^[A-Z0-9][A-Z0-9&_\-]*(\.NS|\.BO)?$"
+
+
+# ==============================================================================
+#                           READING UPLOADS
+# ==============================================================================
+def read_table(source, name=None):
+    """CSV or Excel (by extension) -> DataFrame of strings. `source` is a path or a file-like object."""
+    name = (name or getattr(source, 'name', None) or str(source)).lower()
+    if name.endswith((".xlsx", ".xls")): return pd.read_excel(source, dtype=str)
+    return pd.read_csv(source, dtype=str, skipinitialspace=True)
+
+
+def normalize_columns(df):
+    def canon(c):
+        c = re.sub(r"[\s\-]+", "_", str(c).strip().lower())
+        return COLUMN_ALIASES.get(c.replace("_", ""), COLUMN_ALIASES.get(c, c))
+    return df.rename(columns=canon)
+
+
+def to_number(s):
+    """'1,234.50', ' ₹99 ' -> float; blanks and junk -> NaN."""
+    return pd.to_numeric(s.astype(str).str.replace(r"[,\s₹]", "", regex=True), errors='coerce')
+
+
+# ==============================================================================
+#                           VALIDATION
+# ==============================================================================
+def validate_trades(df):
+    """
+    Normalize and check an import table column-wise.
+    Returns (clean, rejected): clean has IMPORT_COLUMNS, rejected keeps the input
+    row plus an `error` column.
+    """
+    df = normalize_columns(df).reset_index(drop=True)
+    n = len(df)
+    col = lambda c: df[c].fillna("").astype(str).str.strip() if c in df else pd.Series([""] * n, dtype=object)
+
+    out = pd.DataFrame({
+        "stock_name": col("stock_name").str.upper().str.replace(r"\s+", "", regex=True),
+        "entry": to_number(col("entry")),
+        "stop_loss": to_number(col("stop_loss")),
+        "target": to_number(col("target")),
+        "trade_zone": col("trade_zone").str.upper(),
+        "trade_type": col("trade_type").str.upper(),
+        "cmp": to_number(col("cmp")),
+        "remark": col("remark"),
+    })
+    # A blank zone is read off the levels: stop below entry is a DEMAND setup
+    out['trade_zone'] = np.where(
+        out['trade_zone'] == "", np.where(out['stop_loss'] < out['entry'], "DEMAND", "SUPPLY"), out['trade_zone'])
+
+    entry, sl, tgt, zone = out['entry'], out['stop_loss'], out['target'], out['trade_zone']
+    levels = entry.notna() & sl.notna() & tgt.notna()
+    checks = [
+        (out['stock_name'] == "", "missing stock"),
+        ((out['stock_name'] != "") & ~out['stock_name'].str.match(SYMBOL_RE), "bad symbol"),
+        (entry.isna() | (entry <= 0), "bad entry"),
+        (sl.isna() | (sl <= 0), "bad stop loss"),
+        (tgt.isna() | (tgt <= 0), "bad target"),
+        (~zone.isin(TRADE_ZONES), "zone must be DEMAND or SUPPLY"),
+        (~out['trade_type'].isin(TRADE_TYPES), f"type must be one of {'/'.join(TRADE_TYPES)}"),
+        (levels & (zone == "DEMAND") & ~((sl < entry) & (entry < tgt)), "DEMAND needs stop < entry < target"),
+        (levels & (zone == "SUPPLY") & ~((tgt < entry) & (entry < sl)), "SUPPLY needs target < entry < stop"),
+        (out.duplicated(["stock_name", "trade_zone", "entry"], keep="first"), "duplicate of an earlier row"),
+    ]
+    errors = pd.Series([""] * n, dtype=object)
+    for mask, reason in checks:
+        mask = mask.fillna(True).to_numpy(dtype=bool)
+        errors[mask] = np.where(errors[mask] == "", reason, errors[mask] + "; " + reason)
+
+    bad = (errors != "").to_numpy()
+    out['cmp'] = out['cmp'].fillna(out['entry'])
+    return out[~bad].reset_index(drop=True), df[bad].assign(error=errors[bad].to_numpy())
+
+
+def trade_rows(clean, headers, start_id):
+    """Sheet rows for validated trades, ids `start_id`, `start_id`+1, ... in file order."""
+    base = clean['stock_name'].map(base_symbol)
+    cols = {
+        "id": np.arange(start_id, start_id + len(clean)),
+        "dv_analysis": "https://in.tradingview.com/chart/?symbol=NSE:" + base,
+        "status": "Pending",
+        **{c: clean[c] for c in IMPORT_COLUMNS},
+    }
+    frame = pd.DataFrame({h: cols.get(h, "") for h in headers})
+    return frame.astype(object).to_numpy().tolist()
+
+
+# ==============================================================================
+#                           EXPORT
+# ==============================================================================
+def export_rows(headers, chunks, dest, fmt="csv"):
+    """
+    Write `headers` plus each list of rows from `chunks` to `dest` (path or binary
+    file) as it arrives. Parquet gets one row group per chunk, numeric columns as float64
+    and ids as int64 (null where a cell isn't a whole number).
+    Returns the number of rows written.
+    """
+    n = 0
+    if fmt == "csv":
+        own = isinstance(dest, (str, os.PathLike))
+        raw = open(dest, "wb") if own else dest
+        text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+        try:
+            w = csv.writer(text)
+            w.writerow(headers)
+            for rows in chunks:
+                w.writerows(rows)
+                n += len(rows)
+        finally:
+            text.flush()
+            if own: text.close()
+            else: text.detach()
+        return n
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    def arrow_type(h):
+        if h in INTEGER_COLUMNS: return pa.int64()
+        return pa.float64() if h in NUMERIC_COLUMNS else pa.string()
+
+    schema = pa.schema([(h, arrow_type(h)) for h in headers])
+    with pq.ParquetWriter(dest, schema) as writer:
+        for rows in chunks:
+            if not rows: continue
+            frame = pd.DataFrame([list(r) + [""] * (len(headers) - len(r)) for r in rows], columns=headers)
+            for h in headers:
+                if h in INTEGER_COLUMNS:
+                    num = to_number(frame[h])
+                    frame[h] = num.where(num % 1 == 0).astype("Int64")
+                else: frame[h] = to_number(frame[h]) if h in NUMERIC_COLUMNS else frame[h].astype(str)
+            writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+            n += len(rows)
+    return n
+
+
+def export_format(path):
+    return "parquet" if str(path).lower().endswith((".parquet", ".pq")) else "csv"
+
+
+# ==============================================================================
+#                           CLI
+# ==============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import trades / export tabs for Pro Stock Manager.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("import", help="validate and append trades from a CSV/Excel file")
+    imp.add_argument("path")
+    imp.add_argument("--dry-run", action="store_true", help="validate only, write nothing")
+    imp.add_argument("--errors", help="write rejected rows with their reason to this CSV")
+    exp = sub.add_parser("export", help="stream a tab to CSV or Parquet (by extension)")
+    exp.add_argument("tab", choices=["Trades", "Portfolio", "Links"])
+    exp.add_argument("path")
+    args = parser.parse_args(argv)
+
+    import core
+    core.init_db()
+    try:
+        if args.cmd == "export":
+            print(f"{core.export_tab(args.tab, args.path, export_format(args.path))} rows -> {args.path}")
+            return
+        table = read_table(args.path)
+        if args.dry_run:
+            clean, rejected = validate_trades(table)
+            print(f"{len(clean)} valid, {len(rejected)} rejected (dry run)")
+        else:
+            added, rejected = core.import_trades(table)
+            print(f"{added} trades added, {len(rejected)} rejected")
+        if len(rejected): print(rejected.to_string(index=False))
+        if args.errors and len(rejected): rejected.to_csv(args.errors, index=False)
+    finally:
+        if core.STORAGE_BACKEND == "local": core.get_repo().syncer.stop(flush=True)
+
+
+if __name__ == "__main__":
+    main()
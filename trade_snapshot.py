@@ -0,0 +1,201 @@
+"""
+Typed, shared snapshot of the Trades tab.
+
+The grid is parsed once per version into one compact frame: float64 prices,
+categorical status/zone/type, parsed trigger/exit dates and Arrow-backed text.
+Every session gets a shallow copy of the same frame; pandas copy-on-write keeps
+the shared buffers immutable. Versioned stores (the local SQLite mirror) also
+persist it as Parquet, so a restarted process memory-maps it instead of parsing
+the whole tab again.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from trade_engine import PRICE_COLUMNS, TIMESTAMP_FORMAT
+from trade_io import TRADE_TYPES, TRADE_ZONES
+
+# --- CONFIGURATION ---
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trades_snapshot.parquet")
+SNAPSHOT_FORMAT = "1"    # bump whenever the typed schema below changes so old files are ignored
+TRADE_STATUSES = ("Pending", "Active", "Target-Hit", "SL-Hit")
+CATEGORY_COLUMNS = {     # column -> (known categories in sort order, value for a blank cell)
+    "status": (TRADE_STATUSES, "Pending"),
+    "trade_zone": (TRADE_ZONES, ""),
+    "trade_type": (TRADE_TYPES, ""),
+}
+DATE_COLUMNS = ("trigger_date", "exit_date")
+META_KEY = b"trades_snapshot"
+
+
+# ==============================================================================
+#                           TYPED SCHEMA
+# ==============================================================================
+def _columns(grid):
+    # One comprehension per column beats transposing with zip(*rows) by about 2x at 100k rows
+    headers, rows = grid[0], grid[1:]
+    return headers, [[r[i] if len(r) > i else "" for r in rows] for i in range(len(headers))]
+
+
+def _category(values, known, blank):
+    # Each distinct cell is cleaned once; unknown values are kept after the known ones
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    clean = [str(u).strip() or blank for u in uniques]
+    cats = list(known) + sorted(set(clean) - set(known))
+    lookup = {c: i for i, c in enumerate(cats)}
+    remap = np.array([lookup[c] for c in clean], dtype=np.int32)
+    return pd.Categorical.from_codes(remap[codes] if len(codes) else codes, categories=cats)
+
+
+def _dates(values):
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), format=TIMESTAMP_FORMAT, errors='coerce')
+    # Stamps the app wrote match the format; hand-typed dates still get a best-effort parse
+    odd = parsed.isna() & (pd.Series(uniques, dtype=object).astype(str).str.strip() != "")
+    if odd.any():
+        retry = pd.Series(uniques[odd.to_numpy()], dtype=object)
+        parsed[odd] = pd.to_datetime(retry, format='mixed', errors='coerce').to_numpy()
+    # One unit whatever the cells hold, so a frame read back from Parquet matches a fresh build
+    parsed = parsed.astype("datetime64[us]").to_numpy()
+    return pd.Series(parsed[codes] if len(codes) else parsed[:0])
+
+
+def typed_trades(grid):
+    """
+    get_all_values() grid of the Trades tab -> typed DataFrame.
+    Blank prices read as 0.0 and a blank status as Pending, like the records path did.
+    """
+    if not grid or len(grid) < 2: return pd.DataFrame()
+    headers, cols = _columns(grid)
+    out = {}
+    for h, values in zip(headers, cols):
+        if h == 'id':
+            ids = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce')
+            out[h] = ids.astype("Int64") if (ids.dropna() % 1 == 0).all() else ids
+        elif h in PRICE_COLUMNS:
+            out[h] = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').fillna(0.0).astype(np.float64)
+        elif h in CATEGORY_COLUMNS:
+            out[h] = _category(values, *CATEGORY_COLUMNS[h])
+        elif h in DATE_COLUMNS:
+            out[h] = _dates(values)
+        else:
+            out[h] = pd.Series(values, dtype="str")
+    n = len(grid) - 1
+    if 'status' not in out: out['status'] = _category([""] * n, *CATEGORY_COLUMNS['status'])
+    if 'last_alert' not in out: out['last_alert'] = pd.Series([""] * n, dtype="str")
+    return pd.DataFrame(out)
+
+
+# ==============================================================================
+#                           PARQUET PERSISTENCE
+# ==============================================================================
+def save_snapshot(df, path, version):
+    """Write `df` tagged with the store `version` it was built from; atomic via rename."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    meta = dict(table.schema.metadata or {})
+    meta[META_KEY] = f"{SNAPSHOT_FORMAT}:{version}".encode()
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    pq.write_table(table.replace_schema_metadata(meta), tmp)
+    os.replace(tmp, path)
+
+
+def load_snapshot(path, version):
+    """The frame saved for exactly `version`, or None. Only the footer is read to check."""
+    if not path or not os.path.exists(path): return None
+    import pyarrow.parquet as pq
+
+    try:
+        meta = pq.read_schema(path).metadata or {}
+        if meta.get(META_KEY) != f"{SNAPSHOT_FORMAT}:{version}".encode(): return None
+        return pq.read_table(path, memory_map=True).to_pandas()
+    except Exception as e:
+        print(f"Trades snapshot unreadable, rebuilding: {e}")
+        return None
+
+
+# ==============================================================================
+#                           PROCESS-WIDE SNAPSHOT
+# ==============================================================================
+class TradeSnapshot:
+    """
+    One typed Trades frame for every session in the process.
+
+    Stores with a `version()` are checked with one cheap query; others are matched on
+    the identity of the cached grid, which only changes when the cache refetches or
+    is patched. Callers must not modify the frame in place: `frame()` hands out
+    shallow copies, so column assignments stay local to the caller.
+    """
+
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._key = self._grid = self._df = None
+        self.builds = self.warm = self.hits = 0
+
+    def frame(self, repo, tab="Trades"):
+        return self.shared(repo, tab).copy(deep=False)
+
+    def shared(self, repo, tab="Trades"):
+        version = repo.version(tab)
+        with self._lock:
+            if self._df is not None and version is not None and version == self._key:
+                self.hits += 1
+                return self._df
+            grid = None if version is not None else repo.values(tab)
+            if self._df is not None and grid is not None and grid is self._grid:
+                self.hits += 1
+                return self._df
+
+            df = load_snapshot(self.path, version) if version is not None else None
+            built = df is None
+            if built:
+                with metrics.stage("typed trades"):
+                    if grid is None: grid = repo.values(tab)
+                    df = typed_trades(grid)
+                self.builds += 1
+            else:
+                self.warm += 1
+            self._key, self._grid, self._df = version, grid, df
+        # Persisting is off the render path; only versioned stores can prove a file is current
+        if built and version is not None and self.path:
+            threading.Thread(target=self._save, args=(df, version), daemon=True).start()
+        return df
+
+    def _save(self, df, version):
+        with self._save_lock:
+            if version != self._key: return  # a newer version was built meanwhile; it saves itself
+            try: save_snapshot(df, self.path, version)
+            except Exception as e: print(f"Trades snapshot save failed: {e}")
+
+    def reset(self):
+        with self._lock: self._key = self._grid = self._df = None
+
+    def stats(self):
+        df = self._df
+        return {"builds": self.builds, "warm_starts": self.warm, "hits": self.hits,
+                "rows": 0 if df is None else len(df),
+                "mb": 0.0 if df is None else round(float(df.memory_usage(deep=True).sum()) / 1e6, 2)}
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_trade_snapshot():
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is None: _snapshot = TradeSnapshot()
+        return _snapshot
+
+
+def set_trade_snapshot(snapshot):
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = snapshot